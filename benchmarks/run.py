@@ -0,0 +1,300 @@
+"""Benchmarks of playhdl orchestration overhead
+
+Simulators are replaced with stub executables, which do nothing, so only time and memory spent by playhdl itself
+are measured. No EDA tools or licenses are required.
+
+Usage:
+    python benchmarks/run.py                     # run benchmarks and compare with baselines
+    python benchmarks/run.py --full              # include the largest projects
+    python benchmarks/run.py --update-baselines  # save results as new baselines
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import playhdl.project as project
+import playhdl.runner as runner
+import playhdl.settings as settings
+import playhdl.templates as templates
+import playhdl.tools as tools
+
+BASELINES_FILE = Path(__file__).parent.joinpath("baselines.json")
+
+# Stub executables of all supported simulators. Some of them create files expected by simulation commands.
+STUBS = {
+    "iverilog": "",
+    "vvp": "",
+    "vlib": "",
+    "vmap": "",
+    "vlog": "",
+    "vsim": "",
+    "xmvlog": "",
+    "xmelab": "",
+    "xmsim": "",
+    "verilator": "mkdir -p obj_dir && printf '#!/bin/sh\\n' > obj_dir/Vtb && chmod +x obj_dir/Vtb",
+    "vcs": "printf '#!/bin/sh\\n' > simv && chmod +x simv",
+    "xvlog": "",
+    "xelab": "",
+    "xsim": "",
+}
+
+
+@dataclass
+class Result:
+    name: str
+    size: int
+    time: float
+    memory_mb: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+@dataclass
+class Workspace:
+    root: Path
+    bin_dir: Path
+    project_dir: Path
+    app_dir: Path
+
+
+def _create_stubs(bin_dir: Path) -> None:
+    """Create stub executables for all simulators"""
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, body in STUBS.items():
+        stub = bin_dir.joinpath(name)
+        stub.write_text(f"#!/bin/sh\n{body}\n")
+        stub.chmod(0o755)
+
+
+def _create_sources(project_dir: Path, n: int) -> List[str]:
+    """Create synthetic design with n source files. Every tenth file is a package."""
+    project_dir.mkdir(parents=True, exist_ok=True)
+    sources = []
+    for i in range(n):
+        name = f"src{i}.sv"
+        if i % 10 == 0:
+            content = f"package pkg{i};\n  localparam int N = {i};\nendpackage\n"
+        else:
+            content = f"module m{i} (input logic clk);\n  logic [{i % 64}:0] r;\nendmodule\n"
+        project_dir.joinpath(name).write_text(content)
+        sources.append(name)
+    return sources
+
+
+def _create_settings(bin_dir: Path, n_tools: int) -> settings.UserSettings:
+    """Create user settings with n tools of all kinds"""
+    kinds = list(tools.ToolKind)
+    user_settings = settings.UserSettings()
+    for i in range(n_tools):
+        kind = kinds[i % len(kinds)]
+        user_settings.tools[f"{kind}{i}"] = tools.ToolSettings(kind=kind, bin_dir=bin_dir)
+    return user_settings
+
+
+@contextlib.contextmanager
+def _workspace() -> Iterator[Workspace]:
+    """Temporary workspace with stub tools, which is the current directory within the context"""
+    cwd = Path.cwd()
+    with tempfile.TemporaryDirectory(prefix="playhdl_bench_") as tmp:
+        root = Path(tmp)
+        ws = Workspace(root, root.joinpath("bin"), root.joinpath("project"), root.joinpath("home", ".playhdl"))
+        _create_stubs(ws.bin_dir)
+        ws.project_dir.mkdir()
+        os.chdir(ws.project_dir)
+        try:
+            yield ws
+        finally:
+            os.chdir(cwd)
+
+
+def _measure(func: Callable[[], None], repeat: int) -> Tuple[float, float]:
+    """Get the best time of several runs and peak memory allocated by Python"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak / (1 << 20)
+
+
+def bench_settings_setup(ws: Workspace, size: int) -> Callable[[], None]:
+    """Discovery of tools during 'setup', when all of them are in PATH"""
+    os.environ["PATH"] = f"{ws.bin_dir}:{os.environ['PATH']}"
+    return lambda: settings.setup(ws.app_dir, ws.app_dir.joinpath("settings.json"), query_force_yes=True)
+
+
+def _bench_init(ws: Workspace, n_sources: int, n_tools: int) -> Callable[[], None]:
+    """Creation and saving of the project file as it is done by 'init'"""
+    sources = _create_sources(ws.project_dir, n_sources)
+    user_settings = _create_settings(ws.bin_dir, n_tools)
+    project_file = ws.project_dir.joinpath("playhdl.json")
+
+    def func() -> None:
+        project_descr = project.create(project_file, templates.DesignKind.sv, sources, user_settings)
+        project.dump(project_file, project_descr, query_force_yes=True)
+
+    return func
+
+
+def bench_project_create(ws: Workspace, size: int) -> Callable[[], None]:
+    """Generation of scripts for all tool kinds for a project with many sources"""
+    return _bench_init(ws, size, len(tools.ToolKind))
+
+
+def bench_project_tools(ws: Workspace, size: int) -> Callable[[], None]:
+    """Generation of scripts for many tool uids"""
+    return _bench_init(ws, 10, size)
+
+
+def _create_project(ws: Workspace, n_sources: int, n_tools: int) -> Tuple[project.Project, settings.UserSettings]:
+    """Create project for all tools with n sources"""
+    sources = _create_sources(ws.project_dir, n_sources)
+    user_settings = _create_settings(ws.bin_dir, n_tools)
+    project_file = ws.project_dir.joinpath("playhdl.json")
+    return project.create(project_file, templates.DesignKind.sv, sources, user_settings), user_settings
+
+
+def bench_runner_build(ws: Workspace, size: int) -> Callable[[], None]:
+    """Full build and simulation of a project with many sources in Xcelium (per-file compilation)"""
+    project_descr, user_settings = _create_project(ws, size, len(tools.ToolKind))
+    uid = [u for u, s in user_settings.tools.items() if s.kind == tools.ToolKind.XCELIUM][0]
+    return lambda: runner.run(project_descr, user_settings, uid, False, rebuild=True, quiet=True)
+
+
+def bench_runner_cached(ws: Workspace, size: int) -> Callable[[], None]:
+    """Simulation of a project with many sources when build is up to date"""
+    project_descr, user_settings = _create_project(ws, size, len(tools.ToolKind))
+    uid = [u for u, s in user_settings.tools.items() if s.kind == tools.ToolKind.XCELIUM][0]
+    runner.run(project_descr, user_settings, uid, False, quiet=True)
+    return lambda: runner.run(project_descr, user_settings, uid, False, quiet=True)
+
+
+def bench_runner_many(ws: Workspace, size: int) -> Callable[[], None]:
+    """Build and simulation in many tools at the same time"""
+    project_descr, user_settings = _create_project(ws, 10, size)
+    uids = list(project_descr.tools.keys())
+    return lambda: runner.run_many(project_descr, user_settings, uids, rebuild=True, quiet=True)
+
+
+def bench_cli(ws: Workspace, size: int) -> Callable[[], None]:
+    """Startup of the command line interface of the checkout. Interpreter is started directly, so wrappers of the
+    installed entry point (e.g. pyenv shims) are not measured."""
+    env = dict(os.environ, HOME=str(ws.app_dir.parent), PYTHONPATH=str(Path(__file__).parents[1]))
+    env["PATH"] = f"{ws.bin_dir}:{env['PATH']}"
+    cmd = [sys.executable, "-m", "playhdl"]
+    subprocess.run(cmd + ["-y", "setup"], env=env, check=True, capture_output=True)
+
+    def func() -> None:
+        subprocess.run(cmd + ["info"], env=env, check=True, capture_output=True)
+
+    return func
+
+
+BENCHMARKS = {
+    "settings_setup": (bench_settings_setup, [1], []),
+    "project_create": (bench_project_create, [1, 100, 1000], [10000]),
+    "project_tools": (bench_project_tools, [1, 10, 50], []),
+    "runner_build": (bench_runner_build, [1, 100], [1000, 10000]),
+    "runner_cached": (bench_runner_cached, [1, 100, 1000], [10000]),
+    "runner_many": (bench_runner_many, [1, 10], [50]),
+    "cli": (bench_cli, [1], []),
+}
+
+# Relative tolerances of the benchmarks, which are bound by startup of subprocesses and vary a lot between runs.
+# They are used instead of the common tolerance, if they are wider.
+TOLERANCES = {
+    "cli": 1.0,
+}
+
+
+def run_benchmarks(names: List[str], full: bool, repeat: int) -> List[Result]:
+    """Run selected benchmarks"""
+    results = []
+    for name in names:
+        bench, sizes, full_sizes = BENCHMARKS[name]
+        for size in sizes + (full_sizes if full else []):
+            path = os.environ["PATH"]
+            try:
+                with _workspace() as ws:
+                    t, mem = _measure(bench(ws, size), repeat)
+            finally:
+                os.environ["PATH"] = path
+            result = Result(name, size, t, mem)
+            print(f"{result.key:>24}: {result.time:9.4f} s {result.memory_mb:9.2f} MB", flush=True)
+            results.append(result)
+    return results
+
+
+def compare(results: List[Result], baselines: Dict[str, Dict], tolerance: float, min_delta: float) -> List[str]:
+    """Compare results with baselines and return list of regressions"""
+    regressions = []
+    for r in results:
+        base = baselines.get(r.key)
+        if not base:
+            continue
+        time_tolerance = max(tolerance, TOLERANCES.get(r.name, 0.0))
+        if r.time > base["time"] * (1 + time_tolerance) and r.time - base["time"] > min_delta:
+            regressions.append(f"{r.key}: time {base['time']:.4f} s -> {r.time:.4f} s")
+        if r.memory_mb > base["memory_mb"] * (1 + tolerance) and r.memory_mb - base["memory_mb"] > 1.0:
+            regressions.append(f"{r.key}: memory {base['memory_mb']:.2f} MB -> {r.memory_mb:.2f} MB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="playhdl orchestration benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (all by default): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--full", action="store_true", help="include the largest projects")
+    parser.add_argument("--repeat", type=int, default=5, help="number of runs, the best time is reported")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative slowdown")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="ignored absolute slowdown, s")
+    parser.add_argument("--update-baselines", action="store_true", help="save results as new baselines")
+    parser.add_argument("--json", type=Path, help="save results to a JSON file")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    # Silence playhdl, only results matter
+    logging.getLogger("playhdl").setLevel(logging.ERROR)
+
+    results = run_benchmarks(args.names or list(BENCHMARKS), args.full, args.repeat)
+    data = {r.key: asdict(r) for r in results}
+    if args.json:
+        args.json.write_text(json.dumps(data, indent=4))
+
+    baselines = json.loads(BASELINES_FILE.read_text()) if BASELINES_FILE.is_file() else {}
+    if args.update_baselines:
+        baselines.update(data)
+        BASELINES_FILE.write_text(json.dumps(baselines, indent=4) + "\n")
+        print(f"Baselines were saved to '{BASELINES_FILE}'")
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance, args.min_delta)
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
-from . import utils
+def __getattr__(name: str) -> str:
+    # Version is evaluated lazily to keep import of the package fast
+    if name == "__version__":
+        from . import utils
 
-
-__version__ = utils.get_pkg_version()
+        return utils.get_pkg_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
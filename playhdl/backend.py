@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import os
+import resource
+import signal
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from . import log, profiling, utils
+
+_logger = log.get_logger()
+
+# Layout of the job queue directory
+PENDING_DIR = "pending"
+CLAIMED_DIR = "claimed"
+OUTPUT_DIR = "output"
+DONE_DIR = "done"
+
+# Interval of polling the job queue by clients and workers, s
+POLL_INTERVAL = 0.1
+
+# Client warns if a job is still pending after this time, s
+PENDING_WARNING_TIME = 10.0
+
+# Cancelled processes are killed, if they are still running after this time since the termination request, s
+KILL_TIMEOUT = 5.0
+
+OutputCallback = Callable[[bytes], None]
+
+
+def get_process_env(bin_dir: Path, env: Dict[str, str]) -> Dict[str, str]:
+    """Get environment of the process: current environment, environment of the tool and tool directory in PATH"""
+    proc_env = os.environ.copy()
+    proc_env.update(env)
+    proc_env["PATH"] = f"{bin_dir}:{proc_env.get('PATH', '')}"
+    return proc_env
+
+
+def _dump_atomic(file: Path, data: Any) -> None:
+    """Dump JSON so that readers of the (shared) directory never see a partially written file"""
+    tmp = file.with_name(f"{file.name}.tmp")
+    utils.dump_json(tmp, data)
+    os.replace(tmp, file)
+
+
+def _get_empty_rusage() -> resource.struct_rusage:
+    return resource.struct_rusage((0,) * resource.struct_rusage.n_fields)
+
+
+class CancelledError(RuntimeError):
+    """Execution of commands was cancelled"""
+
+
+class Cancellation:
+    """Processes, which can be cancelled at once. Every process runs in its own session, so the whole process tree
+    is terminated, as tools are often shell wrappers which spawn the real executable."""
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._procs: Set[subprocess.Popen] = set()
+
+    def popen(self, *args: Any, **kwargs: Any) -> subprocess.Popen:
+        """Start process unless execution is cancelled"""
+        with self._lock:
+            if self.cancelled:
+                raise CancelledError("Execution was cancelled")
+            proc = subprocess.Popen(*args, start_new_session=True, **kwargs)
+            self._procs.add(proc)
+        return proc
+
+    def finish(self, proc: subprocess.Popen) -> None:
+        """Forget the finished process. Error is raised if it was cancelled."""
+        with self._lock:
+            self._procs.discard(proc)
+        if self.cancelled:
+            raise CancelledError("Execution was cancelled")
+
+    def cancel(self) -> None:
+        """Terminate all running processes and don't start new ones"""
+        with self._lock:
+            self.cancelled = True
+            pids = [proc.pid for proc in self._procs]
+        self._signal(pids, signal.SIGTERM)
+        if pids:
+            timer = threading.Timer(KILL_TIMEOUT, self._signal, args=(pids, signal.SIGKILL))
+            timer.daemon = True
+            timer.start()
+
+    @staticmethod
+    def _signal(pids: List[int], sig: signal.Signals) -> None:
+        for pid in pids:
+            try:
+                os.killpg(pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+
+class Executor(ABC):
+    """Backend, which executes commands of the stages"""
+
+    @abstractmethod
+    def execute(
+        self, cmd: str, cwd: Path, bin_dir: Path, env: Dict[str, str], on_output: OutputCallback
+    ) -> Tuple[int, resource.struct_rusage]:
+        """Execute shell command and pass its output line by line. Exit code and resource usage are returned."""
+        raise NotImplementedError
+
+
+class LocalExecutor(Executor):
+    """Commands are executed by child processes of playhdl"""
+
+    def __init__(self, cancellation: Optional[Cancellation] = None) -> None:
+        self.cancellation = cancellation
+
+    def execute(
+        self, cmd: str, cwd: Path, bin_dir: Path, env: Dict[str, str], on_output: OutputCallback
+    ) -> Tuple[int, resource.struct_rusage]:
+        popen: Callable[..., subprocess.Popen] = subprocess.Popen
+        if self.cancellation:
+            popen = self.cancellation.popen
+        with popen(
+            cmd,
+            cwd=cwd,
+            env=get_process_env(bin_dir, env),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            shell=True,
+        ) as proc:
+            try:
+                assert proc.stdout is not None
+                for line in proc.stdout:
+                    on_output(line)
+                returncode, rusage = profiling.wait_process(proc.pid)
+                proc.returncode = returncode
+            except Exception:
+                # Consumer of the output gave up, e.g. on a fatal error, so the process isn't waited for
+                self._terminate(proc)
+                raise
+            finally:
+                if self.cancellation:
+                    self.cancellation.finish(proc)
+        return returncode, rusage
+
+    def _terminate(self, proc: subprocess.Popen) -> None:
+        """Terminate the process. The whole process tree is terminated if the process runs in its own session,
+        otherwise tools spawned by the shell get SIGPIPE on the next write to the closed output."""
+        if proc.stdout:
+            proc.stdout.close()
+        for sig in [signal.SIGTERM, signal.SIGKILL]:
+            if self.cancellation:
+                Cancellation._signal([proc.pid], sig)
+            else:
+                proc.send_signal(sig)
+            try:
+                proc.wait(KILL_TIMEOUT)
+                return
+            except subprocess.TimeoutExpired:
+                pass
+
+
+class _Queue:
+    """Job queue in a directory, which is shared by clients and workers. Every job goes through the directories:
+    pending -> claimed (by a worker) -> done. Output of the job is appended to a file in the output directory."""
+
+    def __init__(self, queue_dir: Path) -> None:
+        self.queue_dir = queue_dir.resolve()
+        for d in [PENDING_DIR, CLAIMED_DIR, OUTPUT_DIR, DONE_DIR]:
+            self.queue_dir.joinpath(d).mkdir(parents=True, exist_ok=True)
+
+    def pending(self, job_id: str) -> Path:
+        return self.queue_dir.joinpath(PENDING_DIR, f"{job_id}.json")
+
+    def claimed(self, job_id: str) -> Path:
+        return self.queue_dir.joinpath(CLAIMED_DIR, f"{job_id}.json")
+
+    def output(self, job_id: str) -> Path:
+        return self.queue_dir.joinpath(OUTPUT_DIR, f"{job_id}.log")
+
+    def done(self, job_id: str) -> Path:
+        return self.queue_dir.joinpath(DONE_DIR, f"{job_id}.json")
+
+    def get_pending_ids(self) -> List[str]:
+        """Get identifiers of pending jobs, the oldest go first"""
+        return sorted(f.stem for f in self.queue_dir.joinpath(PENDING_DIR).glob("*.json"))
+
+
+class QueueExecutor(Executor):
+    """Commands are submitted to the job queue in a shared directory and executed by workers, possibly on other hosts.
+    Working directory of the command has to be on a filesystem shared with the workers."""
+
+    def __init__(
+        self,
+        queue_dir: Path,
+        poll_interval: float = POLL_INTERVAL,
+        cancellation: Optional[Cancellation] = None,
+    ) -> None:
+        self.queue = _Queue(queue_dir)
+        self.poll_interval = poll_interval
+        self.cancellation = cancellation
+
+    def execute(
+        self, cmd: str, cwd: Path, bin_dir: Path, env: Dict[str, str], on_output: OutputCallback
+    ) -> Tuple[int, resource.struct_rusage]:
+        # Job identifiers start with time to be processed in the order of submission
+        job_id = f"{time.time_ns()}-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        job = {"cmd": cmd, "cwd": str(cwd.resolve()), "bin_dir": str(bin_dir), "env": env}
+        self.queue.output(job_id).touch()
+        _dump_atomic(self.queue.pending(job_id), job)
+        try:
+            self._stream_output(job_id, on_output)
+            result = utils.load_json(self.queue.done(job_id))
+        finally:
+            # Job is cancelled if it wasn't claimed by a worker yet, otherwise the worker completes it and drops the
+            # result. Output is removed before the done file, the worker relies on this order (see Worker._execute()).
+            for file in [self.queue.pending(job_id), self.queue.output(job_id), self.queue.done(job_id)]:
+                file.unlink(missing_ok=True)
+        _logger.debug(f"Job '{job_id}' was executed by worker '{result.get('worker')}'")
+        return int(result["returncode"]), resource.struct_rusage(result["rusage"])
+
+    def _stream_output(self, job_id: str, on_output: OutputCallback) -> None:
+        """Pass output of the job line by line until the job is done"""
+        start = time.monotonic()
+        warned = False
+        buffer = b""
+        with self.queue.output(job_id).open("rb") as f:
+            while True:
+                # Done file is written after the output is complete, so it is checked before reading
+                done = self.queue.done(job_id).is_file()
+                buffer += f.read()
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    on_output(line + b"\n")
+                if done:
+                    break
+                if self.cancellation and self.cancellation.cancelled:
+                    raise CancelledError("Execution was cancelled")
+                if not warned and time.monotonic() - start > PENDING_WARNING_TIME:
+                    if self.queue.pending(job_id).is_file():
+                        _logger.warning(f"Job is waiting for a free worker of the queue '{self.queue.queue_dir}' ...")
+                        warned = True
+                time.sleep(self.poll_interval)
+        if buffer:
+            on_output(buffer)
+
+
+class Worker:
+    """Reference worker, which executes jobs from the queue in a shared directory using local processes"""
+
+    def __init__(self, queue_dir: Path, jobs: int = 1, poll_interval: float = POLL_INTERVAL) -> None:
+        self.queue = _Queue(queue_dir)
+        self.jobs = max(1, jobs)
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+
+    def serve(self, stop: Optional[threading.Event] = None) -> None:
+        """Execute jobs until stop event is set or process is interrupted"""
+        stop = stop or threading.Event()
+        _logger.info(f"Worker '{self.name}' serves the queue '{self.queue.queue_dir}' with {self.jobs} jobs")
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            slots = [pool.submit(self._serve_slot, stop) for _ in range(self.jobs)]
+            try:
+                for slot in slots:
+                    slot.result()
+            except KeyboardInterrupt:
+                _logger.info("Stop after the running jobs are done ...")
+                stop.set()
+                raise
+
+    def _serve_slot(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            job_id = self._claim()
+            if job_id is None:
+                stop.wait(self.poll_interval)
+            else:
+                self._execute(job_id)
+
+    def _claim(self) -> Optional[str]:
+        """Claim the oldest pending job. Rename is atomic, so a job is claimed only by one worker."""
+        for job_id in self.queue.get_pending_ids():
+            try:
+                os.rename(self.queue.pending(job_id), self.queue.claimed(job_id))
+            except FileNotFoundError:
+                continue
+            return job_id
+        return None
+
+    def _execute(self, job_id: str) -> None:
+        """Execute the claimed job and publish its result"""
+        job = utils.load_json(self.queue.claimed(job_id))
+        try:
+            # Output is created by the client and removed when it stops waiting, so it's never created here
+            out = os.fdopen(os.open(self.queue.output(job_id), os.O_WRONLY | os.O_APPEND), "ab")
+        except FileNotFoundError:
+            _logger.info(f"Drop job '{job_id}', because its client has gone")
+            self.queue.claimed(job_id).unlink(missing_ok=True)
+            return
+
+        _logger.info(f"Execute job '{job_id}': {job['cmd']}")
+        with out:
+
+            def on_output(line: bytes) -> None:
+                out.write(line)
+                out.flush()
+
+            try:
+                returncode, rusage = LocalExecutor().execute(
+                    job["cmd"], Path(job["cwd"]), Path(job["bin_dir"]), job["env"], on_output
+                )
+            except OSError as e:
+                on_output(f"Worker '{self.name}' can't execute the command: {e}\n".encode())
+                returncode, rusage = 127, _get_empty_rusage()
+        _dump_atomic(self.queue.done(job_id), {"returncode": returncode, "rusage": list(rusage), "worker": self.name})
+        # Client removes the output before the done file. If the output has gone, the client won't remove the result.
+        if not self.queue.output(job_id).exists():
+            _logger.info(f"Drop result of job '{job_id}', because its client has gone")
+            self.queue.done(job_id).unlink(missing_ok=True)
+        self.queue.claimed(job_id).unlink(missing_ok=True)
+
+
+def get_executor(queue_dir: Optional[Path] = None, cancellation: Optional[Cancellation] = None) -> Executor:
+    """Get executor of commands: workers of the job queue if its directory is provided, local processes otherwise"""
+    if queue_dir:
+        return QueueExecutor(queue_dir, cancellation=cancellation)
+    return LocalExecutor(cancellation)
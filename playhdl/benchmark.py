@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import math
+import statistics
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, TYPE_CHECKING
+
+from . import utils
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+REPORT_FILE = "bench.json"
+
+# Stages of the benchmark in the order of execution. Build is split, so elaboration can be compared separately.
+STAGES = ["compile", "elaborate", "sim"]
+
+
+@dataclass
+class ToolBench:
+    tool_uid: str
+    tool_kind: str
+    tool_version: str
+    samples: Dict[str, List[float]] = field(default_factory=dict)
+    error: str = ""
+
+
+def get_report_file() -> Path:
+    """Get default file of the benchmark report"""
+    return utils.get_state_file(REPORT_FILE)
+
+
+def get_percentile(samples: List[float], percent: float) -> float:
+    """Get percentile with linear interpolation between the closest samples"""
+    ordered = sorted(samples)
+    pos = (len(ordered) - 1) * percent / 100
+    low, high = math.floor(pos), math.ceil(pos)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def get_stats(samples: List[float]) -> Dict[str, float]:
+    """Get statistics of the stage times. Variance of a single sample is zero."""
+    return {
+        "median": statistics.median(samples),
+        "p90": get_percentile(samples, 90),
+        "variance": statistics.variance(samples) if len(samples) > 1 else 0.0,
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+
+def get_report(results: List[ToolBench], repeats: int, warmup: int) -> Dict[str, Any]:
+    """Get report with samples and statistics of every stage of every tool"""
+    tools = {}
+    for r in results:
+        stages: Dict[str, Dict[str, Any]] = {}
+        for stage in STAGES:
+            samples = r.samples.get(stage)
+            if samples:
+                stages[stage] = {"samples": samples}
+                stages[stage].update(get_stats(samples))
+        tools[r.tool_uid] = {"kind": r.tool_kind, "version": r.tool_version, "error": r.error, "stages": stages}
+    return {"repeats": repeats, "warmup": warmup, "tools": tools}
+
+
+def get_text_table(report: Dict[str, Any]) -> str:
+    """Create text table with statistics of every stage of every tool"""
+    header = (
+        f"| {'tool':>12} | {'stage':>9} | {'runs':>4} | {'median, s':>9} | {'p90, s':>9} | {'variance':>9} |"
+        f" {'status':^6} |"
+    )
+    divider = f"| {'-' * 12} | {'-' * 9} | {'-' * 4} | {'-' * 9} | {'-' * 9} | {'-' * 9} | {'-' * 6} |"
+    rows = []
+    for uid, tool in report["tools"].items():
+        status = "FAIL" if tool["error"] else "PASS"
+        if not tool["stages"]:
+            rows.append(f"| {uid:>12} | {'-':>9} | {0:>4} | {'-':>9} | {'-':>9} | {'-':>9} | {status:^6} |")
+        for stage, s in tool["stages"].items():
+            rows.append(
+                f"| {uid:>12} | {stage:>9} | {len(s['samples']):>4} | {s['median']:>9.2f} | {s['p90']:>9.2f}"
+                f" | {s['variance']:>9.4f} | {status:^6} |"
+            )
+    return "\n".join([header, divider] + rows)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import log, tools, utils
+
+_logger = log.get_logger()
+
+BUILD_CACHE_FILE = ".playhdl_cache.json"
+
+
+def _hash_file(file: Path) -> str:
+    """Get hash of the file content"""
+    h = hashlib.sha256()
+    with file.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_sources_hash(hashes: Dict[str, str]) -> str:
+    """Combine hashes of the sources into a single one. Empty string is returned if there are no sources."""
+    if not hashes:
+        return ""
+    return hashlib.sha256(json.dumps(hashes, sort_keys=True).encode()).hexdigest()
+
+
+def _get_tool_data(settings: tools.ToolSettings, build_cmds: List[tools.ToolStep]) -> Dict[str, Any]:
+    """Get everything the build depends on except the sources"""
+    return {
+        "build": build_cmds,
+        "bin_dir": str(settings.bin_dir),
+        "env": settings.env,
+        "tool": tools.get_tool_fingerprint(settings),
+    }
+
+
+def get_build_key(
+    settings: tools.ToolSettings,
+    build_cmds: List[tools.ToolStep],
+    sources: List[str],
+    hashes: Optional[Dict[str, str]] = None,
+) -> Optional[str]:
+    """Calculate key of the build stage. Hashes of the sources with their included files can be provided,
+    so these sources are not read again. None is returned if the build can't be cached."""
+    if not sources:
+        _logger.debug("Project has no sources recorded, so build can't be cached")
+        return None
+
+    hashes = hashes or {}
+    try:
+        sources_hashes = {s: hashes[s] if s in hashes else _hash_file(Path(s)) for s in sources}
+    except OSError as e:
+        _logger.debug(f"Can't hash sources, so build can't be cached: {e}")
+        return None
+
+    data = {"sources": sources_hashes, **_get_tool_data(settings, build_cmds)}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def get_compile_key(settings: tools.ToolSettings, build_cmds: List[tools.ToolStep], options: List[str]) -> str:
+    """Calculate key of the compilation options, e.g. include directories and macros of the file lists.
+    Sources compiled with the same key can be reused by the next build."""
+    data = {"options": options, **_get_tool_data(settings, build_cmds)}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _load_build_info(work_dir: Path) -> Dict[str, Any]:
+    """Load information about the last successful build in the working directory"""
+    try:
+        return utils.load_json(work_dir.joinpath(BUILD_CACHE_FILE))
+    except (OSError, ValueError):
+        return {}
+
+
+def is_build_cached(work_dir: Path, key: str) -> bool:
+    """Check that artifacts in the working directory were built with the same key"""
+    return _load_build_info(work_dir).get("key") == key
+
+
+def get_build_artifacts(work_dir: Path) -> List[str]:
+    """Get names of the files produced by the last successful build in the working directory"""
+    return list(_load_build_info(work_dir).get("artifacts", []))
+
+
+def get_build_profile(work_dir: Path) -> Optional[str]:
+    """Get build profile of the last successful build in the working directory. None is returned without a build."""
+    info = _load_build_info(work_dir)
+    return str(info.get("profile", "debug")) if info else None
+
+
+def get_compiled_sources(work_dir: Path, compile_key: str) -> Dict[str, str]:
+    """Get hashes of the sources compiled by the last successful build with the same compile key"""
+    info = _load_build_info(work_dir)
+    return dict(info.get("sources", {})) if info.get("compile_key") == compile_key else {}
+
+
+def save_build_info(
+    work_dir: Path,
+    key: Optional[str],
+    artifacts: List[str],
+    profile: str = "debug",
+    compile_key: str = "",
+    sources: Optional[Dict[str, str]] = None,
+) -> None:
+    """Save key, artifacts and build profile of the successful build to the working directory.
+    Compile key and hashes of the compiled sources allow the next build to recompile only the changed ones."""
+    info = {
+        "key": key,
+        "artifacts": artifacts,
+        "profile": profile,
+        "compile_key": compile_key,
+        "sources": sources or {},
+    }
+    utils.dump_json(work_dir.joinpath(BUILD_CACHE_FILE), info)
@@ -1,7 +1,16 @@
+from __future__ import annotations
+
 import argparse
+import os
+import sys
 from pathlib import Path
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+# Only modules required to parse arguments are imported here, the rest are imported by commands on demand
+from . import log, options, utils
 
-from . import log, project, runner, settings, templates, tools, utils
+if TYPE_CHECKING:
+    from . import project, settings, tools
 
 _logger = log.get_logger()
 
@@ -9,9 +18,16 @@ app_dir = Path.home().joinpath(".playhdl")
 user_settings_file = app_dir.joinpath("settings.json")
 project_file = Path("playhdl.json")
 
+# Settings and projects loaded in advance by the daemon, keyed by absolute path of the file
+preloaded: Dict[Path, Any] = {}
+
 
 def _load_settings(settings_file: Path) -> settings.UserSettings:
     """Load user settings"""
+    from . import settings
+
+    if settings_file.absolute() in preloaded:
+        return preloaded[settings_file.absolute()]
     try:
         return settings.load(settings_file)
     except FileNotFoundError:
@@ -21,6 +37,10 @@ def _load_settings(settings_file: Path) -> settings.UserSettings:
 
 def _load_project(project_file: Path) -> project.Project:
     """Load project"""
+    from . import project
+
+    if project_file.absolute() in preloaded:
+        return preloaded[project_file.absolute()]
     try:
         return project.load(project_file)
     except FileNotFoundError:
@@ -35,8 +55,28 @@ def _show_run_options(project_descriptor: project.Project) -> None:
         _logger.info(f"  playhdl run {uid}")
 
 
+def _get_run_opts(args: argparse.Namespace) -> Dict[str, Any]:
+    """Get options for the runner from CLI arguments"""
+    from . import history
+
+    return {
+        "rebuild": getattr(args, "rebuild", False),
+        "jobs": getattr(args, "jobs", 1),
+        "defines": getattr(args, "define", None) or [],
+        "quiet": args.quiet,
+        "tail_lines": args.tail,
+        "profile": args.profile,
+        "build_profile": args.build_profile,
+        "queue": args.queue,
+        "max_errors": args.max_errors,
+        "history_file": None if args.no_history else history.get_history_file(app_dir),
+    }
+
+
 def cmd_run(args: argparse.Namespace) -> None:
     """Invoke simulation in the current workspace"""
+    from . import runner
+
     _logger.debug(f"Execute 'cmd_run' with {args}")
 
     # Load user settings
@@ -45,27 +85,199 @@ def cmd_run(args: argparse.Namespace) -> None:
     # Load project
     project_descriptor = _load_project(project_file)
 
+    tool_uids = list(project_descriptor.tools.keys()) if args.all else args.tool
+    if not tool_uids:
+        _show_run_options(project_descriptor)
+        exit(1)
+
+    # Run simulator
+    try:
+        if args.watch:
+            _watch(user_settings, tool_uids, args)
+        elif len(tool_uids) == 1 and not args.all:
+            runner.run(project_descriptor, user_settings, tool_uids[0], args.waves, **_get_run_opts(args))
+        else:
+            _run_many(project_descriptor, user_settings, tool_uids, args)
+    except (ValueError, RuntimeError, FileNotFoundError) as e:
+        _logger.error(str(e))
+        exit(1)
+
+
+def _watch(user_settings: settings.UserSettings, tool_uids: List[tools.ToolUid], args: argparse.Namespace) -> None:
+    """Run simulator every time sources change"""
+    from . import runner
+
+    if args.waves or args.all or len(tool_uids) > 1:
+        raise ValueError("Watch mode supports a single tool without waves")
+
+    _logger.info(f"Watch sources and '{project_file}' for changes. Press Ctrl+C to stop.")
+    try:
+        runner.watch(project_file, user_settings, tool_uids[0], **_get_run_opts(args))
+    except KeyboardInterrupt:
+        _logger.info("Watch mode was stopped")
+
+
+def _run_many(
+    project_descriptor: project.Project,
+    user_settings: settings.UserSettings,
+    tool_uids: List[tools.ToolUid],
+    args: argparse.Namespace,
+) -> None:
+    """Run several simulators at the same time"""
+    from . import runner, scheduler
+
+    if args.waves:
+        raise ValueError("Waves can't be opened when several tools are running")
+
+    results = runner.run_many(project_descriptor, user_settings, tool_uids, **_get_run_opts(args))
+    _logger.info(f"Summary:\n{scheduler.get_summary_text_table(results)}")
+    if not all(r.passed for r in results):
+        raise RuntimeError(f"Failed tools: {[r.name for r in results if not r.passed]}")
+
+
+def cmd_build(args: argparse.Namespace) -> None:
+    """Build project without running simulation"""
+    from . import runner
+
+    _logger.debug(f"Execute 'cmd_build' with {args}")
+
+    # Load user settings
+    user_settings = _load_settings(user_settings_file)
+
+    # Load project
+    project_descriptor = _load_project(project_file)
+
+    if not args.tool:
+        _show_run_options(project_descriptor)
+        exit(1)
+
+    # Run build
+    try:
+        work_dir = runner.build(project_descriptor, user_settings, args.tool, **_get_run_opts(args))
+    except (ValueError, RuntimeError, FileNotFoundError) as e:
+        _logger.error(str(e))
+        exit(1)
+
+    _logger.info(f"Build is ready in '{work_dir}'. Run simulations using it:")
+    _logger.info(f"  playhdl sim {args.tool} [+PLUSARG ...]")
+
+
+def cmd_sim(args: argparse.Namespace) -> None:
+    """Run simulation using the last build"""
+    from . import runner
+
+    _logger.debug(f"Execute 'cmd_sim' with {args}")
+
+    # Load user settings
+    user_settings = _load_settings(user_settings_file)
+
+    # Load project
+    project_descriptor = _load_project(project_file)
+
     if not args.tool:
         _show_run_options(project_descriptor)
         exit(1)
 
     # Run simulator
     try:
-        runner.run(project_descriptor, user_settings, args.tool, args.waves)
+        runner.sim(project_descriptor, user_settings, args.tool, args.plusargs, name=args.name, **_get_run_opts(args))
+    except (ValueError, RuntimeError, FileNotFoundError) as e:
+        _logger.error(str(e))
+        exit(1)
+
+
+def cmd_regress(args: argparse.Namespace) -> None:
+    """Build project once and run simulations with different seeds"""
+    from . import runner, scheduler
+
+    _logger.debug(f"Execute 'cmd_regress' with {args}")
+
+    # Load user settings
+    user_settings = _load_settings(user_settings_file)
+
+    # Load project
+    project_descriptor = _load_project(project_file)
+
+    if not args.tool:
+        _show_run_options(project_descriptor)
+        exit(1)
+
+    # Run regression
+    seeds = list(range(args.base_seed, args.base_seed + args.seeds))
+    try:
+        results = runner.regress(
+            project_descriptor,
+            user_settings,
+            args.tool,
+            seeds,
+            sim_jobs=args.jobs,
+            **_get_run_opts(args),
+        )
     except (ValueError, RuntimeError, FileNotFoundError) as e:
         _logger.error(str(e))
         exit(1)
 
+    failed = [r.name for r in results if not r.passed]
+    _logger.info(f"Summary:\n{scheduler.get_summary_text_table(results)}")
+    _logger.info(f"Passed {len(results) - len(failed)} of {len(results)} simulations")
+    if failed:
+        _logger.error(f"Failed seeds: {' '.join(f.replace('seed_', '') for f in failed)}")
+        exit(1)
+
+
+def cmd_bench(args: argparse.Namespace) -> None:
+    """Compare performance of the tools"""
+    from . import benchmark, runner
+
+    _logger.debug(f"Execute 'cmd_bench' with {args}")
+
+    # Load user settings
+    user_settings = _load_settings(user_settings_file)
+
+    # Load project
+    project_descriptor = _load_project(project_file)
+
+    # Run benchmark
+    tool_uids = args.tool or list(project_descriptor.tools.keys())
+    if args.repeats < 1 or args.warmup < 0:
+        _logger.error("Number of repeats should be positive and number of warm-up runs can't be negative")
+        exit(1)
+    try:
+        results = runner.bench(
+            project_descriptor,
+            user_settings,
+            tool_uids,
+            args.repeats,
+            args.warmup,
+            **_get_run_opts(args),
+        )
+    except (ValueError, RuntimeError, FileNotFoundError) as e:
+        _logger.error(str(e))
+        exit(1)
+
+    report = benchmark.get_report(results, args.repeats, args.warmup)
+    report_file = args.json or benchmark.get_report_file()
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    utils.dump_json(report_file, report)
+    _logger.info(f"Summary:\n{benchmark.get_text_table(report)}")
+    _logger.info(f"Report was saved to '{report_file}'")
+    failed = [r.tool_uid for r in results if r.error]
+    if failed:
+        _logger.error(f"Failed tools: {failed}")
+        exit(1)
+
 
 def _show_init_options() -> None:
     """Show init options"""
     _logger.info("You can initialize project using one of the options below:")
-    for kind in templates.DesignKind:
+    for kind in options.DesignKind:
         _logger.info(f"  playhdl init {kind}")
 
 
 def cmd_init(args: argparse.Namespace) -> None:
     """Initialize workspace in the current folder"""
+    from . import project, templates
+
     _logger.debug(f"Execute 'cmd_init' with {args}")
 
     if not args.mode:
@@ -82,7 +294,14 @@ def cmd_init(args: argparse.Namespace) -> None:
 
     # Init project file
     try:
-        project_descriptor = project.create(project_file, args.mode, [f.filename for f in source_files], user_settings)
+        project_descriptor = project.create(
+            project_file,
+            args.mode,
+            [f.filename for f in source_files] + args.sources,
+            user_settings,
+            waves_format=args.waves_format,
+            compile_strategy=args.compile_strategy,
+        )
         _logger.info(f"Save project file to '{project_file}' ...")
         project.dump(project_file, project_descriptor, query_force_yes=args.query_force_yes)
     except ValueError as e:
@@ -96,31 +315,165 @@ def cmd_init(args: argparse.Namespace) -> None:
 
 def cmd_setup(args: argparse.Namespace) -> None:
     """Setup configuration file with avaliable EDA"""
+    from . import settings
+
     _logger.debug(f"Execute 'cmd_setup' with {args}")
-    settings.setup(app_dir, user_settings_file, query_force_yes=args.query_force_yes)
+    settings.setup(
+        app_dir,
+        user_settings_file,
+        query_force_yes=args.query_force_yes,
+        roots=args.root,
+        probe_timeout=args.probe_timeout,
+    )
+
+
+def cmd_worker(args: argparse.Namespace) -> None:
+    """Execute commands submitted to the job queue"""
+    from . import backend
+
+    _logger.debug(f"Execute 'cmd_worker' with {args}")
+    try:
+        backend.Worker(args.queue_dir, jobs=args.jobs or (os.cpu_count() or 1)).serve()
+    except KeyboardInterrupt:
+        _logger.info("Worker was stopped")
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    """Serve requests of clients, keeping settings and projects loaded"""
+    from . import daemon
+
+    _logger.debug(f"Execute 'cmd_serve' with {args}")
+    try:
+        daemon.serve(args.socket or daemon.get_socket_file(app_dir))
+    except RuntimeError as e:
+        _logger.error(str(e))
+        exit(1)
+    except KeyboardInterrupt:
+        _logger.info("Daemon was stopped")
+
+
+def _request_daemon(args: argparse.Namespace) -> None:
+    """Execute command by the daemon"""
+    from . import daemon
+
+    if args.command not in daemon.COMMANDS:
+        _logger.error(f"Daemon serves only {daemon.COMMANDS} commands, but '{args.command}' was requested")
+        exit(2)
+
+    socket_file = daemon.get_socket_file(app_dir)
+    argv = [a for a in sys.argv[1:] if a != "--daemon"]
+    try:
+        code = daemon.request(socket_file, argv, Path.cwd(), sys.stdout)
+    except OSError as e:
+        _logger.error(f"Can't get result from the daemon on '{socket_file}': {e}. Run 'serve' command first.")
+        exit(1)
+    exit(code)
 
 
 def cmd_info(args: argparse.Namespace) -> None:
     """Print information about tools and configuration"""
+    from . import tools
+
     _logger.debug(f"Execute 'cmd_info' with {args}")
     user_settings = _load_settings(user_settings_file)
 
     available_tools = []
     for uid, tool_settings in user_settings.tools.items():
-        available_tools.append(f"{uid:>15}: {tool_settings.bin_dir}")
+        version = f" ({tool_settings.version})" if tool_settings.version else ""
+        available_tools.append(f"{uid:>15}: {tool_settings.bin_dir}{version}")
     newline = "\n"  # f-string expression part cannot include a backslash
     _logger.info(f"Tools available:\n{newline.join(available_tools)}")
     _logger.info(f"Tools compatibility table:\n{tools.get_compatibility_text_table()}")
 
 
-def parse_args() -> argparse.Namespace:
+def cmd_history(args: argparse.Namespace) -> None:
+    """Show history of the runs in the current workspace"""
+    from . import history
+
+    _logger.debug(f"Execute 'cmd_history' with {args}")
+    history_file = history.get_history_file(app_dir)
+    if not history_file.is_file():
+        _logger.error(f"History database '{history_file}' was not found. Run 'run' command first.")
+        exit(1)
+
+    project_path = str(Path.cwd())
+    runs = history.get_runs(history_file, project_path, args.tool, last=args.last)
+    if not runs:
+        _logger.error(f"There are no runs of '{project_path}' in the history database '{history_file}'")
+        exit(1)
+    slowest = history.get_slowest_stages(history_file, project_path, args.tool, limit=args.last)
+    _logger.info(f"Slowest stages:\n{history.get_slowest_text_table(slowest)}")
+    _logger.info(f"Last {len(runs)} runs:\n{history.get_trend_text_table(runs)}")
+    ranking = history.get_tools_ranking(history_file, project_path)
+    if ranking:
+        _logger.info(f"Tools from the fastest, passed runs only:\n{history.get_ranking_text_table(ranking)}")
+
+
+def _add_build_args(parser: argparse.ArgumentParser) -> None:
+    """Add arguments common for all commands, which build project"""
+    parser.add_argument("--rebuild", action="store_true", help="build even if sources haven't changed")
+    _add_define_arg(parser)
+
+
+def _add_define_arg(parser: argparse.ArgumentParser) -> None:
+    """Add argument to define macros for the compiler"""
+    parser.add_argument(
+        "-D",
+        "--define",
+        action="append",
+        metavar="NAME[=VALUE]",
+        help="define a macro for the compiler, can be repeated",
+    )
+
+
+def _add_run_args(parser: argparse.ArgumentParser) -> None:
+    """Add arguments common for all commands, which run tools"""
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="show only progress and the tail of the output on failure"
+    )
+    parser.add_argument("--tail", type=int, default=50, help="number of lines to show on failure in quiet mode")
+    parser.add_argument(
+        "--profile", action="store_true", help="save time and memory used by every command to the working directory"
+    )
+    parser.add_argument(
+        "--build-profile",
+        type=options.BuildProfile,
+        choices=list(options.BuildProfile),
+        default=options.BuildProfile.debug,
+        help="build with full debug visibility and waves, or without them for the fastest simulation",
+    )
+    parser.add_argument(
+        "--queue",
+        type=Path,
+        metavar="DIR",
+        help="execute commands by workers of the job queue in the shared directory instead of local processes",
+    )
+    parser.add_argument(
+        "--max-errors",
+        type=int,
+        default=0,
+        metavar="N",
+        help="abort a stage when the number of errors in its output exceeds N (0 - no limit), fatals always abort it",
+    )
+    parser.add_argument(
+        "--no-history", action="store_true", help=f"don't save the run to the history database '{app_dir}/history.db'"
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     """Parse CLI arguments"""
-    parser_descr = f"""playhdl {utils.get_pkg_version()}
-avaliable commands:
-    setup - setup configuration file with avaliable EDA
-    init  - initialize workspace in the current folder
-    run   - invoke simulation in the current workspace
-    info  - print information about tools and configuration
+    parser_descr = """avaliable commands:
+    setup   - setup configuration file with avaliable EDA
+    init    - initialize workspace in the current folder
+    run     - invoke simulation in the current workspace
+    build   - build project without running simulation
+    sim     - run simulation using the last build
+    regress - build once and run simulations with different seeds
+    bench   - compare build and simulation times of the tools
+    worker  - execute commands submitted to the job queue
+    serve   - serve run, build, sim and regress requests of clients
+    history - show history of the runs in the current workspace
+    info    - print information about tools and configuration
 
 add -h/--help argument to any command to get more information"""
 
@@ -130,40 +483,166 @@ add -h/--help argument to any command to get more information"""
     ):
         pass
 
-    parser = argparse.ArgumentParser(
+    class Parser(argparse.ArgumentParser):
+        def format_help(self) -> str:
+            # Version is looked up only to print help, so other commands don't load package metadata
+            self.description = f"playhdl {utils.get_pkg_version()}\n{parser_descr}"
+            return super().format_help()
+
+    parser = Parser(
+        prog="playhdl",
         description=parser_descr,
         formatter_class=CustomFormatter,
     )
     parser.add_argument("-y", dest="query_force_yes", action="store_true", help="answer 'yes' to all queries")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="execute command by the daemon started with 'serve' (socket: $PLAYHDL_SOCKET or the default one)",
+    )
 
-    subparsers = parser.add_subparsers(help="command to process", dest="command", required=True)
+    subparsers = parser.add_subparsers(
+        help="command to process", dest="command", required=True, parser_class=argparse.ArgumentParser
+    )
 
     parser_setup = subparsers.add_parser("setup")
+    parser_setup.add_argument(
+        "--root",
+        action="append",
+        metavar="GLOB",
+        help="glob of directories with tool executables to search in addition to PATH, e.g. '/tools/**/bin'",
+    )
+    parser_setup.add_argument("--probe-timeout", type=float, help="time limit of a tool version probe, s")
     parser_setup.set_defaults(func=cmd_setup)
 
     parser_init = subparsers.add_parser("init", formatter_class=CustomFormatter)
     parser_init.add_argument(
         "mode",
         nargs="?",
-        type=templates.DesignKind,
-        choices=list(templates.DesignKind),
+        type=options.DesignKind,
+        choices=list(options.DesignKind),
         help="design and testbench mode",
     )
+    parser_init.add_argument(
+        "--waves-format",
+        type=options.WavesFormat,
+        choices=list(options.WavesFormat),
+        default=options.WavesFormat.vcd,
+        help="format of waves dumped by Icarus and Verilator",
+    )
+    parser_init.add_argument(
+        "--compile-strategy",
+        type=options.CompileStrategy,
+        choices=list(options.CompileStrategy),
+        default=options.CompileStrategy.auto,
+        help="compile sources with a process per file or all at once (Modelsim, Xcelium, Vivado)",
+    )
+    parser_init.add_argument(
+        "--sources",
+        nargs="+",
+        default=[],
+        metavar="SOURCE",
+        help="extra sources of the project: files, glob patterns or file lists (.f)",
+    )
     parser_init.set_defaults(func=cmd_init)
 
     parser_run = subparsers.add_parser("run")
-    parser_run.add_argument("tool", nargs="?", type=tools.ToolUid, help="tool for simulation")
+    parser_run.add_argument("tool", nargs="*", type=str, help="tools for simulation")
+    parser_run.add_argument("--all", action="store_true", help="run all tools of the project at the same time")
     parser_run.add_argument("--waves", action="store_true", help="open waves after simulation ends")
+    parser_run.add_argument(
+        "--watch", action="store_true", help="run again every time sources or project file change, until Ctrl+C"
+    )
+    _add_build_args(parser_run)
+    _add_run_args(parser_run)
+    parser_run.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of parallel jobs for groups of independent build commands (0 - number of CPUs)",
+    )
     parser_run.set_defaults(func=cmd_run)
 
+    parser_build = subparsers.add_parser("build")
+    parser_build.add_argument("tool", nargs="?", type=str, help="tool for build")
+    _add_build_args(parser_build)
+    _add_run_args(parser_build)
+    parser_build.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of parallel jobs for groups of independent build commands (0 - number of CPUs)",
+    )
+    parser_build.set_defaults(func=cmd_build)
+
+    parser_sim = subparsers.add_parser("sim")
+    parser_sim.add_argument("tool", nargs="?", type=str, help="tool for simulation")
+    parser_sim.add_argument(
+        "plusargs", nargs="*", metavar="+PLUSARG", help="plusargs for the testbench, e.g. +UVM_TESTNAME=test"
+    )
+    parser_sim.add_argument("--name", help="name of the simulation directory, it is derived from plusargs by default")
+    _add_run_args(parser_sim)
+    parser_sim.set_defaults(func=cmd_sim)
+
+    parser_regress = subparsers.add_parser("regress")
+    parser_regress.add_argument("tool", nargs="?", type=str, help="tool for simulation")
+    parser_regress.add_argument("--seeds", type=int, default=1, help="number of simulations with different seeds")
+    parser_regress.add_argument("--base-seed", type=int, default=1, help="seed of the first simulation")
+    _add_build_args(parser_regress)
+    _add_run_args(parser_regress)
+    parser_regress.add_argument(
+        "-j", "--jobs", type=int, default=0, help="number of parallel jobs (0 - number of CPUs)"
+    )
+    parser_regress.set_defaults(func=cmd_regress)
+
+    parser_bench = subparsers.add_parser("bench")
+    parser_bench.add_argument("tool", nargs="*", type=str, help="tools to compare (default: all tools)")
+    parser_bench.add_argument("-n", "--repeats", type=int, default=5, help="number of measured runs of every tool")
+    parser_bench.add_argument("--warmup", type=int, default=1, help="number of discarded runs before measured ones")
+    parser_bench.add_argument(
+        "--json", type=Path, metavar="FILE", help="file to save the report to (default: '.playhdl/bench.json')"
+    )
+    _add_define_arg(parser_bench)
+    _add_run_args(parser_bench)
+    parser_bench.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of parallel jobs for groups of independent build commands (0 - number of CPUs)",
+    )
+    parser_bench.set_defaults(func=cmd_bench)
+
+    parser_worker = subparsers.add_parser("worker")
+    parser_worker.add_argument("queue_dir", type=Path, help="directory of the job queue shared with clients")
+    parser_worker.add_argument(
+        "-j", "--jobs", type=int, default=0, help="number of commands executed at the same time (0 - number of CPUs)"
+    )
+    parser_worker.set_defaults(func=cmd_worker)
+
+    parser_serve = subparsers.add_parser("serve")
+    parser_serve.add_argument(
+        "--socket", type=Path, help=f"socket to listen on (default: $PLAYHDL_SOCKET or '{app_dir}/daemon.sock')"
+    )
+    parser_serve.set_defaults(func=cmd_serve)
+
+    parser_history = subparsers.add_parser("history")
+    parser_history.add_argument("tool", nargs="?", type=str, help="show runs of the tool only")
+    parser_history.add_argument("--last", type=int, default=10, help="number of the last runs to show")
+    parser_history.set_defaults(func=cmd_history)
+
     parser_setup = subparsers.add_parser("info")
     parser_setup.set_defaults(func=cmd_info)
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def main() -> None:
     """Entry point to CLI of the application"""
     log.init_logger()
     args = parse_args()
+    if args.daemon:
+        _request_daemon(args)
     args.func(args)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple
+
+from . import cli, log
+
+_logger = log.get_logger()
+
+SOCKET_FILE = "daemon.sock"
+
+# Environment variable with the socket of the daemon, which overrides the default one
+SOCKET_ENV = "PLAYHDL_SOCKET"
+
+# Commands, which can be served by the daemon
+COMMANDS = ["run", "build", "sim", "regress"]
+
+# Time limit of receiving a request from a client, s
+REQUEST_TIMEOUT = 5.0
+
+
+class _Cache:
+    """Loaded files, which are invalidated when their modification time or size changes"""
+
+    def __init__(self) -> None:
+        self._entries: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+
+    def get(self, file: Path, loader: Callable[[Path], Any]) -> Optional[Any]:
+        """Get loaded file. None is returned if it can't be loaded, so the command reports the error itself."""
+        try:
+            stat = file.stat()
+        except OSError:
+            self._entries.pop(file, None)
+            return None
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(file)
+        if entry and entry[0] == stamp:
+            return entry[1]
+        try:
+            data = loader(file)
+        except (ValueError, TypeError, OSError) as e:
+            _logger.debug(f"Can't load '{file}': {e}")
+            self._entries.pop(file, None)
+            return None
+        _logger.info(f"Loaded '{file}'")
+        self._entries[file] = (stamp, data)
+        return data
+
+
+class _Request:
+    """Request of a client: command line arguments, the directory and the environment they are executed in"""
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.argv = [str(a) for a in data["argv"]]
+        self.cwd = Path(data["cwd"])
+        if not self.cwd.is_absolute():
+            raise ValueError(f"Directory '{self.cwd}' should be absolute")
+        env = data.get("env")
+        self.env = None if env is None else {str(k): str(v) for k, v in env.items()}
+
+
+def _send(wfile: IO[bytes], **msg: Any) -> None:
+    wfile.write(json.dumps(msg).encode() + b"\n")
+    wfile.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Handler of a request, which is executed in a forked process"""
+
+    server: _Server
+
+    def handle(self) -> None:
+        request, error = self.server.current
+        if error or not request:
+            _send(self.wfile, output=f"{error}\n")
+            _send(self.wfile, exit=2)
+            return
+
+        # Own process group allows to terminate the run with all tools, if the client disconnects
+        os.setsid()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        read_fd, write_fd = os.pipe()
+        for fd in [1, 2]:
+            os.dup2(write_fd, fd)
+        os.close(write_fd)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+
+        self._done = threading.Event()
+        threading.Thread(target=self._watch_client, daemon=True).start()
+        forwarder = threading.Thread(target=self._forward, args=(read_fd,))
+        forwarder.start()
+        code = self._execute(request)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        for fd in [1, 2]:
+            os.dup2(devnull, fd)
+        forwarder.join()
+        self._done.set()
+        _send(self.wfile, exit=code)
+
+    def _cancel(self) -> None:
+        """Terminate the run with all tools, because the client has gone"""
+        if not self._done.is_set():
+            os.killpg(0, signal.SIGTERM)
+
+    def _watch_client(self) -> None:
+        """Client sends nothing after the request, so end of the stream means it has gone"""
+        try:
+            while self.connection.recv(1 << 10):
+                pass
+        except OSError:
+            pass
+        self._cancel()
+
+    def _forward(self, read_fd: int) -> None:
+        """Send output to the client line by line"""
+        with os.fdopen(read_fd, "rb") as f:
+            for line in f:
+                try:
+                    _send(self.wfile, output=line.decode(errors="replace"))
+                except OSError:
+                    self._cancel()
+
+    def _execute(self, request: _Request) -> int:
+        """Execute command line in the requested directory and environment with preloaded settings and project"""
+        os.chdir(request.cwd)
+        if request.env is not None:
+            os.environ.clear()
+            os.environ.update(request.env)
+        cli.preloaded.update(self.server.preloaded)
+        try:
+            args = cli.parse_args(request.argv)
+            if args.command not in COMMANDS:
+                _logger.error(f"Daemon serves only {COMMANDS} commands, but '{args.command}' was requested")
+                return 2
+            args.func(args)
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else int(e.code is not None)
+        except Exception:
+            _logger.error(traceback.format_exc())
+            return 1
+        return 0
+
+
+class _Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """Server, which forks a process for every request. Request is read and files are loaded by the server itself,
+    so loaded files are cached for the next requests and shared with forked processes."""
+
+    def __init__(self, socket_file: Path) -> None:
+        # Socket is bound to a temporary file, which is renamed when the server listens,
+        # so clients never see the socket refusing connections
+        self.socket_file = socket_file
+        self.bound_file = socket_file.with_name(f"{socket_file.name}.{os.getpid()}.tmp")
+        super().__init__(str(self.bound_file), _Handler)
+        self.cache = _Cache()
+        self.current: Tuple[Optional[_Request], str] = (None, "")
+        self.preloaded: Dict[Path, Any] = {}
+
+    def server_activate(self) -> None:
+        super().server_activate()
+        os.replace(self.bound_file, self.socket_file)
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        from . import project, settings
+
+        self.current = self._receive(request)
+        self.preloaded = {}
+        req = self.current[0]
+        if req:
+            project_file = req.cwd.joinpath(cli.project_file)
+            for file, loader in [(cli.user_settings_file, settings.load), (project_file, project.load)]:
+                data = self.cache.get(file, loader)
+                if data is not None:
+                    self.preloaded[file] = data
+        super().process_request(request, client_address)
+
+    @staticmethod
+    def _receive(sock: socket.socket) -> Tuple[Optional[_Request], str]:
+        """Receive request line from the client"""
+        sock.settimeout(REQUEST_TIMEOUT)
+        try:
+            with sock.makefile("rb") as f:
+                line = f.readline()
+            request = _Request(json.loads(line))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return None, f"Bad request: {e}"
+        finally:
+            sock.settimeout(None)
+        _logger.info(f"Request: playhdl {' '.join(request.argv)} in '{request.cwd}'")
+        return request, ""
+
+
+def get_socket_file(app_dir: Path) -> Path:
+    """Get default socket of the daemon. It can be overridden by the environment variable."""
+    return Path(os.environ[SOCKET_ENV]) if os.environ.get(SOCKET_ENV) else app_dir.joinpath(SOCKET_FILE)
+
+
+def serve(socket_file: Path) -> None:
+    """Serve requests until the process is interrupted or terminated"""
+    if socket_file.exists():
+        try:
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.connect(str(socket_file))
+            raise RuntimeError(f"Daemon is already running on '{socket_file}'")
+        except (ConnectionRefusedError, FileNotFoundError):
+            socket_file.unlink(missing_ok=True)
+
+    # Modules of the commands are imported once, so forked processes inherit them instead of importing on every request
+    from . import runner  # noqa: F401
+
+    socket_file.parent.mkdir(parents=True, exist_ok=True)
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    with _Server(socket_file) as server:
+        _logger.info(f"Serve requests on '{socket_file}'. Press Ctrl+C to stop.")
+        try:
+            server.serve_forever()
+        finally:
+            socket_file.unlink(missing_ok=True)
+
+
+def request(socket_file: Path, argv: List[str], cwd: Path, out: IO[str]) -> int:
+    """Send command line with the environment of the client to the daemon, write its output and return exit code"""
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(str(socket_file))
+        data = {"argv": argv, "cwd": str(cwd.absolute()), "env": dict(os.environ)}
+        sock.sendall(json.dumps(data).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            for line in f:
+                msg = json.loads(line)
+                if "exit" in msg:
+                    return int(msg["exit"])
+                out.write(msg.get("output", ""))
+                out.flush()
+    raise ConnectionError("Daemon closed connection without exit code")
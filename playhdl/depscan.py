@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from . import log, utils
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+_logger = log.get_logger()
+
+# Cache of scanned files in the project state directory, it is keyed by content hash of the file
+CACHE_FILE = "depscan.json"
+
+# Version of the scanner, cache of another version is dropped
+SCANNER_VERSION = 1
+
+_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r'"(?:\\.|[^"\\\n])*"')
+_INCLUDE_RE = re.compile(r'`include\s+(?:"([^"]+)"|<([^>]+)>)')
+_DECLARATION_RE = re.compile(
+    r"^\s*(?:extern\s+)?(package|module|macromodule|interface|program)\s+(?:(?:static|automatic)\s+)?(?!class\b)(\w+)",
+    re.MULTILINE,
+)
+_SCOPE_RE = re.compile(r"\b(\w+)\s*::")
+_REFERENCE_RES = [
+    # Instance: dut #(...) u_dut (...), dut u_dut[3:0] (...)
+    re.compile(r"^\s*(\w+)\s*(?:#\s*\(|\w+\s*(?:\[[^\]]*\]\s*)*\()", re.MULTILINE),
+    # Interface port with modport: axi_if.master bus
+    re.compile(r"\b(\w+)\s*\.\s*\w+\s+\w+"),
+    # Virtual interface: virtual axi_if vif
+    re.compile(r"\bvirtual\s+(?:interface\s+)?(\w+)"),
+    # Interface port: (axi_if bus, ...)
+    re.compile(r"[(,]\s*(\w+)\s+\w+\s*(?:\[[^\]]*\]\s*)*(?=[,)])"),
+]
+
+
+@dataclass
+class FileInfo:
+    """Design units declared and referenced by a source file"""
+
+    packages: List[str] = field(default_factory=list)
+    units: List[str] = field(default_factory=list)
+    scopes: List[str] = field(default_factory=list)
+    references: List[str] = field(default_factory=list)
+    includes: List[str] = field(default_factory=list)
+
+
+def scan_text(text: str) -> FileInfo:
+    """Scan Verilog/SystemVerilog code. Scanner doesn't parse the language, so references are candidates,
+    which are resolved against the units declared by the project sources."""
+    text = _COMMENT_RE.sub(" ", text)
+    includes = [m[0] or m[1] for m in _INCLUDE_RE.findall(text)]
+    text = _STRING_RE.sub('""', text)
+
+    info = FileInfo(includes=list(dict.fromkeys(includes)))
+    for kind, name in _DECLARATION_RE.findall(text):
+        (info.packages if kind == "package" else info.units).append(name)
+    info.scopes = sorted(set(_SCOPE_RE.findall(text)) - set(info.packages))
+    references: Set[str] = set()
+    for regex in _REFERENCE_RES:
+        references.update(regex.findall(text))
+    info.references = sorted(references - set(info.units))
+    return info
+
+
+def get_cache_file() -> Path:
+    return utils.get_state_file(CACHE_FILE)
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass
+class Graph:
+    """Dependencies between the sources. Files which declare imported packages have to be compiled first,
+    and a file has to be recompiled if any of its dependencies or included files changes."""
+
+    files: List[str]
+    imports: Dict[str, List[str]]
+    deps: Dict[str, List[str]]
+    hashes: Dict[str, str]
+    includes: Dict[str, List[str]]
+
+    def get_included_files(self) -> List[str]:
+        """Get all files included by the sources, nested ones too"""
+        return list(dict.fromkeys(path for paths in self.includes.values() for path in paths))
+
+    def get_groups(self) -> List[List[str]]:
+        """Split files to groups, which can be compiled in parallel. Group depends only on the previous ones,
+        files keep their order inside the group."""
+        remaining = {f: set(self.imports.get(f, [])) for f in self.files}
+        groups = []
+        while remaining:
+            ready = [f for f, deps in remaining.items() if not deps]
+            if not ready:
+                ready = [next(iter(remaining))]
+                _logger.warning(f"'{ready[0]}' is a part of circular package imports, so the order of sources is used")
+            groups.append(ready)
+            for f in ready:
+                del remaining[f]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return groups
+
+    def get_dependents(self, changed: Set[str]) -> Set[str]:
+        """Get changed files and all files depending on them"""
+        dependents: Dict[str, List[str]] = {}
+        for f, deps in self.deps.items():
+            for d in deps:
+                dependents.setdefault(d, []).append(f)
+        result = set()
+        stack = list(changed)
+        while stack:
+            f = stack.pop()
+            if f not in result:
+                result.add(f)
+                stack.extend(dependents.get(f, []))
+        return result
+
+
+class Scanner:
+    """Scanner of the sources with results cached by content hash of every file"""
+
+    def __init__(self, cache_file: Optional[Path] = None) -> None:
+        self.cache_file = cache_file
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._used: Set[str] = set()
+        self._modified = False
+        if cache_file:
+            try:
+                data = utils.load_json(cache_file)
+                if data.get("version") == SCANNER_VERSION:
+                    self._cache = data["files"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def _scan_file(self, file: str) -> Optional[Tuple[str, FileInfo]]:
+        """Get content hash and scan results of the file. None is returned if it can't be read."""
+        try:
+            # Plain open() is used, since it's called for every source on every build
+            with open(file, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        digest = _hash(data)
+        self._used.add(digest)
+        if digest in self._cache:
+            return digest, FileInfo(**self._cache[digest])
+        info = scan_text(data.decode(errors="replace"))
+        self._cache[digest] = dataclasses.asdict(info)
+        self._modified = True
+        return digest, info
+
+    def _find_include(self, name: str, file: str, include_dirs: List[str]) -> Optional[str]:
+        """Find included file: next to the including one, in the include directories or in the project directory"""
+        for d in [os.path.dirname(file)] + include_dirs + [""]:
+            path = os.path.join(d, name)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def _get_included(
+        self, file: str, includes: List[str], include_dirs: List[str], seen: Set[str]
+    ) -> List[Tuple[str, str]]:
+        """Get paths and hashes of the included files, nested ones too"""
+        included = []
+        for name in includes:
+            path = self._find_include(name, file, include_dirs)
+            if path is None or path in seen:
+                continue
+            seen.add(path)
+            scanned = self._scan_file(path)
+            if scanned:
+                included.append((path, scanned[0]))
+                included.extend(self._get_included(path, scanned[1].includes, include_dirs, seen))
+        return included
+
+    def scan(self, files: List[str], include_dirs: Optional[List[str]] = None) -> Graph:
+        """Scan the files and build a graph of their dependencies"""
+        include_dirs = include_dirs or []
+        infos: Dict[str, FileInfo] = {}
+        hashes = {}
+        includes = {}
+        for f in files:
+            scanned = self._scan_file(f)
+            if scanned is None:
+                continue
+            digest, infos[f] = scanned
+            included = self._get_included(f, infos[f].includes, include_dirs, set())
+            includes[f] = [path for path, _ in included]
+            hashes[f] = _hash(" ".join([digest] + [h for _, h in included]).encode()) if included else digest
+
+        # The first declaration wins, like in the most tools
+        packages: Dict[str, str] = {}
+        units: Dict[str, str] = {}
+        for f, info in infos.items():
+            for p in info.packages:
+                packages.setdefault(p, f)
+            for u in info.units:
+                units.setdefault(u, f)
+
+        imports = {}
+        deps = {}
+        for f, info in infos.items():
+            imports[f] = sorted({packages[s] for s in info.scopes if s in packages} - {f})
+            referenced = {units[r] for r in info.references if r in units} - {f}
+            deps[f] = sorted(set(imports[f]) | referenced)
+        self._save()
+        return Graph(files=list(files), imports=imports, deps=deps, hashes=hashes, includes=includes)
+
+    def _save(self) -> None:
+        """Save cache with the files scanned last time, so it doesn't grow with every edit"""
+        if not self.cache_file or not self._modified:
+            return
+        files = {k: v for k, v in self._cache.items() if k in self._used}
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            utils.dump_json(self.cache_file, {"version": SCANNER_VERSION, "files": files})
+        except OSError as e:
+            _logger.debug(f"Can't save cache of the dependency scanner '{self.cache_file}': {e}")
+        self._modified = False
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import dataclasses
+import re
+import threading
+from dataclasses import dataclass
+from enum import auto
+from typing import Dict, List, Optional, Pattern, Tuple, TYPE_CHECKING
+
+from . import utils
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Suffix of the file with diagnostics of the stage, which is saved next to its log
+REPORT_SUFFIX = ".diagnostics.json"
+
+# Only this number of unique diagnostics is kept, the rest are just counted
+MAX_DIAGNOSTICS = 1000
+
+# Longer messages are truncated
+MAX_MESSAGE_LEN = 500
+
+
+class Severity(utils.ExtendedEnum):
+    fatal = auto()
+    error = auto()
+    warning = auto()
+
+
+# Regular expression of a diagnostic message. Named groups 'file' and 'line' can provide its location.
+DiagnosticPattern = Tuple[Severity, Pattern[str]]
+
+# Locations, which are searched if the diagnostic pattern doesn't provide one
+_LOCATION_RES = [
+    # VCS: Error: "tb.sv", 10: ...
+    re.compile(r"\"(?P<file>[^\"]+)\",\s*(?P<line>\d+)"),
+    # Assertions of Modelsim and Vivado: ... Scope: tb File: tb.sv Line: 10
+    re.compile(r"\bFile: (?P<file>\S+) Line: (?P<line>\d+)"),
+    # Modelsim and UVM: tb.sv(10)
+    re.compile(r"(?P<file>[^\s()\[\]'\",:]+\.\w+)\((?P<line>\d+)\)"),
+    # Verilator, Icarus and Vivado: tb.sv:10
+    re.compile(r"(?P<file>[^\s()\[\]'\",:]+\.\w+):(?P<line>\d+)"),
+]
+
+# Locations, which are printed on the line after the diagnostic
+_NEXT_LINE_LOCATION_RES = [
+    # VCS: Error-[IND] Identifier not declared
+    #      tb.sv, 10
+    re.compile(r"^\s*(?P<file>[^\s,]+\.\w+),\s*(?P<line>\d+)\s*$"),
+    _LOCATION_RES[1],
+]
+
+
+class AbortError(RuntimeError):
+    """Execution was aborted because of the diagnostics in the output"""
+
+
+@dataclass
+class Diagnostic:
+    severity: Severity
+    message: str
+    file: str = ""
+    line: int = 0
+    count: int = 1
+
+    def __str__(self) -> str:
+        location = f"{self.file}:{self.line}: " if self.file else ""
+        repeats = f" (x{self.count})" if self.count > 1 else ""
+        return f"{location}{self.severity}: {self.message}{repeats}"
+
+
+@dataclass
+class Report:
+    counts: Dict[Severity, int]
+    diagnostics: List[Diagnostic]
+    aborted: str = ""
+
+    def get_worst(self, limit: int) -> List[Diagnostic]:
+        """Get the first fatals and errors"""
+        order = list(Severity)
+        worst = [d for d in self.diagnostics if d.severity != Severity.warning]
+        return sorted(worst, key=lambda d: order.index(d.severity))[:limit]
+
+    def dump(self, file: Path) -> None:
+        """Save report to a JSON file"""
+        data = {
+            "counts": {str(k): v for k, v in self.counts.items()},
+            "aborted": self.aborted,
+            "diagnostics": [dataclasses.asdict(d) for d in self.diagnostics],
+        }
+        utils.dump_json(file, data)
+
+    def __str__(self) -> str:
+        return ", ".join(f"{s}: {self.counts[s]}" for s in Severity)
+
+
+def _search_location(line: str, regexes: List[Pattern[str]]) -> Optional[Tuple[str, int]]:
+    for regex in regexes:
+        match = regex.search(line)
+        if match:
+            return match["file"], int(match["line"])
+    return None
+
+
+class Collector:
+    """Collector of diagnostics from the output, which is fed line by line while commands are running.
+    Error is raised from the feed to abort execution on the first fatal or when the number of errors exceeds the limit.
+    """
+
+    def __init__(self, patterns: List[DiagnosticPattern], max_errors: int = 0) -> None:
+        self.patterns = patterns
+        self.max_errors = max_errors
+        self.counts = {s: 0 for s in Severity}
+        self.aborted = ""
+        self._diagnostics: Dict[Tuple[Severity, str, str, int], Diagnostic] = {}
+        self._pending: Optional[Diagnostic] = None
+        self._lock = threading.Lock()
+
+    def feed(self, data: bytes) -> None:
+        """Feed chunk of complete lines"""
+        with self._lock:
+            for line in data.decode(errors="replace").splitlines():
+                self._feed_line(line)
+            if self.aborted:
+                raise AbortError(self.aborted)
+
+    def _feed_line(self, line: str) -> None:
+        diag = self._match(line)
+        if diag is None:
+            if self._pending and not self._pending.file:
+                location = _search_location(line, _NEXT_LINE_LOCATION_RES)
+                if location:
+                    self._pending.file, self._pending.line = location
+            self._flush()
+            return
+
+        self._flush()
+        self._pending = diag
+        self.counts[diag.severity] += 1
+        if self.aborted:
+            return
+        if diag.severity == Severity.fatal:
+            self.aborted = f"fatal diagnostic '{diag.message}'"
+        elif self.max_errors and self.counts[Severity.error] > self.max_errors:
+            self.aborted = f"number of errors exceeds {self.max_errors}"
+
+    def _match(self, line: str) -> Optional[Diagnostic]:
+        """Create diagnostic if the line matches any pattern"""
+        for severity, regex in self.patterns:
+            match = regex.search(line)
+            if not match:
+                continue
+            groups = match.groupdict()
+            location: Optional[Tuple[str, int]] = None
+            if groups.get("file") and groups.get("line"):
+                location = groups["file"], int(groups["line"])
+            else:
+                location = _search_location(line, _LOCATION_RES)
+            message = line.strip().lstrip("#").strip()[:MAX_MESSAGE_LEN]
+            file, lineno = location or ("", 0)
+            return Diagnostic(severity=severity, message=message, file=file, line=lineno)
+        return None
+
+    def _flush(self) -> None:
+        """Register pending diagnostic. Identical ones are merged."""
+        diag, self._pending = self._pending, None
+        if diag is None:
+            return
+        key = (diag.severity, diag.message, diag.file, diag.line)
+        if key in self._diagnostics:
+            self._diagnostics[key].count += 1
+        elif len(self._diagnostics) < MAX_DIAGNOSTICS:
+            self._diagnostics[key] = diag
+
+    def get_report(self) -> Report:
+        """Get report of all diagnostics collected"""
+        with self._lock:
+            self._flush()
+            diagnostics = [dataclasses.replace(d) for d in self._diagnostics.values()]
+            return Report(counts=dict(self.counts), diagnostics=diagnostics, aborted=self.aborted)
+
+
+def get_report_file(cwd: Path, stage_name: str) -> Path:
+    """Get file with diagnostics of the stage"""
+    return cwd.joinpath(f"{stage_name}{REPORT_SUFFIX}")
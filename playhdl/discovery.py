@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import glob
+import os
+import signal
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import log, tools, utils
+
+_logger = log.get_logger()
+
+DISCOVERY_CACHE_FILE = "discovery.json"
+
+# Globs of directories, where tools are usually installed, in addition to PATH
+DEFAULT_ROOTS = ["/opt/*/bin", "/opt/*/*/bin"]
+
+# Number of threads used to scan directories and probe versions, mostly waiting for (network) filesystem
+DISCOVERY_JOBS = 32
+
+# Time limit of a single version probe
+PROBE_TIMEOUT = 10.0
+
+
+@dataclass
+class Installation:
+    kind: tools.ToolKind
+    bin_dir: Path
+    version: Optional[str] = None
+
+
+def _get_mtimes(dirs: List[str]) -> Dict[str, int]:
+    """Get modification times of the directories, missing ones get zero"""
+    mtimes = {}
+    for d in dirs:
+        try:
+            mtimes[d] = os.stat(d).st_mtime_ns
+        except OSError:
+            mtimes[d] = 0
+    return mtimes
+
+
+class _Cache:
+    """Results of the previous discovery. Directories are keyed on mtime, executables are keyed on mtime and size.
+    Matches of the roots are keyed on mtimes of the directories, where new matches can appear."""
+
+    def __init__(self, file: Optional[Path]) -> None:
+        self.file = file
+        self._lock = threading.Lock()
+        self.dirs: Dict[str, Any] = {}
+        self.versions: Dict[str, Any] = {}
+        self.roots: Dict[str, Any] = {}
+        if file:
+            try:
+                data = utils.load_json(file)
+                self.dirs = dict(data.get("dirs", {}))
+                self.versions = dict(data.get("versions", {}))
+                self.roots = dict(data.get("roots", {}))
+            except (OSError, ValueError):
+                pass
+
+    def get_kinds(self, bin_dir: str, mtime: int) -> Optional[List[str]]:
+        entry = self.dirs.get(bin_dir)
+        return entry["kinds"] if entry and entry["mtime"] == mtime else None
+
+    def set_kinds(self, bin_dir: str, mtime: int, kinds: List[str]) -> None:
+        with self._lock:
+            self.dirs[bin_dir] = {"mtime": mtime, "kinds": kinds}
+
+    def get_version(self, exe: str, stamp: str) -> Optional[str]:
+        entry = self.versions.get(exe)
+        return entry["version"] if entry and entry["stamp"] == stamp else None
+
+    def set_version(self, exe: str, stamp: str, version: str) -> None:
+        with self._lock:
+            self.versions[exe] = {"stamp": stamp, "version": version}
+
+    def get_matches(self, root: str) -> Optional[List[str]]:
+        entry = self.roots.get(root)
+        return entry["matches"] if entry and entry["mtimes"] == _get_mtimes(list(entry["mtimes"])) else None
+
+    def set_matches(self, root: str, mtimes: Dict[str, int], matches: List[str]) -> None:
+        with self._lock:
+            self.roots[root] = {"mtimes": mtimes, "matches": matches}
+
+    def dump(self) -> None:
+        if not self.file:
+            return
+        try:
+            utils.dump_json(self.file, {"dirs": self.dirs, "versions": self.versions, "roots": self.roots})
+        except OSError as e:
+            _logger.debug(f"Can't save discovery cache to '{self.file}': {e}")
+
+
+def _get_watched_dirs(root: str, matches: List[str]) -> List[str]:
+    """Get directories, which change when new matches of the root appear: the leading directory of the root
+    without wildcards, the matches and their parents inside it"""
+    parts = []
+    for part in Path(root).parts:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    base = os.path.join(*parts) if parts else ""
+    dirs = {base or "."}
+    for match in matches:
+        parent = match
+        while len(parent) > len(base) and parent not in dirs:
+            dirs.add(parent)
+            parent = os.path.dirname(parent)
+    return sorted(dirs)
+
+
+def _glob_root(root: str, cache: _Cache) -> List[str]:
+    """Expand glob of the installation root. Large trees are not walked again, if they were not changed."""
+    root = os.path.expanduser(root)
+    matches = cache.get_matches(root)
+    if matches is None:
+        matches = sorted(glob.glob(root, recursive=True))
+        cache.set_matches(root, _get_mtimes(_get_watched_dirs(root, matches)), matches)
+    return matches
+
+
+def _expand_roots(roots: List[str], pool: ThreadPoolExecutor, cache: _Cache) -> List[str]:
+    """Get directories to scan: PATH goes first to keep its priority, then expanded globs of installation roots"""
+    dirs = [d for d in os.environ.get("PATH", "").split(os.pathsep) if d]
+    for matches in pool.map(lambda r: _glob_root(r, cache), roots):
+        dirs.extend(matches)
+
+    unique: Dict[str, str] = {}
+    for d in dirs:
+        real = os.path.realpath(d)
+        if real not in unique:
+            unique[real] = d
+    return list(unique.values())
+
+
+def _scan_dir(bin_dir: str, cache: _Cache) -> List[tools.ToolKind]:
+    """Get kinds of tools installed to the directory"""
+    try:
+        mtime = os.stat(bin_dir).st_mtime_ns
+    except OSError:
+        return []
+
+    kinds = cache.get_kinds(bin_dir, mtime)
+    if kinds is None:
+        kinds = []
+        for kind in tools.ToolKind:
+            exe = tools.get_version_cmd(kind, Path(bin_dir))[0]
+            if os.path.isfile(exe) and os.access(exe, os.X_OK):
+                kinds.append(str(kind))
+        cache.set_kinds(bin_dir, mtime, kinds)
+    return [tools.ToolKind(k) for k in kinds]
+
+
+def _run_probe(cmd: List[str], timeout: float) -> str:
+    """Run version command and get its output. Whole process group is killed on timeout,
+    because tools are often shell wrappers which spawn the real executable."""
+    with subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    ) as proc:
+        try:
+            stdout, _ = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.communicate()
+            raise
+    return stdout.decode(errors="replace")
+
+
+def _probe_version(kind: tools.ToolKind, bin_dir: str, cache: _Cache, timeout: float) -> Optional[str]:
+    """Get version of the tool. Failed probes are not cached to be retried next time."""
+    cmd = tools.get_version_cmd(kind, Path(bin_dir))
+    try:
+        stat = os.stat(cmd[0])
+    except OSError:
+        return None
+
+    stamp = f"{stat.st_mtime_ns}:{stat.st_size}"
+    version = cache.get_version(cmd[0], stamp)
+    if version is None:
+        try:
+            version = tools.parse_version(_run_probe(cmd, timeout))
+        except subprocess.TimeoutExpired:
+            _logger.warning(f"Version probe '{' '.join(cmd)}' timed out after {timeout} s")
+            return None
+        except OSError as e:
+            _logger.debug(f"Version probe '{' '.join(cmd)}' failed: {e}")
+            return None
+        if version:
+            cache.set_version(cmd[0], stamp, version)
+    return version
+
+
+def discover(cache_file: Optional[Path] = None, **kwargs: Any) -> List[Installation]:
+    """Find all tools installed to PATH and installation roots, and probe their versions.
+    Installations go in the order of directories, so the first one of each kind is the one found in PATH."""
+    roots = DEFAULT_ROOTS + list(kwargs.get("roots") or [])
+    timeout = float(kwargs.get("probe_timeout") or PROBE_TIMEOUT)
+    cache = _Cache(cache_file)
+
+    with ThreadPoolExecutor(max_workers=DISCOVERY_JOBS) as pool:
+        dirs = _expand_roots(roots, pool, cache)
+        _logger.debug(f"Scan {len(dirs)} directories for tools")
+        hits: List[Tuple[tools.ToolKind, str]] = []
+        for d, kinds in zip(dirs, pool.map(lambda d: _scan_dir(d, cache), dirs)):
+            hits.extend((k, d) for k in kinds)
+        versions = list(pool.map(lambda hit: _probe_version(hit[0], hit[1], cache, timeout), hits))
+
+    cache.dump()
+    return [Installation(kind=k, bin_dir=Path(d), version=v) for (k, d), v in zip(hits, versions)]
+
+
+def get_uids(installations: List[Installation]) -> List[tools.ToolUid]:
+    """Get unique identifiers of the installations. The first installation of a kind is named after the kind,
+    others also get the version."""
+    uids: List[tools.ToolUid] = []
+    for inst in installations:
+        uid = str(inst.kind)
+        if uid in uids and inst.version:
+            uid = f"{inst.kind}-{inst.version}"
+        base, n = uid, 1
+        while uid in uids:
+            n += 1
+            uid = f"{base}-{n}"
+        uids.append(uid)
+    return uids
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import glob
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from . import log
+
+_logger = log.get_logger()
+
+# Characters of glob patterns
+_GLOB_CHARS = "*?["
+
+# Suffix of a source, which is a file list
+FILE_LIST_SUFFIX = ".f"
+
+# Options of file lists, which are not supported, but take an argument
+_OPTIONS_WITH_ARG = ["-v", "-y"]
+
+
+@dataclass
+class Sources:
+    """Sources expanded from the project: files, include directories and macros from the file lists"""
+
+    files: List[str] = field(default_factory=list)
+    include_dirs: List[str] = field(default_factory=list)
+    defines: List[str] = field(default_factory=list)
+    lists: List[str] = field(default_factory=list)
+
+    def get_inputs(self) -> List[str]:
+        """Get all files the build depends on: sources and the file lists they come from"""
+        return self.files + self.lists
+
+
+def is_pattern(source: str) -> bool:
+    """Check that source of the project is a glob pattern or a file list, which is expanded at run time"""
+    return any(c in source for c in _GLOB_CHARS) or _parse_list_ref(source) is not None
+
+
+def has_patterns(sources: List[str]) -> bool:
+    """Check that any of the project sources is expanded at run time"""
+    return any(is_pattern(s) for s in sources)
+
+
+def _parse_list_ref(source: str) -> Optional[str]:
+    """Get option of a file list reference: '-f' for 'a.f' and '-f a.f', '-F' for '-F a.f'"""
+    parts = source.split(maxsplit=1)
+    if len(parts) == 2 and parts[0] in ["-f", "-F"]:
+        return parts[0]
+    if len(parts) == 1 and source.endswith(FILE_LIST_SUFFIX):
+        return "-f"
+    return None
+
+
+def expand(sources: List[str]) -> Sources:
+    """Expand sources of the project in their order. Entries can be paths, glob patterns (recursive with '**')
+    and file lists. Paths are relative to the project directory, duplicates are dropped."""
+    result = Sources()
+    for source in sources:
+        option = _parse_list_ref(source)
+        if option:
+            list_file = source.split(maxsplit=1)[-1]
+            _read_list(Path(os.path.expandvars(list_file)), option == "-F", result, [])
+        elif is_pattern(source):
+            files = sorted(glob.glob(source, recursive=True))
+            if not files:
+                raise ValueError(f"Source pattern '{source}' doesn't match any file")
+            result.files.extend(files)
+        else:
+            result.files.append(source)
+
+    for name in ["files", "include_dirs", "defines", "lists"]:
+        setattr(result, name, list(dict.fromkeys(getattr(result, name))))
+    return result
+
+
+def _read_list(list_file: Path, relative: bool, result: Sources, stack: List[Path]) -> None:
+    """Read file list. Paths in it are relative to the project directory (-f) or to the file list itself (-F).
+    Comments, environment variables and nested file lists are supported."""
+    if list_file.resolve() in stack:
+        raise ValueError(f"File list '{list_file}' includes itself")
+    try:
+        text = list_file.read_text()
+    except OSError as e:
+        raise ValueError(f"Can't read file list '{list_file}': {e}") from e
+    result.lists.append(str(list_file))
+
+    def resolve(path: str) -> str:
+        path = os.path.expandvars(path)
+        if relative and not os.path.isabs(path):
+            path = os.path.normpath(list_file.parent.joinpath(path))
+        return path
+
+    tokens = []
+    for line in text.splitlines():
+        line = line.split("//", 1)[0]
+        if not line.lstrip().startswith("#"):
+            tokens.extend(line.split())
+
+    stack = stack + [list_file.resolve()]
+    it = iter(tokens)
+    for token in it:
+        if token in ["-f", "-F"]:
+            nested = next(it, None)
+            if nested is None:
+                raise ValueError(f"File list '{list_file}' has '{token}' without a file")
+            _read_list(Path(resolve(nested)), token == "-F", result, stack)
+        elif token.startswith("+incdir+"):
+            for d in token[len("+incdir+") :].split("+"):  # noqa: E203
+                if d:
+                    result.include_dirs.append(resolve(d))
+        elif token.startswith("+define+"):
+            for d in token[len("+define+") :].split("+"):  # noqa: E203
+                if d:
+                    result.defines.append(os.path.expandvars(d))
+        elif token.startswith(("-", "+")):
+            if token in _OPTIONS_WITH_ARG:
+                token = f"{token} {next(it, '')}"
+            _logger.warning(f"Option '{token}' of the file list '{list_file}' is not supported and ignored")
+        else:
+            result.files.append(resolve(token))
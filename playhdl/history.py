@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import contextlib
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from enum import auto
+from typing import Any, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from . import log, utils
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from . import profiling
+
+_logger = log.get_logger()
+
+HISTORY_FILE = "history.db"
+
+# Version of the database schema, database of another version is recreated
+SCHEMA_VERSION = 1
+
+# Time limit of waiting for the database locked by another playhdl process, s
+LOCK_TIMEOUT = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    project TEXT NOT NULL,
+    tool_uid TEXT NOT NULL,
+    tool_kind TEXT NOT NULL,
+    tool_version TEXT NOT NULL,
+    sources_hash TEXT NOT NULL,
+    wall REAL NOT NULL,
+    max_rss_kb INTEGER NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    wall REAL NOT NULL,
+    user REAL NOT NULL,
+    sys REAL NOT NULL,
+    max_rss_kb INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_project ON runs(project, tool_uid);
+CREATE INDEX IF NOT EXISTS stages_run ON stages(run_id);
+"""
+
+
+class RunStatus(utils.ExtendedEnum):
+    passed = auto()
+    failed = auto()
+    cancelled = auto()
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    wall: float
+    user: float = 0.0
+    sys: float = 0.0
+    max_rss_kb: int = 0
+
+
+@dataclass
+class RunRecord:
+    time: float
+    project: str
+    tool_uid: str
+    tool_kind: str
+    tool_version: str
+    sources_hash: str
+    wall: float
+    max_rss_kb: int
+    status: RunStatus
+    stages: List[StageRecord] = field(default_factory=list)
+
+    def get_stage_wall(self, stage: str) -> Optional[float]:
+        """Get wall time of the stage. None is returned if the stage wasn't executed, e.g. build was up to date."""
+        for s in self.stages:
+            if s.stage == stage:
+                return s.wall
+        return None
+
+
+def get_history_file(app_dir: Path) -> Path:
+    """Get default history database"""
+    return app_dir.joinpath(HISTORY_FILE)
+
+
+def create_record(profiler: profiling.Profiler, start: float, status: RunStatus, **kwargs: Any) -> RunRecord:
+    """Create record of the run from the commands collected by the profiler. Other fields are passed as kwargs."""
+    report = profiler.get_report()
+    elapsed = profiler.get_elapsed()
+    stages = [
+        StageRecord(stage=name, wall=elapsed[name], user=u["user"], sys=u["sys"], max_rss_kb=u["max_rss_kb"])
+        for name, u in report["stages"].items()
+    ]
+    max_rss_kb = max([s.max_rss_kb for s in stages], default=0)
+    return RunRecord(
+        time=start, wall=time.time() - start, max_rss_kb=max_rss_kb, status=status, stages=stages, **kwargs
+    )
+
+
+@contextlib.contextmanager
+def _connect(db_file: Path) -> Iterator[sqlite3.Connection]:
+    """Connect to the database and create its schema if needed"""
+    db_file.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_file, timeout=LOCK_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            conn.execute("PRAGMA foreign_keys = ON")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version not in [0, SCHEMA_VERSION]:
+                _logger.warning(f"History database '{db_file}' has unsupported version {version}. It is recreated.")
+                conn.executescript("DROP TABLE IF EXISTS stages; DROP TABLE IF EXISTS runs;")
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        yield conn
+    finally:
+        conn.close()
+
+
+def add_run(db_file: Path, record: RunRecord) -> None:
+    """Append record of the run to the database"""
+    with _connect(db_file) as conn, conn:
+        cursor = conn.execute(
+            "INSERT INTO runs"
+            " (time, project, tool_uid, tool_kind, tool_version, sources_hash, wall, max_rss_kb, status)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                record.time,
+                record.project,
+                record.tool_uid,
+                record.tool_kind,
+                record.tool_version,
+                record.sources_hash,
+                record.wall,
+                record.max_rss_kb,
+                str(record.status),
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO stages (run_id, stage, wall, user, sys, max_rss_kb) VALUES (?, ?, ?, ?, ?, ?)",
+            [(cursor.lastrowid, s.stage, s.wall, s.user, s.sys, s.max_rss_kb) for s in record.stages],
+        )
+
+
+def _get_filter(project: str, tool_uid: Optional[str]) -> Tuple[str, Tuple[str, ...]]:
+    """Get condition on runs of the project and optionally of the tool"""
+    if tool_uid:
+        return "r.project = ? AND r.tool_uid = ?", (project, tool_uid)
+    return "r.project = ?", (project,)
+
+
+def get_runs(db_file: Path, project: str, tool_uid: Optional[str] = None, last: int = 10) -> List[RunRecord]:
+    """Get the last runs of the project, the oldest go first"""
+    where, params = _get_filter(project, tool_uid)
+    with _connect(db_file) as conn:
+        rows = conn.execute(
+            f"SELECT * FROM runs r WHERE {where} ORDER BY r.id DESC LIMIT ?", (*params, last)
+        ).fetchall()
+        records = []
+        for row in reversed(rows):
+            stages = conn.execute(
+                "SELECT stage, wall, user, sys, max_rss_kb FROM stages WHERE run_id = ?", (row["id"],)
+            ).fetchall()
+            data = {k: row[k] for k in row.keys() if k != "id"}
+            data["status"] = RunStatus(data["status"])
+            records.append(RunRecord(**data, stages=[StageRecord(**dict(s)) for s in stages]))
+    return records
+
+
+def get_slowest_stages(db_file: Path, project: str, tool_uid: Optional[str] = None, limit: int = 10) -> List[Dict]:
+    """Get stages of the project with the longest average time"""
+    where, params = _get_filter(project, tool_uid)
+    with _connect(db_file) as conn:
+        rows = conn.execute(
+            "SELECT r.tool_uid, s.stage, COUNT(*) AS runs, AVG(s.wall) AS avg, MAX(s.wall) AS max,"
+            " MAX(s.max_rss_kb) AS max_rss_kb"
+            f" FROM stages s JOIN runs r ON r.id = s.run_id WHERE {where}"
+            " GROUP BY r.tool_uid, s.stage ORDER BY avg DESC, max DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_tools_ranking(db_file: Path, project: str) -> List[Dict]:
+    """Get average build and simulation times of every tool over the passed runs of the project, the fastest first.
+    Build time is averaged only over the runs where build wasn't skipped."""
+    with _connect(db_file) as conn:
+        rows = conn.execute(
+            "SELECT r.tool_uid, r.tool_kind, COUNT(DISTINCT r.id) AS runs,"
+            " AVG(CASE WHEN s.stage = 'build' THEN s.wall END) AS build,"
+            " AVG(CASE WHEN s.stage = 'sim' THEN s.wall END) AS sim"
+            " FROM runs r LEFT JOIN stages s ON s.run_id = r.id WHERE r.project = ? AND r.status = ?"
+            " GROUP BY r.tool_uid, r.tool_kind",
+            (project, str(RunStatus.passed)),
+        ).fetchall()
+    ranking = [dict(row) for row in rows]
+    return sorted(ranking, key=lambda r: (r["build"] or 0.0) + (r["sim"] or 0.0))
+
+
+def _format_time(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def get_slowest_text_table(stages: List[Dict]) -> str:
+    """Create text table with the slowest stages"""
+    header = f"| {'tool':>12} | {'stage':>8} | {'runs':>6} | {'avg, s':>9} | {'max, s':>9} | {'max rss, MB':>11} |"
+    divider = f"| {'-' * 12} | {'-' * 8} | {'-' * 6} | {'-' * 9} | {'-' * 9} | {'-' * 11} |"
+    rows = []
+    for s in stages:
+        rss = s["max_rss_kb"] / 1024
+        rows.append(
+            f"| {s['tool_uid']:>12} | {s['stage']:>8} | {s['runs']:>6} | {s['avg']:>9.2f} | {s['max']:>9.2f}"
+            f" | {rss:>11.1f} |"
+        )
+    return "\n".join([header, divider] + rows)
+
+
+def get_trend_text_table(runs: List[RunRecord]) -> str:
+    """Create text table with stage times of the runs. Build time is empty if build was skipped."""
+    header = (
+        f"| {'date':>16} | {'tool':>12} | {'version':>10} | {'sources':>8} | {'build, s':>9} | {'sim, s':>9}"
+        f" | {'status':>9} |"
+    )
+    divider = f"| {'-' * 16} | {'-' * 12} | {'-' * 10} | {'-' * 8} | {'-' * 9} | {'-' * 9} | {'-' * 9} |"
+    rows = []
+    for r in runs:
+        date = time.strftime("%Y-%m-%d %H:%M", time.localtime(r.time))
+        build = _format_time(r.get_stage_wall("build"))
+        sim = _format_time(r.get_stage_wall("sim"))
+        rows.append(
+            f"| {date:>16} | {r.tool_uid:>12} | {r.tool_version or '-':>10} | {r.sources_hash[:8] or '-':>8}"
+            f" | {build:>9} | {sim:>9} | {r.status:>9} |"
+        )
+    return "\n".join([header, divider] + rows)
+
+
+def get_ranking_text_table(ranking: List[Dict]) -> str:
+    """Create text table with average times of the tools"""
+    header = f"| {'tool':>12} | {'kind':>10} | {'runs':>6} | {'build, s':>9} | {'sim, s':>9} |"
+    divider = f"| {'-' * 12} | {'-' * 10} | {'-' * 6} | {'-' * 9} | {'-' * 9} |"
+    rows = []
+    for r in ranking:
+        build, sim = _format_time(r["build"]), _format_time(r["sim"])
+        rows.append(f"| {r['tool_uid']:>12} | {r['tool_kind']:>10} | {r['runs']:>6} | {build:>9} | {sim:>9} |")
+    return "\n".join([header, divider] + rows)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, TYPE_CHECKING
+
+from . import tools
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Suffix of compiled translation units
+OBJECT_SUFFIX = ".o"
+
+
+@dataclass
+class ObjectsReport:
+    compiled: int
+    up_to_date: int
+    cache_hits: int
+
+    @property
+    def reused(self) -> int:
+        return self.up_to_date + self.cache_hits
+
+    def __str__(self) -> str:
+        return (
+            f"{self.compiled} translation units compiled, {self.reused} reused"
+            f" ({self.up_to_date} up to date, {self.cache_hits} from ccache)"
+        )
+
+
+def snapshot(work_dir: Path, dirs: List[str]) -> Dict[str, int]:
+    """Get modification times of the objects inside incremental directories"""
+    objects = {}
+    for d in dirs:
+        for obj in work_dir.joinpath(d).rglob(f"*{OBJECT_SUFFIX}"):
+            objects[str(obj)] = obj.stat().st_mtime_ns
+    return objects
+
+
+def _count_cache_hits(stats_file: Path) -> int:
+    """Count cache hits in the ccache log. Every compilation is a comment with the file name followed by the counters
+    it updated. Newer ccache updates several hit counters per compilation (e.g. 'direct_cache_hit' and
+    'local_storage_hit'), so a compilation is counted once if any of its result counters is a cache hit."""
+    try:
+        lines = stats_file.read_text().splitlines()
+    except OSError:
+        return 0
+    hits = 0
+    is_hit = False
+    for line in lines:
+        if line.startswith("#"):
+            hits += is_hit
+            is_hit = False
+        elif line.strip().endswith("_cache_hit"):
+            is_hit = True
+    return hits + is_hit
+
+
+def get_report(work_dir: Path, dirs: List[str], before: Dict[str, int]) -> ObjectsReport:
+    """Compare objects after the build with the snapshot taken before it"""
+    after = snapshot(work_dir, dirs)
+    touched = len([obj for obj, mtime in after.items() if before.get(obj) != mtime])
+    hits = min(_count_cache_hits(work_dir.joinpath(tools.CCACHE_STATS_FILE)), touched)
+    return ObjectsReport(compiled=touched - hits, up_to_date=len(after) - touched, cache_hits=hits)
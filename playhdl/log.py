@@ -1,5 +1,8 @@
+import contextlib
 import logging
 import os
+import threading
+from typing import Iterator, Optional
 
 
 class _CustomFormatter(logging.Formatter):
@@ -29,6 +32,37 @@ class _CustomFormatter(logging.Formatter):
         return formatter.format(record)
 
 
+class _JobFilter(logging.Filter):
+    """Filter to prefix messages with a name of the job running in the current thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        job_name = get_job_name()
+        if job_name and not getattr(record, "job_name", None):
+            record.job_name = job_name
+            record.msg = f"[{job_name}] {record.msg}"
+        return True
+
+
+_job_filter = _JobFilter()
+_job_context = threading.local()
+
+
+def get_job_name() -> Optional[str]:
+    """Get name of the job running in the current thread"""
+    return getattr(_job_context, "name", None)
+
+
+@contextlib.contextmanager
+def job_context(name: Optional[str]) -> Iterator[None]:
+    """Mark all messages logged by the current thread with the job name"""
+    prev_name = get_job_name()
+    _job_context.name = name
+    try:
+        yield
+    finally:
+        _job_context.name = prev_name
+
+
 def is_debug_en() -> bool:
     """Is debug enabled"""
     return "DEBUG" in os.environ
@@ -49,4 +83,6 @@ def init_logger() -> None:
 
 def get_logger() -> logging.Logger:
     """Get package logger"""
-    return logging.getLogger("playhdl")
+    logger = logging.getLogger("playhdl")
+    logger.addFilter(_job_filter)
+    return logger
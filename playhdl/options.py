@@ -0,0 +1,34 @@
+import enum
+
+from . import utils
+
+# Options of the command line, which are also used by tools and templates.
+# They are kept apart, so arguments are parsed without importing of the heavy modules.
+
+
+class BuildProfile(utils.ExtendedEnum):
+    # Full debug visibility and waves
+    debug = enum.auto()
+    # No debug access and waves for the fastest simulation
+    fast = enum.auto()
+
+
+class CompileStrategy(utils.ExtendedEnum):
+    # Batch if spawning a process per file is estimated to be too expensive, per-file otherwise
+    auto = enum.auto()
+    # A compiler process per file, independent files can be compiled in parallel
+    per_file = enum.auto()
+    # A single compiler process for all files
+    batch = enum.auto()
+
+
+class WavesFormat(utils.ExtendedEnum):
+    vcd = enum.auto()
+    fst = enum.auto()
+
+
+class DesignKind(utils.ExtendedEnum):
+    verilog = enum.auto()
+    sv = enum.auto()
+    sv_uvm12 = enum.auto()
+    vhdl = enum.auto()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import collections
+import gzip
+import sys
+import threading
+import time
+from typing import Any, Deque, TYPE_CHECKING
+
+from . import log
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+_terminal_lock = threading.Lock()
+
+
+def write_terminal(data: bytes) -> None:
+    """Write process output to stdout. Lines are prefixed with a job name if there is any."""
+    text = data.decode(errors="replace")
+    job_name = log.get_job_name()
+    if job_name:
+        text = "".join(f"[{job_name}] {line}" for line in text.splitlines(keepends=True))
+    with _terminal_lock:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+class StageOutput:
+    """Output of the stage commands. It is written to a compressed log file and to the terminal.
+    In quiet mode only a progress line is shown, while a bounded tail of the last lines is kept for diagnostics."""
+
+    progress_period = 0.5
+
+    def __init__(self, name: str, log_file: Path, quiet: bool = False, tail_lines: int = 50) -> None:
+        self.name = name
+        self.log_file = log_file
+        self.quiet = quiet
+        self.tail: Deque[bytes] = collections.deque(maxlen=tail_lines)
+        self.lines = 0
+        self._lock = threading.Lock()
+        # Fast compression to keep up with chatty simulators
+        self._file = gzip.open(log_file, "wb", compresslevel=1)
+        self._show_progress = quiet and sys.stdout.isatty() and not log.get_job_name()
+        self._progress_time = 0.0
+
+    def write(self, data: bytes) -> None:
+        """Write chunk of complete lines"""
+        with self._lock:
+            self._file.write(data)
+            lines = data.splitlines(keepends=True)
+            self.tail.extend(lines)
+            self.lines += len(lines)
+            if not self.quiet:
+                write_terminal(data)
+            elif self._show_progress and time.monotonic() - self._progress_time > self.progress_period:
+                self._progress_time = time.monotonic()
+                with _terminal_lock:
+                    sys.stdout.write(f"\r  {self.name}: {self.lines} lines of output ...")
+                    sys.stdout.flush()
+
+    def dump_tail(self) -> None:
+        """Show the last lines of the output"""
+        with self._lock:
+            if self._progress_time:
+                write_terminal(b"\n")
+                self._progress_time = 0.0
+            write_terminal(f"... last {len(self.tail)} lines of '{self.log_file}':\n".encode())
+            write_terminal(b"".join(self.tail))
+
+    def close(self) -> None:
+        """Close log file"""
+        with self._lock:
+            self._file.close()
+            if self._progress_time:
+                write_terminal(b"\n")
+
+    def __enter__(self) -> StageOutput:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
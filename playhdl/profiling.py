@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+import resource
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from . import log, utils
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+_logger = log.get_logger()
+
+REPORT_FILE = "profile.json"
+TRACE_FILE = "profile.trace.json"
+
+
+@dataclass
+class CommandProfile:
+    stage: str
+    cmd: str
+    cwd: str
+    job: Optional[str]
+    thread: int
+    start: float
+    wall: float
+    user: float
+    sys: float
+    max_rss_kb: int
+    returncode: int
+
+
+def wait_process(pid: int) -> Tuple[int, resource.struct_rusage]:
+    """Wait for the child process and return its exit code and resource usage of the whole process tree"""
+    _, status, rusage = os.wait4(pid, 0)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status), rusage
+    return os.WEXITSTATUS(status), rusage
+
+
+def _get_busy_time(records: List[CommandProfile]) -> float:
+    """Get total time when at least one command was running"""
+    busy = 0.0
+    end = 0.0
+    for r in sorted(records, key=lambda r: r.start):
+        busy += max(0.0, r.start + r.wall - max(r.start, end))
+        end = max(end, r.start + r.wall)
+    return busy
+
+
+class Profiler:
+    """Collector of the resources used by the executed commands and playhdl itself"""
+
+    def __init__(self) -> None:
+        self.records: List[CommandProfile] = []
+        self._lock = threading.Lock()
+        self._threads: Dict[int, int] = {}
+        self._start = time.monotonic()
+        self._self_usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    def now(self) -> float:
+        """Time since the start of profiling"""
+        return time.monotonic() - self._start
+
+    def add(
+        self,
+        stage: str,
+        cmd: str,
+        cwd: Path,
+        start: float,
+        returncode: int,
+        rusage: resource.struct_rusage,
+    ) -> None:
+        """Add record about the finished command"""
+        with self._lock:
+            thread = self._threads.setdefault(threading.get_ident(), len(self._threads) + 1)
+            record = CommandProfile(
+                stage=stage,
+                cmd=cmd,
+                cwd=str(cwd),
+                job=log.get_job_name(),
+                thread=thread,
+                start=start,
+                wall=self.now() - start,
+                user=rusage.ru_utime,
+                sys=rusage.ru_stime,
+                max_rss_kb=rusage.ru_maxrss,
+                returncode=returncode,
+            )
+            self.records.append(record)
+
+    def get_elapsed(self) -> Dict[str, float]:
+        """Get time of every stage when at least one of its commands was running"""
+        with self._lock:
+            records = list(self.records)
+        stages: Dict[str, List[CommandProfile]] = {}
+        for r in records:
+            stages.setdefault(r.stage, []).append(r)
+        return {stage: _get_busy_time(stage_records) for stage, stage_records in stages.items()}
+
+    def get_report(self) -> Dict[str, Any]:
+        """Get report with all records, summary per stage and overhead of playhdl"""
+        wall = self.now()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        with self._lock:
+            records = list(self.records)
+
+        stages: Dict[str, Dict[str, Any]] = {}
+        for r in records:
+            stage = stages.setdefault(r.stage, {"wall": 0.0, "user": 0.0, "sys": 0.0, "max_rss_kb": 0})
+            stage["wall"] += r.wall
+            stage["user"] += r.user
+            stage["sys"] += r.sys
+            stage["max_rss_kb"] = max(stage["max_rss_kb"], r.max_rss_kb)
+
+        overhead = {
+            "wall": wall - _get_busy_time(records),
+            "user": usage.ru_utime - self._self_usage.ru_utime,
+            "sys": usage.ru_stime - self._self_usage.ru_stime,
+            "max_rss_kb": usage.ru_maxrss,
+        }
+        return {
+            "wall": wall,
+            "stages": stages,
+            "overhead": overhead,
+            "commands": [dataclasses.asdict(r) for r in records],
+        }
+
+    def get_trace(self) -> Dict[str, Any]:
+        """Get timeline of the commands in Chrome trace event format"""
+        pid = os.getpid()
+        events = [{"name": "playhdl", "ph": "X", "ts": 0, "dur": self.now() * 1e6, "pid": pid, "tid": 0}]
+        with self._lock:
+            for r in self.records:
+                name = f"[{r.job}] {r.cmd}" if r.job else r.cmd
+                args = {"cwd": r.cwd, "user": r.user, "sys": r.sys, "max_rss_kb": r.max_rss_kb}
+                event = {"name": name, "cat": r.stage, "ph": "X", "ts": r.start * 1e6, "dur": r.wall * 1e6}
+                events.append(dict(event, pid=pid, tid=r.thread, args=args))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, work_dir: Path) -> Dict[str, Any]:
+        """Save report and timeline to the working directory"""
+        report = self.get_report()
+        utils.dump_json(work_dir.joinpath(REPORT_FILE), report)
+        utils.dump_json(work_dir.joinpath(TRACE_FILE), self.get_trace())
+        _logger.info(f"Profile was saved to '{work_dir.joinpath(REPORT_FILE)}' and '{work_dir.joinpath(TRACE_FILE)}'")
+        return report
+
+
+def get_text_table(report: Dict[str, Any]) -> str:
+    """Create text table with resources used by every stage and playhdl itself"""
+    header = f"| {'stage':>8} | {'wall, s':>9} | {'user, s':>9} | {'sys, s':>9} | {'max rss, MB':>11} |"
+    divider = f"| {'-' * 8} | {'-' * 9} | {'-' * 9} | {'-' * 9} | {'-' * 11} |"
+    rows = []
+    for name, u in list(report["stages"].items()) + [("playhdl", report["overhead"])]:
+        rss = u["max_rss_kb"] / 1024
+        rows.append(f"| {name:>8} | {u['wall']:>9.2f} | {u['user']:>9.2f} | {u['sys']:>9.2f} | {rss:>11.1f} |")
+    return "\n".join([header, divider] + rows)
@@ -18,6 +18,7 @@ _logger = log.get_logger()
 @dataclass
 class Project:
     tools: Dict[tools.ToolUid, tools.ToolScript] = dataclasses.field(default_factory=dict)
+    sources: List[str] = dataclasses.field(default_factory=list)
 
     def __post_init__(self) -> None:
         for uid, script in self.tools.items():
@@ -31,19 +32,20 @@ def create(
     design_kind: templates.DesignKind,
     sources: List[str],
     user_settings: settings.UserSettings,
+    **kwargs: Any,
 ) -> Project:
     project_tools: Dict[tools.ToolUid, tools.ToolScript] = {}
 
     for uid, tool_settings in user_settings.tools.items():
         try:
-            project_tools[uid] = tools.generate_script(tool_settings, design_kind, sources)
+            project_tools[uid] = tools.generate_script(tool_settings, design_kind, sources, **kwargs)
         except (KeyError, ValueError, NotImplementedError):
             pass
 
     if len(list(project_tools.keys())) == 0:
         raise ValueError(f"Can't find any suitable tool for the provided design mode '{design_kind}'")
 
-    project = Project(tools=project_tools)
+    project = Project(tools=project_tools, sources=list(sources))
     _logger.debug(f"Created project: {project}")
 
     return project
@@ -1,86 +1,729 @@
 from __future__ import annotations
 
+import contextlib
+import dataclasses
+import functools
+import hashlib
 import os
+import re
 import shutil
-import subprocess
-import sys
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, TYPE_CHECKING
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
-from . import log, project, settings
-
-if TYPE_CHECKING:
-    from . import tools
+from . import (
+    backend,
+    benchmark,
+    cache,
+    depscan,
+    diagnostics,
+    filelist,
+    history,
+    incremental,
+    log,
+    output,
+    profiling,
+    project,
+    scheduler,
+    settings,
+    tools,
+    tuning,
+    watcher,
+)
 
 _logger = log.get_logger()
 
+RUNS_DIR = "runs"
+
+# Names of simulation directories derived from plusargs are shortened to this length
+MAX_RUN_NAME_LEN = 64
+
+# Number of fatals and errors shown after the stage, all of them are saved to the file
+MAX_SHOWN_DIAGNOSTICS = 10
+
 
-def _patch_path(bin_dir: Path, env: Dict[str, str]) -> None:
-    """Patch PATH variable inplace"""
-    env_path = f"{bin_dir}:{env.get('PATH', '')}"
-    env.setdefault("PATH", env_path)
+def _get_work_dir(tool_uid: tools.ToolUid) -> Path:
+    """Get working directory of the tool"""
+    return Path(f"./{tool_uid}")
 
 
-def _prepare_work_dir(tool_uid: tools.ToolUid) -> Path:
-    """Prepare working directory"""
-    work_dir = Path(f"./{tool_uid}")
-    _logger.info(f"Clear working directory '{work_dir}'")
-    shutil.rmtree(work_dir, ignore_errors=True)
-    work_dir.mkdir()
+def _prepare_work_dir(tool_uid: tools.ToolUid, keep: Optional[List[str]] = None, file_list: str = "") -> Path:
+    """Prepare working directory. Provided subdirectories are kept to allow incremental compilation.
+    File list with sources is written to the directory, if it isn't empty."""
+    work_dir = _get_work_dir(tool_uid)
+    if not keep or not work_dir.is_dir():
+        _logger.info(f"Clear working directory '{work_dir}'")
+        shutil.rmtree(work_dir, ignore_errors=True)
+        work_dir.mkdir()
+    else:
+        _logger.info(f"Clear working directory '{work_dir}' except {keep}")
+        for item in work_dir.iterdir():
+            if item.name in keep:
+                continue
+            if item.is_dir() and not item.is_symlink():
+                shutil.rmtree(item, ignore_errors=True)
+            else:
+                item.unlink()
+    if file_list:
+        work_dir.joinpath(tools.SOURCES_FILE).write_text(file_list)
     return work_dir
 
 
-def _exec(cmd: str, cwd: Path, bin_dir: Path, env: Dict[str, str]) -> None:
-    """Execute system process"""
+def _exec(
+    cmd: str,
+    cwd: Path,
+    bin_dir: Path,
+    env: Dict[str, str],
+    stage_output: output.StageOutput,
+    capture: bool = False,
+    profiler: Optional[profiling.Profiler] = None,
+    executor: Optional[backend.Executor] = None,
+    collector: Optional[diagnostics.Collector] = None,
+    license_pool: Optional[scheduler.LicensePool] = None,
+) -> None:
+    """Execute system process. Captured output is written at once when process ends.
+    Process is aborted as soon as the collector of diagnostics finds a reason for it in the output.
+    Process is started only when a license of the tool is available."""
     if not cmd:
         _logger.warning("Command is empty. Nothing to do.")
         return
 
-    # Prepare environment
-    proc_env = os.environ.copy()
-    proc_env.update(env)
-    _patch_path(bin_dir, proc_env)
-
     # Run process
-    kwargs = {
-        "args": cmd,
+    captured: List[bytes] = []
+    write = captured.append if capture else stage_output.write
+
+    def on_output(line: bytes) -> None:
+        write(line)
+        if collector:
+            collector.feed(line)
+
+    aborted = ""
+    try:
+        with license_pool.checkout() if license_pool else contextlib.nullcontext():
+            start = profiler.now() if profiler else 0.0
+            returncode, rusage = (executor or backend.LocalExecutor()).execute(cmd, cwd, bin_dir, env, on_output)
+    except diagnostics.AbortError as e:
+        returncode, aborted = -1, str(e)
+    else:
+        if profiler:
+            profiler.add(stage_output.name, cmd, cwd, start, returncode, rusage)
+    if captured:
+        stage_output.write(b"".join(captured))
+    if returncode != 0:
+        if stage_output.quiet:
+            stage_output.dump_tail()
+        result = f"was aborted on {aborted}" if aborted else f"returned {returncode}"
+        raise RuntimeError(
+            f"Command '{cmd}' {result}. Check the output above or '{stage_output.log_file}' for diagnostics."
+        )
+
+
+def _exec_job(job_name: Optional[str], **kwargs: Any) -> None:
+    """Execute system process on behalf of the job"""
+    with log.job_context(job_name):
+        _exec(**kwargs)
+
+
+def _exec_group(
+    cmds: List[str],
+    cwd: Path,
+    bin_dir: Path,
+    env: Dict[str, str],
+    stage_output: output.StageOutput,
+    jobs: int,
+    profiler: Optional[profiling.Profiler] = None,
+    executor: Optional[backend.Executor] = None,
+    collector: Optional[diagnostics.Collector] = None,
+    license_pool: Optional[scheduler.LicensePool] = None,
+) -> None:
+    """Execute group of independent processes using the provided number of parallel jobs"""
+    exec_opts = {
         "cwd": cwd,
-        "env": os.environ.copy(),
-        "stdout": sys.stdout,
-        "stderr": subprocess.STDOUT,
-        "shell": True,
+        "bin_dir": bin_dir,
+        "env": env,
+        "profiler": profiler,
+        "executor": executor,
+        "collector": collector,
+        "license_pool": license_pool,
     }
-    proc = subprocess.run(**kwargs)  # type: ignore
-    if proc.returncode != 0:
-        raise RuntimeError(f"Command '{cmd}' returned {proc.returncode}. Check the output above for diagnostics.")
+    if jobs <= 1 or len(cmds) <= 1:
+        for cmd in cmds:
+            _exec(cmd=cmd, stage_output=stage_output, **exec_opts)  # type: ignore
+        return
 
+    job_name = log.get_job_name()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        for cmd in cmds:
+            futures.append(
+                pool.submit(_exec_job, job_name, cmd=cmd, stage_output=stage_output, capture=True, **exec_opts)
+            )
+        errors = [f.exception() for f in futures]
+    for e in errors:
+        if e:
+            raise e
 
-def run(project: project.Project, settings: settings.UserSettings, tool_uid: tools.ToolUid, waves: bool) -> None:
-    # Check that provided tool exists
+
+def _check_tool(project: project.Project, tool_uid: tools.ToolUid) -> None:
+    """Check that provided tool exists in the project"""
     if tool_uid not in project.tools.keys():
         raise ValueError(
             f"Tool '{tool_uid}' was not found in your project file. Available tools: {list(project.tools.keys())}."
             " Check your global settings and project file, then run again."
         )
 
+
+def _get_script(project: project.Project, tool_uid: tools.ToolUid, kwargs: Dict[str, Any]) -> tools.ToolScript:
+    """Get script of the tool for the build profile requested"""
+    profile = tools.BuildProfile(kwargs.get("build_profile", tools.BuildProfile.debug))
+    return project.tools[tool_uid].get_profile(profile)
+
+
+def _get_jobs(jobs: int) -> int:
+    """Get number of parallel jobs. Zero means number of CPUs available."""
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+
+def _run_stage(
+    name: str,
+    cmds: List[tools.ToolStep],
+    cwd: Path,
+    tool_settings: tools.ToolSettings,
+    jobs: int = 1,
+    quiet: bool = False,
+    tail_lines: int = 50,
+    profiler: Optional[profiling.Profiler] = None,
+    executor: Optional[backend.Executor] = None,
+    max_errors: int = 0,
+    cancellation: Optional[backend.Cancellation] = None,
+) -> None:
+    """Execute commands of the stage one by one. Groups of independent commands are executed in parallel.
+    Output of the stage is saved to the compressed log file in the provided directory, diagnostics found in it
+    are saved next to the log. Stage is aborted on the first fatal or when the number of errors exceeds the limit.
+    Every command holds a license of the tool while running, if their number is limited."""
+    collector = diagnostics.Collector(tools.get_diagnostic_patterns(tool_settings.kind), max_errors)
+    licenses = tools.get_licenses(tool_settings)
+    license_pool = scheduler.LicensePool(*licenses, cancellation=cancellation) if licenses else None
+    with output.StageOutput(name, cwd.joinpath(f"{name}.log.gz"), quiet=quiet, tail_lines=tail_lines) as stage_output:
+        try:
+            for step in cmds:
+                group = step if isinstance(step, list) else [step]
+                for cmd in group:
+                    _logger.info(f"  {cmd}")
+                _exec_group(
+                    cmds=group,
+                    cwd=cwd,
+                    bin_dir=tool_settings.bin_dir,
+                    env=tool_settings.env,
+                    stage_output=stage_output,
+                    jobs=jobs,
+                    profiler=profiler,
+                    executor=executor,
+                    collector=collector,
+                    license_pool=license_pool,
+                )
+        finally:
+            _report_diagnostics(name, cwd, collector.get_report())
+
+
+def _report_diagnostics(name: str, cwd: Path, report: diagnostics.Report) -> None:
+    """Save diagnostics of the stage and show the worst of them"""
+    report_file = diagnostics.get_report_file(cwd, name)
+    report.dump(report_file)
+    if not any(report.counts.values()):
+        return
+    worst = report.get_worst(MAX_SHOWN_DIAGNOSTICS)
+    lines = "".join(f"\n  {d}" for d in worst)
+    _logger.info(f"Diagnostics of {name} ({report}), all of them are saved to '{report_file}'{lines}")
+
+
+def _get_stage_opts(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Get options of the stage execution from the keyword arguments of the run"""
+    return {
+        "quiet": bool(kwargs.get("quiet", False)),
+        "tail_lines": int(kwargs.get("tail_lines", 50)),
+        "profiler": kwargs.get("profiler"),
+        "executor": backend.get_executor(kwargs.get("queue"), kwargs.get("cancellation")),
+        "max_errors": int(kwargs.get("max_errors", 0)),
+        "cancellation": kwargs.get("cancellation"),
+    }
+
+
+def _prepare_run_dir(work_dir: Path, name: str) -> Path:
+    """Prepare isolated directory for a simulation. Build artifacts are linked from the working directory."""
+    run_dir = work_dir.joinpath(RUNS_DIR, name)
+    shutil.rmtree(run_dir, ignore_errors=True)
+    run_dir.mkdir(parents=True)
+    for name in cache.get_build_artifacts(work_dir):
+        item = work_dir.joinpath(name)
+        run_dir.joinpath(name).symlink_to(item.resolve(), target_is_directory=item.is_dir())
+    return run_dir
+
+
+@contextlib.contextmanager
+def _profile(tool_uid: tools.ToolUid, kwargs: Dict[str, Any]) -> Iterator[None]:
+    """Profile commands executed within the context if it was requested. Profiler is added to kwargs inplace."""
+    if not kwargs.get("profile", False) or kwargs.get("profiler"):
+        yield
+        return
+
+    profiler = profiling.Profiler()
+    kwargs["profiler"] = profiler
+    try:
+        yield
+    finally:
+        work_dir = _get_work_dir(tool_uid)
+        if work_dir.is_dir():
+            report = profiler.dump(work_dir)
+            _logger.info(f"Profile:\n{profiling.get_text_table(report)}")
+
+
+@contextlib.contextmanager
+def _history(
+    project: project.Project, settings: settings.UserSettings, tool_uid: tools.ToolUid, kwargs: Dict[str, Any]
+) -> Iterator[None]:
+    """Append record of the run to the history database if it was provided. Profiler and hashes of the sources,
+    which are filled by the build, are added to kwargs inplace."""
+    history_file = kwargs.get("history_file")
+    if not history_file:
+        yield
+        return
+
+    profiler = kwargs.setdefault("profiler", profiling.Profiler())
+    source_hashes: Dict[str, str] = kwargs.setdefault("source_hashes", {})
+    start = time.time()
+    status = history.RunStatus.failed
+    try:
+        yield
+        status = history.RunStatus.passed
+    except backend.CancelledError:
+        status = history.RunStatus.cancelled
+        raise
+    finally:
+        tool_settings = settings.tools[tool_uid]
+        record = history.create_record(
+            profiler,
+            start,
+            status,
+            project=str(Path.cwd()),
+            tool_uid=tool_uid,
+            tool_kind=str(tool_settings.kind),
+            tool_version=tool_settings.version or "",
+            sources_hash=cache.get_sources_hash(source_hashes),
+        )
+        try:
+            history.add_run(history_file, record)
+        except (sqlite3.Error, OSError) as e:
+            _logger.warning(f"Can't save the run to the history database '{history_file}': {e}")
+
+
+def _tune_threads(
+    tool_uid: tools.ToolUid,
+    tool_settings: tools.ToolSettings,
+    tool_script: tools.ToolScript,
+    file_list: str = "",
+    **kwargs: Any,
+) -> int:
+    """Build and simulate the model with different numbers of threads to find the fastest one"""
+    timings = {}
+    sim_cmds = tools.add_sim_opts(tool_script.sim, str(tool_settings.extras.get("tune-sim-opts", "")))
+    for threads in tuning.get_threads_candidates(_get_jobs(0)):
+        _logger.info(f"Tune simulation with {threads} threads ...")
+        build_cmds = tools.add_build_opts(tool_script.build, tools.get_threads_opts(tool_settings.kind, threads))
+        work_dir = _prepare_work_dir(tool_uid, file_list=file_list)
+        jobs = _get_jobs(int(kwargs.get("jobs", 1)))
+        _run_stage("build", build_cmds, work_dir, tool_settings, jobs=jobs, **_get_stage_opts(kwargs))
+        start = time.monotonic()
+        _run_stage("sim", list(sim_cmds), work_dir, tool_settings, **_get_stage_opts(kwargs))
+        timings[threads] = time.monotonic() - start
+        _logger.info(f"  {timings[threads]:.3f} s")
+
+    best = min(timings, key=lambda threads: timings[threads])
+    _logger.info(f"The fastest simulation is with {best} threads")
+    tuning.save_threads(tool_uid, tuning.get_key(tool_settings, tool_script), best, timings)
+    return best
+
+
+def _get_build_cmds(
+    tool_uid: tools.ToolUid,
+    tool_settings: tools.ToolSettings,
+    tool_script: tools.ToolScript,
+    file_list: str = "",
+    **kwargs: Any,
+) -> List[tools.ToolStep]:
+    """Get commands of the build stage. Macro definitions and options found by tuning are added to them.
+    File list with sources is written to the working directory before every build of the tuning."""
+    defines = list(kwargs.get("defines") or [])
+    build_cmds = tools.add_defines(tool_settings.kind, tool_script.build, defines)
+    tool_script = dataclasses.replace(tool_script, build=build_cmds)
+    if not tools.is_threads_tuned(tool_settings):
+        return list(tool_script.build)
+
+    threads = tuning.load_threads(tool_uid, tuning.get_key(tool_settings, tool_script))
+    if threads is None:
+        threads = _tune_threads(tool_uid, tool_settings, tool_script, file_list, **kwargs)
+    else:
+        _logger.info(f"Use {threads} simulation threads found by tuning earlier")
+    return tools.add_build_opts(tool_script.build, tools.get_threads_opts(tool_settings.kind, threads))
+
+
+def _scan_sources(sources: filelist.Sources) -> depscan.Graph:
+    """Scan dependencies between the sources to get their compilation order"""
+    return depscan.Scanner(depscan.get_cache_file()).scan(sources.files, sources.include_dirs)
+
+
+def _select_sources(
+    sources: filelist.Sources, groups: List[List[str]], selected: Optional[Set[str]] = None
+) -> filelist.Sources:
+    """Get sources in the compilation order. Only the selected ones are kept if they are provided."""
+    files = [f for group in groups for f in group if selected is None or f in selected]
+    return dataclasses.replace(sources, files=files)
+
+
+def _get_recompiled_sources(work_dir: Path, compile_key: str, graph: depscan.Graph) -> Optional[Set[str]]:
+    """Get sources changed since the last build and the ones depending on them.
+    None is returned if all sources have to be compiled."""
+    compiled = cache.get_compiled_sources(work_dir, compile_key)
+    if not compiled:
+        return None
+    changed = {f for f in graph.files if f not in graph.hashes or compiled.get(f) != graph.hashes[f]}
+    selected = graph.get_dependents(changed)
+    if not selected:
+        return None
+    _logger.info(f"Recompile {len(selected)} of {len(graph.files)} sources changed since the last build")
+    return selected
+
+
+def build(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uid: tools.ToolUid,
+    **kwargs: Any,
+) -> Path:
+    """Build project with the provided tool and return working directory with build results"""
+    # Check that provided tool exists
+    _check_tool(project, tool_uid)
+
+    with _profile(tool_uid, kwargs):
+        return _build(project, settings, tool_uid, **kwargs)
+
+
+def _build(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uid: tools.ToolUid,
+    **kwargs: Any,
+) -> Path:
+    """Build project with the provided tool unless the build is up to date"""
     # Prepare tool attributes
     tool_settings = settings.tools[tool_uid]
-    tool_script = project.tools[tool_uid]
-    work_dir = _prepare_work_dir(tool_uid)
+    tool_script = _get_script(project, tool_uid, kwargs)
+
+    # Globs and file lists are expanded on every build to catch added files, dependencies are scanned to follow edits
+    sources = filelist.expand(project.sources)
+    graph = _scan_sources(sources)
+    groups = graph.get_groups()
+    if "source_hashes" in kwargs:
+        # Sources are already hashed, so the history of the run doesn't read them again
+        kwargs["source_hashes"].update(graph.hashes)
+    file_list = tools.get_file_list(tool_settings.kind, _select_sources(sources, groups))
+
+    # Skip build if nothing has changed since the last successful one
+    build_cmds = _get_build_cmds(tool_uid, tool_settings, tool_script, file_list, **kwargs)
+    build_key = cache.get_build_key(tool_settings, build_cmds, sources.get_inputs(), graph.hashes)
+    work_dir = _get_work_dir(tool_uid)
+    rebuild = kwargs.get("rebuild", False)
+    if build_key and not rebuild and cache.is_build_cached(work_dir, build_key):
+        _logger.info(f"Build in '{work_dir}' is up to date. Skip compilation.")
+        return work_dir
+
+    # Only changed sources and their dependents are compiled into the kept libraries
+    compile_key = cache.get_compile_key(tool_settings, build_cmds, sources.include_dirs + sources.defines)
+    selected = None
+    if not rebuild and tools.is_partial_compile_supported(tool_settings):
+        selected = _get_recompiled_sources(work_dir, compile_key, graph)
+        if selected is not None:
+            file_list = tools.get_file_list(tool_settings.kind, _select_sources(sources, groups, selected))
+    strategy = tools.get_compile_strategy(
+        tool_settings, tool_script, len(graph.files if selected is None else selected)
+    )
+    scheduled_cmds = tools.schedule_compile_steps(tool_settings.kind, build_cmds, groups, selected, strategy)
+
+    # Clean rebuild drops incremental data too
+    incremental_dirs = tools.get_incremental_dirs(tool_settings)
+    work_dir = _prepare_work_dir(tool_uid, [] if rebuild else incremental_dirs, file_list)
+    objects = incremental.snapshot(work_dir, incremental_dirs)
 
     # Run tool
     _logger.info("Run compilation ...")
-    for cmd in tool_script.build:
-        _logger.info(f"  {cmd}")
-        _exec(cmd=cmd, cwd=work_dir, bin_dir=tool_settings.bin_dir, env=tool_settings.env)
-
-    _logger.info("Run simulation ...")
-    for cmd in tool_script.sim:
-        _logger.info(f"  {cmd}")
-        _exec(cmd=cmd, cwd=work_dir, bin_dir=tool_settings.bin_dir, env=tool_settings.env)
-
-    if waves:
-        _logger.info("Show waves ...")
-        for cmd in tool_script.waves:
-            _logger.info(f"  {cmd}")
-            _exec(cmd=cmd, cwd=work_dir, bin_dir=tool_settings.bin_dir, env=tool_settings.env)
+    jobs = _get_jobs(int(kwargs.get("jobs", 1)))
+    build_env = tools.get_build_env(tool_settings, work_dir)
+    build_settings = dataclasses.replace(tool_settings, env={**build_env, **tool_settings.env})
+    _run_stage("build", scheduled_cmds, work_dir, build_settings, jobs=jobs, **_get_stage_opts(kwargs))
+    if incremental_dirs:
+        report = incremental.get_report(work_dir, incremental_dirs, objects)
+        if report.compiled or report.reused:
+            _logger.info(f"Incremental build: {report}")
+        else:
+            _logger.info(f"Incremental build: {incremental_dirs} are kept for the next build")
+
+    # Remember build artifacts to be able to use them for simulations in isolated directories
+    stage_files = ["build.log.gz", diagnostics.get_report_file(work_dir, "build").name]
+    artifacts = [item.name for item in work_dir.iterdir() if item.name not in stage_files]
+    profile = str(kwargs.get("build_profile", tools.BuildProfile.debug))
+    cache.save_build_info(work_dir, build_key, artifacts, profile, compile_key, graph.hashes)
+    return work_dir
+
+
+def _get_run_name(plusargs: List[str]) -> str:
+    """Get name of the simulation directory from plusargs, e.g. 'UVM_TESTNAME_foo' for '+UVM_TESTNAME=foo'"""
+    name = re.sub(r"[^\w.-]+", "_", " ".join(plusargs)).strip("_") or "sim"
+    if len(name) > MAX_RUN_NAME_LEN:
+        digest = hashlib.sha256(name.encode()).hexdigest()[:8]
+        name = f"{name[: MAX_RUN_NAME_LEN - len(digest) - 1]}_{digest}"
+    return name
+
+
+def run(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uid: tools.ToolUid,
+    waves: bool,
+    **kwargs: Any,
+) -> None:
+    """Build project with the provided tool and run simulation"""
+    _check_tool(project, tool_uid)
+    if waves and not _get_script(project, tool_uid, kwargs).waves:
+        raise ValueError(f"Waves can't be opened for the '{kwargs.get('build_profile')}' build profile")
+
+    with _profile(tool_uid, kwargs), _history(project, settings, tool_uid, kwargs):
+        work_dir = build(project, settings, tool_uid, **kwargs)
+        tool_settings = settings.tools[tool_uid]
+        tool_script = _get_script(project, tool_uid, kwargs)
+
+        _logger.info("Run simulation ...")
+        _run_stage("sim", list(tool_script.sim), work_dir, tool_settings, **_get_stage_opts(kwargs))
+
+        if waves:
+            _logger.info("Show waves ...")
+            # GUI is always opened locally
+            stage_opts = _get_stage_opts(dict(kwargs, queue=None))
+            _run_stage("waves", list(tool_script.waves), work_dir, tool_settings, **stage_opts)
+
+
+def sim(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uid: tools.ToolUid,
+    plusargs: List[str],
+    **kwargs: Any,
+) -> Path:
+    """Run simulation using the last build of the tool and return its directory. Every simulation runs in its own
+    directory, so several of them can use the same build at the same time."""
+    _check_tool(project, tool_uid)
+    tool_settings = settings.tools[tool_uid]
+    tool_script = _get_script(project, tool_uid, kwargs)
+    sim_cmds = tools.add_sim_opts(tool_script.sim, tools.get_plusargs_opts(tool_settings.kind, plusargs))
+
+    work_dir = _get_work_dir(tool_uid)
+    build_profile = cache.get_build_profile(work_dir)
+    profile = str(kwargs.get("build_profile", tools.BuildProfile.debug))
+    if build_profile is None:
+        raise RuntimeError(f"Build was not found in '{work_dir}'. Run 'build' command first.")
+    if build_profile != profile:
+        raise ValueError(
+            f"Build in '{work_dir}' was done with the '{build_profile}' build profile, but '{profile}' is requested."
+            " Run 'build' command with the same build profile first."
+        )
+
+    name = kwargs.get("name") or _get_run_name(plusargs)
+    if not re.fullmatch(r"[\w.-]+", name) or name in [".", ".."]:
+        raise ValueError(f"Simulation name '{name}' should contain only letters, digits, '_', '.' and '-'")
+
+    with _profile(tool_uid, kwargs):
+        run_dir = _prepare_run_dir(work_dir, name)
+        _logger.info(f"Run simulation in '{run_dir}' ...")
+        _run_stage("sim", list(sim_cmds), run_dir, tool_settings, **_get_stage_opts(kwargs))
+    return run_dir
+
+
+def _run_watched(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uid: tools.ToolUid,
+    **kwargs: Any,
+) -> None:
+    """Run build and simulation within the watch mode, errors are only reported"""
+    try:
+        run(project, settings, tool_uid, False, **kwargs)
+        _logger.info("Run passed. Waiting for changes ...")
+    except backend.CancelledError:
+        _logger.info("Run was cancelled")
+    except (ValueError, RuntimeError, OSError) as e:
+        _logger.error(str(e))
+        _logger.info("Run failed. Waiting for changes ...")
+
+
+def watch(
+    project_file: Path,
+    settings: settings.UserSettings,
+    tool_uid: tools.ToolUid,
+    stop: Optional[threading.Event] = None,
+    **kwargs: Any,
+) -> None:
+    """Run build and simulation every time sources, files included by them or the project file change until stop
+    is requested. Run in progress is cancelled by new changes."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            project_descr: Optional[project.Project] = project.load(project_file)
+        except (ValueError, TypeError, OSError) as e:
+            _logger.error(f"Can't load project file '{project_file}': {e}")
+            project_descr = None
+        files = [project_file]
+        if project_descr:
+            try:
+                sources = filelist.expand(project_descr.sources)
+                files.extend(Path(s) for s in sources.get_inputs())
+                files.extend(Path(s) for s in _scan_sources(sources).get_included_files())
+            except ValueError:
+                # Run reports the error, changes of the project file are still watched
+                pass
+
+        # Watcher is created before the run to catch changes made during it
+        cancellation = backend.Cancellation()
+        with watcher.get_watcher(files) as files_watcher:
+            thread = None
+            if project_descr:
+                run_kwargs = dict(kwargs, cancellation=cancellation)
+                thread = threading.Thread(
+                    target=_run_watched, args=(project_descr, settings, tool_uid), kwargs=run_kwargs
+                )
+                thread.start()
+            try:
+                changed = watcher.wait_changes(files_watcher, stop)
+            finally:
+                cancellation.cancel()
+                if thread:
+                    thread.join()
+        if changed:
+            _logger.info(f"Changed {sorted(str(f) for f in changed)}. Run again ...")
+
+
+def run_many(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uids: List[tools.ToolUid],
+    **kwargs: Any,
+) -> List[scheduler.JobResult]:
+    """Run several tools concurrently. Every tool is built and simulated in its own working directory."""
+    for uid in tool_uids:
+        _check_tool(project, uid)
+
+    jobs = []
+    for uid in tool_uids:
+        jobs.append(scheduler.Job(name=uid, func=functools.partial(run, project, settings, uid, False, **kwargs)))
+    return scheduler.run_jobs(jobs, max_workers=len(jobs))
+
+
+def regress(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uid: tools.ToolUid,
+    seeds: List[int],
+    **kwargs: Any,
+) -> List[scheduler.JobResult]:
+    """Build project once and run simulation for every seed. Every simulation runs in its own directory."""
+    _check_tool(project, tool_uid)
+    tool_settings = settings.tools[tool_uid]
+    # Simulator has to support seeds, otherwise the build is useless
+    seed_opts = {seed: tools.get_seed_opts(tool_settings.kind, seed) for seed in seeds}
+
+    with _profile(tool_uid, kwargs):
+        work_dir = build(project, settings, tool_uid, **kwargs)
+        tool_script = _get_script(project, tool_uid, kwargs)
+
+        _logger.info(f"Run simulation for {len(seeds)} seeds ...")
+        jobs = []
+        for seed in seeds:
+            sim_cmds = tools.add_sim_opts(tool_script.sim, seed_opts[seed])
+            run_dir = _prepare_run_dir(work_dir, f"seed_{seed}")
+            stage_opts = _get_stage_opts(kwargs)
+            func = functools.partial(_run_stage, "sim", list(sim_cmds), run_dir, tool_settings, **stage_opts)
+            jobs.append(scheduler.Job(name=f"seed_{seed}", func=func))
+        return scheduler.run_jobs(jobs, max_workers=_get_jobs(int(kwargs.get("sim_jobs", 0))))
+
+
+def bench(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uids: List[tools.ToolUid],
+    repeats: int,
+    warmup: int = 1,
+    **kwargs: Any,
+) -> List[benchmark.ToolBench]:
+    """Build from scratch and simulate with every tool several times. Tools are benchmarked one after another
+    to not compete for resources, warm-up iterations fill caches of the filesystem and are discarded."""
+    for uid in tool_uids:
+        _check_tool(project, uid)
+
+    results = []
+    for uid in tool_uids:
+        tool_settings = settings.tools[uid]
+        result = benchmark.ToolBench(uid, str(tool_settings.kind), tool_settings.version or "")
+        with log.job_context(uid):
+            try:
+                _bench_tool(project, settings, uid, result, repeats, warmup, **kwargs)
+            except (ValueError, RuntimeError, OSError) as e:
+                result.error = str(e)
+                _logger.error(result.error)
+        results.append(result)
+    return results
+
+
+def _bench_tool(
+    project: project.Project,
+    settings: settings.UserSettings,
+    tool_uid: tools.ToolUid,
+    result: benchmark.ToolBench,
+    repeats: int,
+    warmup: int,
+    **kwargs: Any,
+) -> None:
+    """Run iterations of the benchmark for the tool and add times of the stages to the result"""
+    tool_settings = settings.tools[tool_uid]
+    tool_script = _get_script(project, tool_uid, kwargs)
+    sources = filelist.expand(project.sources)
+    groups = _scan_sources(sources).get_groups()
+    file_list = tools.get_file_list(tool_settings.kind, _select_sources(sources, groups))
+    build_cmds = _get_build_cmds(tool_uid, tool_settings, tool_script, file_list, **kwargs)
+    strategy = tools.get_compile_strategy(tool_settings, tool_script, len(sources.files))
+    build_cmds = tools.schedule_compile_steps(tool_settings.kind, build_cmds, groups, strategy=strategy)
+    compile_cmds, elab_cmds = tools.split_build_cmds(tool_settings.kind, build_cmds)
+    jobs = _get_jobs(int(kwargs.get("jobs", 1)))
+    stages: Dict[str, Tuple[List[tools.ToolStep], int]] = {
+        "compile": (compile_cmds, jobs),
+        "elaborate": (elab_cmds, jobs),
+        "sim": (list(tool_script.sim), 1),
+    }
+
+    for i in range(warmup + repeats):
+        if i < warmup:
+            _logger.info(f"Run warm-up iteration {i + 1} of {warmup} ...")
+        else:
+            _logger.info(f"Run iteration {i - warmup + 1} of {repeats} ...")
+        work_dir = _prepare_work_dir(tool_uid, file_list=file_list)
+        build_env = tools.get_build_env(tool_settings, work_dir)
+        build_settings = dataclasses.replace(tool_settings, env={**build_env, **tool_settings.env})
+        for name in benchmark.STAGES:
+            cmds, stage_jobs = stages[name]
+            if not cmds:
+                continue
+            stage_settings = tool_settings if name == "sim" else build_settings
+            start = time.monotonic()
+            _run_stage(name, cmds, work_dir, stage_settings, jobs=stage_jobs, **_get_stage_opts(kwargs))
+            if i >= warmup:
+                result.samples.setdefault(name, []).append(time.monotonic() - start)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import contextlib
+import fcntl
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from . import backend, log
+
+_logger = log.get_logger()
+
+# Interval of polling licenses when all of them are checked out, s
+LICENSE_POLL_INTERVAL = 0.1
+
+# Time spent by jobs waiting for licenses, keyed by job name
+_waits: Dict[str, float] = {}
+_waits_lock = threading.Lock()
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], None]
+
+
+@dataclass
+class JobResult:
+    name: str
+    passed: bool
+    duration: float
+    error: str = ""
+    wait: float = 0.0
+
+
+def get_licenses_dir() -> Path:
+    """Get directory with lock files of the licenses. It is on a local filesystem, where locks are reliable."""
+    return Path(tempfile.gettempdir(), f"playhdl-{os.getuid()}", "licenses")
+
+
+class LicensePool:
+    """Pool of tool licenses shared by all playhdl processes of the user. Every license is a lock file,
+    which is locked while a process of the tool is running and is released by the OS even if playhdl is killed."""
+
+    def __init__(self, name: str, limit: int, cancellation: Optional[backend.Cancellation] = None) -> None:
+        self.name = name
+        self.limit = limit
+        self.cancellation = cancellation
+
+    @contextlib.contextmanager
+    def checkout(self) -> Iterator[None]:
+        """Wait for a free license and hold it within the context"""
+        licenses_dir = get_licenses_dir()
+        licenses_dir.mkdir(parents=True, exist_ok=True)
+        start = time.monotonic()
+        warned = False
+        while True:
+            for i in range(self.limit):
+                fd = os.open(licenses_dir.joinpath(f"{self.name}.{i}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                _add_wait(time.monotonic() - start)
+                try:
+                    yield
+                finally:
+                    os.close(fd)
+                return
+            if self.cancellation and self.cancellation.cancelled:
+                raise backend.CancelledError("Execution was cancelled")
+            if not warned:
+                _logger.info(f"All {self.limit} licenses of '{self.name}' are in use. Waiting for a free one ...")
+                warned = True
+            time.sleep(LICENSE_POLL_INTERVAL)
+
+
+def _add_wait(wait: float) -> None:
+    """Account time spent waiting for a license to the current job"""
+    job_name = log.get_job_name()
+    if job_name:
+        with _waits_lock:
+            _waits[job_name] = _waits.get(job_name, 0.0) + wait
+
+
+def _pop_wait(job_name: str) -> float:
+    with _waits_lock:
+        return _waits.pop(job_name, 0.0)
+
+
+def _run_job(job: Job) -> JobResult:
+    """Run single job and catch its errors. Time spent waiting for licenses is reported separately."""
+    start = time.monotonic()
+    error = ""
+    _pop_wait(job.name)
+    with log.job_context(job.name):
+        try:
+            job.func()
+        except (ValueError, RuntimeError, OSError) as e:
+            error = str(e)
+            _logger.error(error)
+    # Parallel commands of the job wait concurrently, so the sum of their waits can exceed wall time
+    wait = _pop_wait(job.name)
+    duration = max(0.0, time.monotonic() - start - wait)
+    return JobResult(name=job.name, passed=not error, duration=duration, error=error, wait=wait)
+
+
+def run_jobs(jobs: List[Job], max_workers: int) -> List[JobResult]:
+    """Run jobs concurrently. Results are in the same order as jobs."""
+    _logger.info(f"Run {len(jobs)} jobs using {max_workers} workers ...")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(_run_job, jobs))
+
+
+def get_summary_text_table(results: List[JobResult]) -> str:
+    """Create text table with status, wall time and time spent waiting for licenses of every job"""
+    name_w = max([len("job")] + [len(r.name) for r in results])
+    header = f"| {'job':>{name_w}} | {'status':^6} | {'time, s':>9} | {'wait, s':>9} |"
+    divider = f"| {'-' * name_w} | {'-' * 6} | {'-' * 9} | {'-' * 9} |"
+    rows = []
+    for r in results:
+        status = "PASS" if r.passed else "FAIL"
+        rows.append(f"| {r.name:>{name_w}} | {status:^6} | {r.duration:>9.2f} | {r.wait:>9.2f} |")
+    return "\n".join([header, divider] + rows)
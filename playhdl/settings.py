@@ -5,7 +5,7 @@ from dataclasses import dataclass
 
 from typing import Any, Dict, TYPE_CHECKING
 
-from . import log, tools, utils
+from . import discovery, log, tools, utils
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -33,12 +33,14 @@ def setup(app_dir: Path, user_settings_file: Path, **kwargs: Any) -> None:
     # Prepare settings file
     _logger.info("Create default settings ...")
     _logger.info("  Try to find all tools available ...")
+    installations = discovery.discover(app_dir.joinpath(discovery.DISCOVERY_CACHE_FILE), **kwargs)
     tool_pool = {}
+    for uid, inst in zip(discovery.get_uids(installations), installations):
+        _logger.info(f"  {uid}: {inst.bin_dir} ({inst.version or 'unknown version'})")
+        tool_pool[uid] = tools.ToolSettings(kind=inst.kind, bin_dir=inst.bin_dir, version=inst.version)
     for t in tools.ToolKind:
-        bin_dir = tools.find_tool_dir(t)
-        _logger.info(f"  {t}: {bin_dir}")
-        if bin_dir:
-            tool_pool[str(t)] = tools.ToolSettings(kind=t, bin_dir=bin_dir)
+        if t not in [inst.kind for inst in installations]:
+            _logger.info(f"  {t}: None")
     user_settings = UserSettings(tools=tool_pool)
 
     # Try to save settings to file
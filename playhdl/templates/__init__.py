@@ -1,23 +1,16 @@
 from __future__ import annotations
 
-import enum
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, List, Type
 
 from .. import log, utils
+from ..options import DesignKind
 
 _logger = log.get_logger()
 
 
-class DesignKind(utils.ExtendedEnum):
-    verilog = enum.auto()
-    sv = enum.auto()
-    sv_uvm12 = enum.auto()
-    vhdl = enum.auto()
-
-
 @dataclass
 class TemplateDescriptor:
     filename: str
@@ -13,8 +13,14 @@ module tb;
         $finish;
     end
 
+    `ifndef NO_WAVES
     initial begin
+        `ifdef WAVES_FST
+        $dumpfile("tb.fst");
+        `else
         $dumpfile("tb.vcd");
+        `endif
         $dumpvars(0, tb);
     end
+    `endif
 endmodule
@@ -2,13 +2,21 @@ from __future__ import annotations
 
 import dataclasses
 import enum
+import os
+import re
+import shlex
 import shutil
+import subprocess
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Callable, Dict, List, Match, Optional, Set, Tuple, Type, Union
 
-from . import templates, utils
+from . import diagnostics, filelist, log, templates, utils
+from .options import BuildProfile, CompileStrategy, WavesFormat
+
+_logger = log.get_logger()
 
 
 @dataclass
@@ -17,6 +25,7 @@ class ToolSettings:
     bin_dir: Path
     env: Dict[str, str] = dataclasses.field(default_factory=dict)
     extras: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    version: Optional[str] = None
 
     def __post_init__(self) -> None:
         self.bin_dir = Path(self.bin_dir)
@@ -32,24 +41,442 @@ class ToolKind(utils.ExtendedEnum):
     VIVADO = enum.auto()
 
 
+# Build step is either a single command or a group of independent commands, which can be executed in parallel
+ToolStep = Union[str, List[str]]
+
+
 @dataclass
 class ToolScript:
-    build: List[str]
+    build: List[ToolStep]
     sim: List[str]
     waves: List[str]
+    # Scripts of other build profiles. Debug profile is the script itself.
+    profiles: Dict[str, Dict[str, List[Any]]] = dataclasses.field(default_factory=dict)
+    # Compile strategy selected by 'init'. Automatic one is resolved on every build.
+    compile_strategy: str = ""
+
+    def get_profile(self, profile: BuildProfile) -> ToolScript:
+        """Get script of the provided build profile"""
+        if profile == BuildProfile.debug:
+            return self
+        if str(profile) not in self.profiles:
+            raise ValueError(
+                f"Build profile '{profile}' is not defined for the tool. Available profiles: {self.get_profiles()}."
+                " Run 'init' again to generate scripts for all profiles."
+            )
+        script = self.profiles[str(profile)]
+        return ToolScript(
+            build=script.get("build", self.build),
+            sim=script.get("sim", self.sim),
+            waves=script.get("waves", self.waves),
+            compile_strategy=self.compile_strategy,
+        )
 
+    def get_profiles(self) -> List[str]:
+        """Get names of all build profiles available"""
+        return [str(BuildProfile.debug)] + list(self.profiles)
 
-ToolUid = str
-
-
-def find_tool_dir(tool_kind: ToolKind) -> Optional[Path]:
-    """Try to find a directory with executables for the provided tool"""
-    return _Tool.get_subclass_by_kind(tool_kind).find_bin_dir()
 
+ToolUid = str
 
-def generate_script(settings: ToolSettings, design_kind: templates.DesignKind, sources: List[str]) -> ToolScript:
-    """Generate script for the provided tool and design"""
-    return _Tool.get_subclass_by_kind(settings.kind)(settings).generate_script(design_kind, sources)
+# Log of ccache results for every compiled file, which is written during the build
+CCACHE_STATS_FILE = "ccache_stats.log"
+
+# File list used to pass sources to a compiler in the batch mode. It is written by the runner before the build.
+SOURCES_FILE = "sources.f"
+
+# Sources are passed to a compiler in the batch mode via the file list, if there are more of them
+# or they are expanded at run time from glob patterns and file lists
+FILE_LIST_MIN_SOURCES = 20
+
+# Batch compilation is chosen automatically, if spawning of a process per file is estimated to take longer, s
+BATCH_OVERHEAD_LIMIT = 2.0
+
+# Startup time of a compiler, which is used if it can't be measured, s
+DEFAULT_STARTUP_COST = 0.5
+
+# Time limit of the compiler startup measurement, s
+STARTUP_PROBE_TIMEOUT = 10.0
+
+# Measured startup times of the compilers in the project state directory
+STARTUP_CACHE_FILE = "startup.json"
+
+_VERSION_RE = re.compile(r"\d+(?:\.\d+)+(?:-\w+)?")
+_DEFINE_RE = re.compile(r"^[A-Za-z_]\w*(=.*)?$")
+_ARG_RE = re.compile(r"\S+")
+
+_Severity = diagnostics.Severity
+
+# Tables of diagnostics are kept as plain strings, they are compiled on first use only, since most commands don't
+# run any tool
+_DiagnosticTable = List[Tuple[diagnostics.Severity, str]]
+
+# Messages of UVM are the same for all simulators: 'UVM_ERROR tb.sv(10) @ 100: reporter [ID] text'.
+# Time is required to skip lines of the report summary: 'UVM_ERROR :    0'.
+_UVM_DIAGNOSTICS: _DiagnosticTable = [
+    (_Severity.fatal, r"\bUVM_FATAL\b[^:]*@"),
+    (_Severity.error, r"\bUVM_ERROR\b[^:]*@"),
+    (_Severity.warning, r"\bUVM_WARNING\b[^:]*@"),
+]
+
+# vlog and vsim: '** Error: tb.sv(10): (vlog-2730) text', vsim prefixes the output with '# '
+_MODELSIM_DIAGNOSTICS: _DiagnosticTable = [
+    (_Severity.fatal, r"^[#\s]*\*\* Fatal\b"),
+    (_Severity.error, r"^[#\s]*\*\* Error\b"),
+    (_Severity.warning, r"^[#\s]*\*\* Warning\b"),
+]
+
+# xmvlog, xmelab and xmsim: 'xmvlog: *E,UNDIDN (tb.sv,10|4): text'
+_XCELIUM_LOCATION = r"(?:\s*\((?P<file>[^,()\s]+),(?P<line>\d+)(?:\|\d+)?\))?"
+_XCELIUM_DIAGNOSTICS: _DiagnosticTable = [
+    (_Severity.fatal, rf"\*F,\w+{_XCELIUM_LOCATION}"),
+    (_Severity.error, rf"\*E,\w+{_XCELIUM_LOCATION}"),
+    (_Severity.warning, rf"\*W,\w+{_XCELIUM_LOCATION}"),
+]
+
+# Compiler: 'Error-[IND] text' with location on the next line, simulator: 'Error: "tb.sv", 10: text'
+_VCS_DIAGNOSTICS: _DiagnosticTable = [
+    (_Severity.fatal, r"^Fatal(?:-\[\w+\]|: )"),
+    (_Severity.error, r"^Error(?:-\[\w+\]|: )"),
+    (_Severity.warning, r"^Warning(?:-\[\w+\]|: )"),
+]
+
+# Compiler and model: '%Error: tb.sv:10:5: text', '%Warning-WIDTH: tb.sv:10:5: text', '[100] %Fatal: tb.sv:10: text'.
+# Final '%Error: Exiting due to N error(s)' is not a diagnostic itself.
+_VERILATOR_DIAGNOSTICS: _DiagnosticTable = [
+    (_Severity.fatal, r"%Fatal\b"),
+    (_Severity.error, r"%Error\b(?!: Exiting due to)"),
+    (_Severity.warning, r"%Warning\b"),
+]
+
+# Compiler: 'tb.sv:10: error: text', simulator: 'ERROR: tb.sv:10: text'
+_ICARUS_DIAGNOSTICS: _DiagnosticTable = [
+    (_Severity.fatal, r"^FATAL: "),
+    (_Severity.error, r"^ERROR: |^\S+:\d+: (?:error|sorry): "),
+    (_Severity.warning, r"^WARNING: |^\S+:\d+: warning: "),
+]
+
+# Compiler: 'ERROR: [VRFC 10-2989] text [tb.sv:10]', simulator: 'Error: text'
+_VIVADO_DIAGNOSTICS: _DiagnosticTable = [
+    (_Severity.fatal, r"^(?:FATAL_ERROR|Fatal): "),
+    (_Severity.error, r"^(?:ERROR|Error): "),
+    (_Severity.warning, r"^(?:WARNING|Warning): "),
+]
+
+
+def generate_script(
+    settings: ToolSettings, design_kind: templates.DesignKind, sources: List[str], **kwargs: Any
+) -> ToolScript:
+    """Generate script for the provided tool and design. Scripts of other build profiles are added to the debug one."""
+    tool = _Tool.get_subclass_by_kind(settings.kind)(settings)
+    script = tool.generate_script(design_kind, sources, **kwargs)
+    if tool.is_compiled_separately():
+        script.compile_strategy = str(tool._get_compile_strategy(sources, **kwargs))
+    for profile in BuildProfile:
+        if profile != BuildProfile.debug:
+            other = tool.generate_script(design_kind, sources, **dict(kwargs, build_profile=profile))
+            script.profiles[str(profile)] = {"build": other.build, "sim": other.sim, "waves": other.waves}
+    return script
+
+
+def get_seed_opts(tool_kind: ToolKind, seed: int) -> str:
+    """Get simulator options to set the random seed"""
+    return _Tool.get_subclass_by_kind(tool_kind).get_seed_opts(seed)
+
+
+def add_sim_opts(sim_cmds: List[str], opts: str) -> List[str]:
+    """Add options to the simulator invocation, which is the last command of the simulation stage"""
+    if not sim_cmds or not opts:
+        return list(sim_cmds)
+    return sim_cmds[:-1] + [f"{sim_cmds[-1]} {opts}"]
+
+
+def get_threads_opts(tool_kind: ToolKind, threads: int) -> str:
+    """Get build options to create a multithreaded simulation model"""
+    return _Tool.get_subclass_by_kind(tool_kind).get_threads_opts(threads)
+
+
+def add_build_opts(build_cmds: List[ToolStep], opts: str) -> List[ToolStep]:
+    """Add options to the compiler invocation, which is the last command of the build stage"""
+    if not build_cmds or not opts:
+        return list(build_cmds)
+    last = build_cmds[-1]
+    if not isinstance(last, str):
+        raise ValueError(f"Can't add options '{opts}' to the group of build commands {last}")
+    return build_cmds[:-1] + [f"{last} {opts}"]
+
+
+def add_defines(tool_kind: ToolKind, build_cmds: List[ToolStep], defines: List[str]) -> List[ToolStep]:
+    """Add macro definitions 'NAME' or 'NAME=VALUE' to every compiler invocation of the build stage"""
+    if not defines:
+        return list(build_cmds)
+    for define in defines:
+        if not _DEFINE_RE.match(define):
+            raise ValueError(f"Macro definition '{define}' should be 'NAME' or 'NAME=VALUE'")
+
+    tool_cls = _Tool.get_subclass_by_kind(tool_kind)
+    opts = " ".join(shlex.join(tool_cls.get_define_args(d)) for d in defines)
+    exe = tool_cls.get_compile_exe_name()
+
+    def patch(cmd: str) -> str:
+        return f"{cmd} {opts}" if _is_invocation(cmd, exe) else cmd
+
+    return [patch(step) if isinstance(step, str) else [patch(cmd) for cmd in step] for step in build_cmds]
+
+
+def split_build_cmds(tool_kind: ToolKind, build_cmds: List[ToolStep]) -> Tuple[List[ToolStep], List[ToolStep]]:
+    """Split commands of the build stage to compilation of sources and elaboration of the design.
+    Elaboration is everything after the last compiler invocation, it is empty for single-step tools."""
+    exe = _Tool.get_subclass_by_kind(tool_kind).get_compile_exe_name()
+    last = -1
+    for i, step in enumerate(build_cmds):
+        group = step if isinstance(step, list) else [step]
+        if any(_is_invocation(cmd, exe) for cmd in group):
+            last = i
+    if last < 0:
+        return list(build_cmds), []
+    return build_cmds[: last + 1], build_cmds[last + 1 :]  # noqa: E203
+
+
+def _is_invocation(cmd: str, exe: str) -> bool:
+    """Check that the command invokes the executable"""
+    return cmd.split(maxsplit=1)[:1] == [exe]
+
+
+def get_plusargs_opts(tool_kind: ToolKind, plusargs: List[str]) -> str:
+    """Get simulator options to pass plusargs to the testbench"""
+    for plusarg in plusargs:
+        if not plusarg.startswith("+") or len(plusarg) < 2:
+            raise ValueError(f"Plusarg '{plusarg}' should start with '+', e.g. '+UVM_TESTNAME=test'")
+    tool_cls = _Tool.get_subclass_by_kind(tool_kind)
+    return " ".join(shlex.join(tool_cls.get_plusarg_args(p)) for p in plusargs)
+
+
+def get_file_list(tool_kind: ToolKind, sources: filelist.Sources) -> str:
+    """Get content of the file list with sources of the project in their order.
+    Empty string is returned if there are no sources."""
+    return _Tool.get_subclass_by_kind(tool_kind).get_file_list(sources)
+
+
+def schedule_compile_steps(
+    tool_kind: ToolKind,
+    build_cmds: List[ToolStep],
+    groups: List[List[str]],
+    selected: Optional[Set[str]] = None,
+    strategy: CompileStrategy = CompileStrategy.per_file,
+) -> List[ToolStep]:
+    """Order compilation of the sources according to the groups of the dependency graph. Commands compiling one source
+    each are split to the groups, or merged to a single command in the batch mode. Compilers update the index of
+    the library without locking, so commands of a group are executed in parallel only if they write to different
+    libraries. Sources of a command compiling several of them are reordered. Only the selected sources are compiled
+    if they are provided. Other steps are left in their places."""
+    tool_cls = _Tool.get_subclass_by_kind(tool_kind)
+    if not tool_cls.is_compiled_separately():
+        return list(build_cmds)
+    patched_groups = [tool_cls._patch_sources(group) for group in groups]
+    order = {s: i for i, s in enumerate(s for group in patched_groups for s in group)}
+    patched_selected = None if selected is None else set(tool_cls._patch_sources(list(selected)))
+    exe = tool_cls.get_compile_exe_name()
+
+    def get_sources(cmd: str) -> List[Match[str]]:
+        return [m for m in _ARG_RE.finditer(cmd) if m.group() in order] if _is_invocation(cmd, exe) else []
+
+    steps: List[ToolStep] = []
+    compile_cmds: Dict[str, str] = {}
+    position = None
+    for step in build_cmds:
+        cmds = step if isinstance(step, list) else [step]
+        found = [get_sources(cmd) for cmd in cmds]
+        if all(len(matches) == 1 for matches in found):
+            position = len(steps) if position is None else position
+            compile_cmds.update((matches[0].group(), cmd) for matches, cmd in zip(found, cmds))
+        elif isinstance(step, str) and len(found[0]) > 1:
+            batch_cmd = _reorder_sources(step, found[0], order, patched_selected)
+            if batch_cmd:
+                steps.append(batch_cmd)
+        else:
+            steps.append(step)
+    if position is None:
+        return steps
+
+    compiled = [s for s in order if s in compile_cmds and (patched_selected is None or s in patched_selected)]
+    scheduled: List[ToolStep] = []
+    if strategy == CompileStrategy.batch and len(compiled) > 1:
+        scheduled.append(_merge_compile_cmds(compile_cmds[compiled[0]], compiled))
+    else:
+        compiled_set = set(compiled)
+        for group in patched_groups:
+            scheduled.extend(_split_by_library([compile_cmds[s] for s in group if s in compiled_set]))
+    return steps[:position] + scheduled + steps[position:]
+
+
+def _get_work_library(cmd: str) -> str:
+    """Get library the compiler command writes to. Empty string is returned for the default library."""
+    args = cmd.split()
+    for opt, value in zip(args, args[1:]):
+        if opt in ("-work", "--work"):
+            return value.split("=")[0]
+    return ""
+
+
+def _split_by_library(cmds: List[str]) -> List[ToolStep]:
+    """Split independent compiler commands to sequential groups, where every command writes to its own library"""
+    groups: List[List[str]] = []
+    for cmd in cmds:
+        library = _get_work_library(cmd)
+        for group in groups:
+            if all(_get_work_library(c) != library for c in group):
+                group.append(cmd)
+                break
+        else:
+            groups.append([cmd])
+    return [group if len(group) > 1 else group[0] for group in groups]
+
+
+def _merge_compile_cmds(cmd: str, sources: List[str]) -> str:
+    """Replace the only source of the command with all the sources. Many of them are passed via the file list."""
+    match = [m for m in _ARG_RE.finditer(cmd) if m.group() == sources[0]][0]
+    sources_opts = f"-f {SOURCES_FILE}" if len(sources) > FILE_LIST_MIN_SOURCES else " ".join(sources)
+    return cmd[: match.start()] + sources_opts + cmd[match.end() :]  # noqa: E203
+
+
+def _reorder_sources(
+    cmd: str, matches: List[Match[str]], order: Dict[str, int], selected: Optional[Set[str]]
+) -> Optional[str]:
+    """Put sources of the command to the place of the first one in the provided order. Other arguments are kept.
+    None is returned if none of the sources is selected."""
+    sources = sorted((m.group() for m in matches if selected is None or m.group() in selected), key=order.__getitem__)
+    if not sources:
+        return None
+    result = cmd[: matches[0].start()] + " ".join(sources)
+    for prev, match in zip(matches, matches[1:]):
+        gap = cmd[prev.end() : match.start()]  # noqa: E203
+        if gap.strip():
+            result += gap.rstrip()
+    return result + cmd[matches[-1].end() :]  # noqa: E203
+
+
+def _compile_diagnostics(*tables: _DiagnosticTable) -> List[diagnostics.DiagnosticPattern]:
+    # Compiled expressions are cached by the re module, so it's cheap to do for every run
+    return [(severity, re.compile(pattern)) for table in tables for severity, pattern in table]
+
+
+def get_diagnostic_patterns(tool_kind: ToolKind) -> List[diagnostics.DiagnosticPattern]:
+    """Get patterns of fatals, errors and warnings in the output of the tool"""
+    return _Tool.get_subclass_by_kind(tool_kind).get_diagnostic_patterns()
+
+
+def is_threads_tuned(settings: ToolSettings) -> bool:
+    """Check that number of simulation threads has to be found automatically"""
+    return settings.extras.get("threads") == "auto"
+
+
+def get_licenses(settings: ToolSettings) -> Optional[Tuple[str, int]]:
+    """Get pool of licenses used by every process of the tool and its size. Tools of the same kind share the pool
+    by default. None is returned if the number of licenses is not limited."""
+    limit = settings.extras.get("licenses")
+    if limit is None:
+        return None
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise ValueError(f"Number of licenses should be a positive integer, but '{limit}' was provided")
+    return str(settings.extras.get("license-pool", settings.kind)), limit
+
+
+def get_version_cmd(tool_kind: ToolKind, bin_dir: Path) -> List[str]:
+    """Get command to print version of the tool installed to the provided directory"""
+    tool_cls = _Tool.get_subclass_by_kind(tool_kind)
+    return [str(bin_dir.joinpath(tool_cls.get_base_exe_name())), tool_cls.get_version_opt()]
+
+
+def parse_version(text: str) -> Optional[str]:
+    """Extract version from the output of the version command"""
+    match = _VERSION_RE.search(text)
+    return match.group(0) if match else None
+
+
+def get_incremental_dirs(settings: ToolSettings) -> List[str]:
+    """Get directories inside the working directory, which are kept between builds to allow incremental compilation"""
+    return _Tool.get_subclass_by_kind(settings.kind)(settings).get_incremental_dirs()
+
+
+def get_startup_cost(settings: ToolSettings) -> float:
+    """Get startup time of the compiler. It is measured once and cached in the project state directory until
+    the executable changes. Default value is used if the compiler can't be started."""
+    tool_cls = _Tool.get_subclass_by_kind(settings.kind)
+    exe = settings.bin_dir.joinpath(tool_cls.get_compile_exe_name())
+    try:
+        stat = exe.stat()
+    except OSError:
+        return DEFAULT_STARTUP_COST
+    fingerprint = f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    cache_file = utils.get_state_file(STARTUP_CACHE_FILE)
+    try:
+        cache = utils.load_json(cache_file)
+    except (OSError, ValueError):
+        cache = {}
+    cached = cache.get(str(exe), {})
+    if cached.get("fingerprint") == fingerprint:
+        return float(cached["cost"])
+
+    cost = _probe_startup_cost([str(exe), tool_cls.get_version_opt()])
+    cache[str(exe)] = {"fingerprint": fingerprint, "cost": cost}
+    try:
+        cache_file.parent.mkdir(exist_ok=True)
+        utils.dump_json(cache_file, cache)
+    except OSError as e:
+        _logger.debug(f"Can't save startup time of the compiler to '{cache_file}': {e}")
+    return cost
+
+
+def _probe_startup_cost(cmd: List[str]) -> float:
+    """Measure time of the command, which does nothing but starts the compiler"""
+    start = time.monotonic()
+    try:
+        subprocess.run(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=STARTUP_PROBE_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        return STARTUP_PROBE_TIMEOUT
+    except OSError:
+        return DEFAULT_STARTUP_COST
+    return time.monotonic() - start
+
+
+def get_compile_strategy(settings: ToolSettings, script: ToolScript, n_sources: int) -> CompileStrategy:
+    """Get compile strategy of the build. Automatic one is batch if spawning a compiler per file is estimated to take
+    longer than the limit. Compiler startup is measured only here, so generation of scripts doesn't spawn it."""
+    strategy = CompileStrategy(script.compile_strategy or CompileStrategy.per_file)
+    if strategy != CompileStrategy.auto:
+        return strategy
+    if n_sources < 2:
+        return CompileStrategy.per_file
+    overhead = (n_sources - 1) * get_startup_cost(settings)
+    return CompileStrategy.batch if overhead > BATCH_OVERHEAD_LIMIT else CompileStrategy.per_file
+
+
+def is_partial_compile_supported(settings: ToolSettings) -> bool:
+    """Check that only changed sources and their dependents can be compiled into the kept libraries"""
+    return _Tool.get_subclass_by_kind(settings.kind).is_compiled_separately() and bool(get_incremental_dirs(settings))
+
+
+def get_build_env(settings: ToolSettings, work_dir: Path) -> Dict[str, str]:
+    """Get environment variables added by playhdl to the build stage"""
+    return _Tool.get_subclass_by_kind(settings.kind)(settings).get_build_env(work_dir)
+
+
+def get_tool_fingerprint(settings: ToolSettings) -> str:
+    """Get string which changes whenever the tool installation changes"""
+    exe = settings.bin_dir.joinpath(_Tool.get_subclass_by_kind(settings.kind).get_base_exe_name())
+    try:
+        stat = exe.stat()
+    except OSError:
+        return f"{settings.kind}:{exe}"
+    return f"{settings.kind}:{exe}:{stat.st_size}:{stat.st_mtime_ns}"
 
 
 def get_compatibility_text_table() -> str:
@@ -111,6 +538,79 @@ class _Tool(ABC):
         """Get supported design kinds for the tool"""
         raise NotImplementedError
 
+    @classmethod
+    def get_seed_opts(cls, seed: int) -> str:
+        """Get simulator options to set the random seed"""
+        raise ValueError(f"{cls.get_kind()} doesn't support setting of the random seed")
+
+    @classmethod
+    def get_threads_opts(cls, threads: int) -> str:
+        """Get build options to create a multithreaded simulation model"""
+        raise ValueError(f"{cls.get_kind()} doesn't support multithreaded simulation")
+
+    @classmethod
+    def get_define_args(cls, define: str) -> List[str]:
+        """Get compiler arguments to define a macro"""
+        return [f"-D{define}"]
+
+    @classmethod
+    def get_include_args(cls, include_dir: str) -> List[str]:
+        """Get arguments of the file list to add a directory to search included files"""
+        return [f"+incdir+{include_dir}"]
+
+    @classmethod
+    def get_file_list_define_args(cls, define: str) -> List[str]:
+        """Get arguments of the file list to define a macro"""
+        return cls.get_define_args(define)
+
+    @classmethod
+    def get_plusarg_args(cls, plusarg: str) -> List[str]:
+        """Get simulator arguments to pass a plusarg to the testbench"""
+        return [plusarg]
+
+    @classmethod
+    def get_file_list(cls, sources: filelist.Sources) -> str:
+        """Get content of the file list, which is relative to the working directory"""
+        if not sources.files:
+            return ""
+        lines = [shlex.join(cls.get_include_args(d)) for d in cls._patch_sources(sources.include_dirs)]
+        lines.extend(shlex.join(cls.get_file_list_define_args(d)) for d in sources.defines)
+        lines.extend(cls._patch_sources(sources.files))
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def get_diagnostic_patterns(cls) -> List[diagnostics.DiagnosticPattern]:
+        """Get patterns of fatals, errors and warnings in the output of the tool"""
+        return _compile_diagnostics(_UVM_DIAGNOSTICS)
+
+    def get_incremental_dirs(self) -> List[str]:
+        """Get directories inside the working directory, which are kept between builds"""
+        return self.get_library_dirs() if self._is_incremental() else []
+
+    @classmethod
+    def get_library_dirs(cls) -> List[str]:
+        """Get files and directories with compiled design, which are reused by incremental compilation"""
+        return []
+
+    def get_build_env(self, work_dir: Path) -> Dict[str, str]:
+        """Get environment variables added to the build stage"""
+        return {}
+
+    @classmethod
+    def get_version_opt(cls) -> str:
+        """Get option of the basic executable to print version"""
+        return "-version"
+
+    @classmethod
+    def get_compile_exe_name(cls) -> str:
+        """Get name of the executable, which compiles sources"""
+        return cls.get_base_exe_name()
+
+    @classmethod
+    def is_compiled_separately(cls) -> bool:
+        """Check that sources are compiled into a library before elaboration, so they can be compiled one by one"""
+        return False
+
     @classmethod
     def get_subclass_by_kind(cls, tool_kind: ToolKind) -> Type[_Tool]:
         """Get template class according to tool kind"""
@@ -119,11 +619,14 @@ class _Tool(ABC):
                 return cls
         raise ValueError(f"Can't find tool class for tool_kind={tool_kind}")
 
+    def _is_incremental(self) -> bool:
+        """Check that incremental compilation is enabled for the tool"""
+        return bool(self.settings.extras.get("incremental", False))
+
     @classmethod
-    def find_bin_dir(cls) -> Optional[Path]:
-        """Try to find a directory with executables for the provided tool"""
-        bin_dir = shutil.which(cls.get_base_exe_name())
-        return Path(bin_dir).parent if bin_dir else None
+    def _is_fast(cls, kwargs: Dict[str, Any]) -> bool:
+        """Check that script is generated for the fast build profile"""
+        return BuildProfile(kwargs.get("build_profile", BuildProfile.debug)) == BuildProfile.fast
 
     @classmethod
     def _validate_design_kind(cls, design_kind: templates.DesignKind) -> None:
@@ -133,8 +636,40 @@ class _Tool(ABC):
 
     @classmethod
     def _patch_sources(cls, sources: List[str]) -> List[str]:
-        """Patch paths to sources"""
-        return [f"../{s}" for s in sources]
+        """Patch paths to sources to be relative to the working directory"""
+        return [s if os.path.isabs(s) else f"../{s}" for s in sources]
+
+    @classmethod
+    def _is_file_list_used(cls, sources: List[str]) -> bool:
+        """Check that sources are passed to the compiler via the file list instead of the command line"""
+        return len(sources) > FILE_LIST_MIN_SOURCES or filelist.has_patterns(sources)
+
+    @classmethod
+    def _get_sources_opts(cls, sources: List[str]) -> str:
+        """Get compiler options to pass all sources at once"""
+        if cls._is_file_list_used(sources):
+            return f"-f {SOURCES_FILE}"
+        return cls._stringify_sources(cls._patch_sources(sources))
+
+    def _get_compile_strategy(self, sources: List[str], **kwargs: Any) -> CompileStrategy:
+        """Get compilation strategy of the script. Automatic one is resolved at build time (see get_compile_strategy())
+        and the script compiles files one by one until then."""
+        if filelist.has_patterns(sources):
+            # Sources are known only at run time, so they can't be split to commands
+            return CompileStrategy.batch
+        return CompileStrategy(kwargs.get("compile_strategy", CompileStrategy.auto))
+
+    def _generate_compile_steps(
+        self, sources: List[str], compile_cmd: Callable[[str], str], **kwargs: Any
+    ) -> List[ToolStep]:
+        """Generate compilation steps according to the strategy. Sources keep the order of the project, they are
+        reordered by dependencies on every build (see schedule_compile_steps())."""
+        if self._get_compile_strategy(sources, **kwargs) == CompileStrategy.batch:
+            if self._is_file_list_used(sources):
+                return [compile_cmd(f"-f {SOURCES_FILE}")]
+            return [compile_cmd(self._stringify_sources(self._patch_sources(sources)))]
+
+        return [compile_cmd(s) for s in self._patch_sources(sources)]
 
     @classmethod
     def _stringify_sources(cls, sources: List[str], separator: str = " ") -> str:
@@ -155,10 +690,15 @@ class _Icarus(_Tool):
         if design_kind == templates.DesignKind.sv:
             lang_ver = "-g2012"
 
-        sources_opts = self._stringify_sources(self._patch_sources(sources))
-        build_cmds = [f"iverilog -Wall {lang_ver} {sources_opts} -o tb.out"]
-        sim_cmds = ["vvp tb.out"]
-        waves_cmds = ["gtkwave tb.vcd"]
+        waves_format = WavesFormat(kwargs.get("waves_format", WavesFormat.vcd))
+        waves_opts = {WavesFormat.vcd: ("", ""), WavesFormat.fst: (" -DWAVES_FST", " -fst")}[waves_format]
+        if self._is_fast(kwargs):
+            waves_opts = (" -DNO_WAVES", " -none")
+
+        sources_opts = self._get_sources_opts(sources)
+        build_cmds: List[ToolStep] = [f"iverilog -Wall {lang_ver}{waves_opts[0]} {sources_opts} -o tb.out"]
+        sim_cmds = [f"vvp tb.out{waves_opts[1]}"]
+        waves_cmds = [] if self._is_fast(kwargs) else [f"gtkwave tb.{waves_format}"]
 
         return ToolScript(build=build_cmds, sim=sim_cmds, waves=waves_cmds)
 
@@ -170,10 +710,22 @@ class _Icarus(_Tool):
     def get_kind(cls) -> ToolKind:
         return ToolKind.ICARUS
 
+    @classmethod
+    def get_file_list_define_args(cls, define: str) -> List[str]:
+        return [f"+define+{define}"]
+
+    @classmethod
+    def get_diagnostic_patterns(cls) -> List[diagnostics.DiagnosticPattern]:
+        return _compile_diagnostics(_ICARUS_DIAGNOSTICS, _UVM_DIAGNOSTICS)
+
     @classmethod
     def get_base_exe_name(cls) -> str:
         return "iverilog"
 
+    @classmethod
+    def get_version_opt(cls) -> str:
+        return "-V"
+
 
 class _Modelsim(_Tool):
     """Siemens (Mentor Grapthics) Modelsim"""
@@ -188,13 +740,20 @@ class _Modelsim(_Tool):
         if design_kind == templates.DesignKind.sv:
             vlog_opts = "-sv"
 
-        build_cmds = ["vlib worklib", "vmap work worklib"]
-        for s in self._patch_sources(sources):
-            if design_kind in (templates.DesignKind.verilog, templates.DesignKind.sv):
-                build_cmds.append(f"vlog {vlog_opts} {s}")
+        if self._is_fast(kwargs):
+            vlog_opts += " +define+NO_WAVES"
+        if self._is_incremental():
+            vlog_opts += " -incr"
+
+        build_cmds: List[ToolStep] = ["vlib worklib", "vmap work worklib"]
+        build_cmds.extend(self._generate_compile_steps(sources, lambda s: f"vlog {vlog_opts} {s}", **kwargs))
 
-        sim_cmds = ['vsim -c worklib.tb -do "log -r *;run -all"']
-        waves_cmds = ["vsim -view vsim.wlf"]
+        if self._is_fast(kwargs):
+            sim_cmds = ['vsim -c worklib.tb -do "run -all"']
+            waves_cmds = []
+        else:
+            sim_cmds = ['vsim -c worklib.tb -do "log -r *;run -all"']
+            waves_cmds = ["vsim -view vsim.wlf"]
 
         return ToolScript(build=build_cmds, sim=sim_cmds, waves=waves_cmds)
 
@@ -206,10 +765,34 @@ class _Modelsim(_Tool):
     def get_kind(cls) -> ToolKind:
         return ToolKind.MODELSIM
 
+    @classmethod
+    def get_diagnostic_patterns(cls) -> List[diagnostics.DiagnosticPattern]:
+        return _compile_diagnostics(_MODELSIM_DIAGNOSTICS, _UVM_DIAGNOSTICS)
+
+    @classmethod
+    def get_seed_opts(cls, seed: int) -> str:
+        return f"-sv_seed {seed}"
+
+    @classmethod
+    def get_define_args(cls, define: str) -> List[str]:
+        return [f"+define+{define}"]
+
     @classmethod
     def get_base_exe_name(cls) -> str:
         return "vsim"
 
+    @classmethod
+    def get_library_dirs(cls) -> List[str]:
+        return ["worklib", "modelsim.ini"]
+
+    @classmethod
+    def get_compile_exe_name(cls) -> str:
+        return "vlog"
+
+    @classmethod
+    def is_compiled_separately(cls) -> bool:
+        return True
+
 
 class _Xcelium(_Tool):
     """Cadence Xcelium"""
@@ -224,11 +807,16 @@ class _Xcelium(_Tool):
         if design_kind == templates.DesignKind.sv:
             vlog_opts = "-sv"
 
-        build_cmds = []
-        for s in self._patch_sources(sources):
-            if design_kind in (templates.DesignKind.verilog, templates.DesignKind.sv):
-                build_cmds.append(f"xmvlog {vlog_opts} {s}")
-        build_cmds.append("xmelab -access +rwc -snapshot tbsim tb")
+        elab_opts = " -access +rwc"
+        if self._is_fast(kwargs):
+            vlog_opts += " -define NO_WAVES"
+            elab_opts = ""
+        if self._is_incremental():
+            vlog_opts += " -update"
+            elab_opts += " -update"
+
+        build_cmds = self._generate_compile_steps(sources, lambda s: f"xmvlog {vlog_opts} {s}", **kwargs)
+        build_cmds.append(f"xmelab{elab_opts} -snapshot tbsim tb")
 
         sim_cmds = ["xmsim tbsim"]
 
@@ -236,6 +824,8 @@ class _Xcelium(_Tool):
             'echo "database open -overwrite tb.vcd" > waves.cmd',
             "simvision -input waves.cmd -waves",
         ]
+        if self._is_fast(kwargs):
+            waves_cmds = []
 
         return ToolScript(build=build_cmds, sim=sim_cmds, waves=waves_cmds)
 
@@ -247,10 +837,34 @@ class _Xcelium(_Tool):
     def get_kind(cls) -> ToolKind:
         return ToolKind.XCELIUM
 
+    @classmethod
+    def get_diagnostic_patterns(cls) -> List[diagnostics.DiagnosticPattern]:
+        return _compile_diagnostics(_XCELIUM_DIAGNOSTICS, _UVM_DIAGNOSTICS)
+
+    @classmethod
+    def get_seed_opts(cls, seed: int) -> str:
+        return f"-svseed {seed}"
+
+    @classmethod
+    def get_define_args(cls, define: str) -> List[str]:
+        return ["-define", define]
+
     @classmethod
     def get_base_exe_name(cls) -> str:
         return "xmsim"
 
+    @classmethod
+    def get_library_dirs(cls) -> List[str]:
+        return ["xcelium.d"]
+
+    @classmethod
+    def get_compile_exe_name(cls) -> str:
+        return "xmvlog"
+
+    @classmethod
+    def is_compiled_separately(cls) -> bool:
+        return True
+
 
 class _Verilator(_Tool):
     """Veripool Verilator"""
@@ -265,13 +879,39 @@ class _Verilator(_Tool):
         if design_kind == templates.DesignKind.sv:
             lang_ver = "+systemverilogext+sv"
 
-        sources_opts = self._stringify_sources(self._patch_sources(sources))
-        build_cmds = [f"verilator {lang_ver} --trace --binary -j 0 {sources_opts}"]
+        threads_opts = ""
+        threads = self.settings.extras.get("threads")
+        if isinstance(threads, int):
+            threads_opts = f" {self.get_threads_opts(threads)}"
+        elif threads not in [None, "auto"]:
+            raise ValueError(f"Number of threads should be integer or 'auto', but '{threads}' was provided")
+        if "trace-threads" in self.settings.extras and not self._is_fast(kwargs):
+            threads_opts += f" --trace-threads {int(self.settings.extras['trace-threads'])}"
+
+        waves_format = WavesFormat(kwargs.get("waves_format", WavesFormat.vcd))
+        trace_opts = {WavesFormat.vcd: "--trace", WavesFormat.fst: "--trace-fst -DWAVES_FST"}[waves_format]
+        if self._is_fast(kwargs):
+            trace_opts = "-DNO_WAVES"
+
+        sources_opts = self._get_sources_opts(sources)
+        build_cmds: List[ToolStep] = [f"verilator {lang_ver} {trace_opts} --binary -j 0{threads_opts} {sources_opts}"]
         sim_cmds = ["./obj_dir/Vtb"]
-        waves_cmds = ["gtkwave tb.vcd"]
+        waves_cmds = [] if self._is_fast(kwargs) else [f"gtkwave tb.{waves_format}"]
 
         return ToolScript(build=build_cmds, sim=sim_cmds, waves=waves_cmds)
 
+    @classmethod
+    def get_library_dirs(cls) -> List[str]:
+        return ["obj_dir"]
+
+    def get_build_env(self, work_dir: Path) -> Dict[str, str]:
+        if not self.get_incremental_dirs():
+            return {}
+        ccache = shutil.which("ccache", path=f"{self.settings.bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+        if not ccache:
+            return {}
+        return {"OBJCACHE": ccache, "CCACHE_STATSLOG": str(work_dir.resolve().joinpath(CCACHE_STATS_FILE))}
+
     @classmethod
     def get_supported_design_kinds(cls) -> List[templates.DesignKind]:
         return [templates.DesignKind.verilog, templates.DesignKind.sv]
@@ -280,10 +920,26 @@ class _Verilator(_Tool):
     def get_kind(cls) -> ToolKind:
         return ToolKind.VERILATOR
 
+    @classmethod
+    def get_diagnostic_patterns(cls) -> List[diagnostics.DiagnosticPattern]:
+        return _compile_diagnostics(_VERILATOR_DIAGNOSTICS, _UVM_DIAGNOSTICS)
+
+    @classmethod
+    def get_seed_opts(cls, seed: int) -> str:
+        return f"+verilator+seed+{seed}"
+
+    @classmethod
+    def get_threads_opts(cls, threads: int) -> str:
+        return f"--threads {threads}"
+
     @classmethod
     def get_base_exe_name(cls) -> str:
         return "verilator"
 
+    @classmethod
+    def get_version_opt(cls) -> str:
+        return "--version"
+
 
 class _Vcs(_Tool):
     """Synopsys VCS"""
@@ -305,12 +961,20 @@ class _Vcs(_Tool):
         elif design_kind == templates.DesignKind.sv_uvm12:
             vlog_opts = "-sverilog -ntb_opts uvm-1.2"
 
-        sources_opts = self._stringify_sources(self._patch_sources(sources))
-        build_cmds = [f"vcs -full64 {vlog_opts} -debug_acc+all +vcs+vcdpluson +vcs+fsdbon {sources_opts}"]
+        debug_opts = "-debug_acc+all +vcs+vcdpluson +vcs+fsdbon"
+        if self._is_fast(kwargs):
+            debug_opts = "+define+NO_WAVES"
+        if self._is_incremental():
+            debug_opts += " -Mupdate"
+
+        sources_opts = self._get_sources_opts(sources)
+        build_cmds: List[ToolStep] = [f"vcs -full64 {vlog_opts} {debug_opts} {sources_opts}"]
 
         sim_cmds = ["./simv"]
 
-        if self.gui == self._GuiKind.VERDI:
+        if self._is_fast(kwargs):
+            waves_cmds = []
+        elif self.gui == self._GuiKind.VERDI:
             waves_cmds = ["verdi -ssf novas.fsdb"]
         else:
             waves_cmds = ["dve -vpd vcdplus.vpd"]
@@ -329,10 +993,30 @@ class _Vcs(_Tool):
     def get_kind(cls) -> ToolKind:
         return ToolKind.VCS
 
+    @classmethod
+    def get_diagnostic_patterns(cls) -> List[diagnostics.DiagnosticPattern]:
+        return _compile_diagnostics(_VCS_DIAGNOSTICS, _UVM_DIAGNOSTICS)
+
+    @classmethod
+    def get_seed_opts(cls, seed: int) -> str:
+        return f"+ntb_random_seed={seed}"
+
+    @classmethod
+    def get_define_args(cls, define: str) -> List[str]:
+        return [f"+define+{define}"]
+
     @classmethod
     def get_base_exe_name(cls) -> str:
         return "vcs"
 
+    @classmethod
+    def get_library_dirs(cls) -> List[str]:
+        return ["csrc", "simv", "simv.daidir"]
+
+    @classmethod
+    def get_version_opt(cls) -> str:
+        return "-ID"
+
 
 class _Vivado(_Tool):
     """Xilinx Vivado"""
@@ -344,28 +1028,40 @@ class _Vivado(_Tool):
         self._validate_design_kind(design_kind)
 
         uvm_vlog_opts = ""
-        uvm_elab_opts = ""
+        elab_opts = ""
         if design_kind == templates.DesignKind.sv_uvm12:
             uvm_vlog_opts = "-uvm_version 1.2 -L uvm"
-            uvm_elab_opts = "-L uvm"
-
-        build_cmds = []
-        for s in self._patch_sources(sources):
-            if design_kind == templates.DesignKind.verilog:
-                build_cmds.append(f"xvlog -work worklib {s}")
-            elif design_kind in [templates.DesignKind.sv, templates.DesignKind.sv_uvm12]:
-                build_cmds.append(f"xvlog -work worklib -sv {uvm_vlog_opts} {s}")
-        build_cmds.append(f"xelab worklib.tb {uvm_elab_opts} --debug all -s tbsim")
-
-        sim_cmds = [
-            'echo "log_wave -recursive *;run all;quit" > sim.tcl',
-            "xsim tbsim --wdb tb.wdb --t sim.tcl",
-        ]
+            elab_opts = "-L uvm"
 
-        waves_cmds = [
-            'echo "open_wave_database tb.wdb" > waves.tcl',
-            "vivado -source waves.tcl",
-        ]
+        xvlog_opts = "-work worklib"
+        if design_kind in [templates.DesignKind.sv, templates.DesignKind.sv_uvm12]:
+            xvlog_opts = f"-work worklib -sv {uvm_vlog_opts}"
+
+        if self._is_fast(kwargs):
+            xvlog_opts += " -d NO_WAVES"
+
+        if self._is_incremental():
+            elab_opts += " --incr"
+
+        build_cmds = self._generate_compile_steps(sources, lambda s: f"xvlog {xvlog_opts} {s}", **kwargs)
+
+        if self._is_fast(kwargs):
+            build_cmds.append(f"xelab worklib.tb {elab_opts} -s tbsim")
+            sim_cmds = [
+                'echo "run all;quit" > sim.tcl',
+                "xsim tbsim --t sim.tcl",
+            ]
+            waves_cmds = []
+        else:
+            build_cmds.append(f"xelab worklib.tb {elab_opts} --debug all -s tbsim")
+            sim_cmds = [
+                'echo "log_wave -recursive *;run all;quit" > sim.tcl',
+                "xsim tbsim --wdb tb.wdb --t sim.tcl",
+            ]
+            waves_cmds = [
+                'echo "open_wave_database tb.wdb" > waves.tcl',
+                "vivado -source waves.tcl",
+            ]
 
         return ToolScript(build=build_cmds, sim=sim_cmds, waves=waves_cmds)
 
@@ -381,6 +1077,42 @@ class _Vivado(_Tool):
     def get_kind(cls) -> ToolKind:
         return ToolKind.VIVADO
 
+    @classmethod
+    def get_diagnostic_patterns(cls) -> List[diagnostics.DiagnosticPattern]:
+        return _compile_diagnostics(_VIVADO_DIAGNOSTICS, _UVM_DIAGNOSTICS)
+
+    @classmethod
+    def get_seed_opts(cls, seed: int) -> str:
+        return f"-sv_seed {seed}"
+
+    @classmethod
+    def get_define_args(cls, define: str) -> List[str]:
+        return ["-d", define]
+
+    @classmethod
+    def get_include_args(cls, include_dir: str) -> List[str]:
+        return ["-i", include_dir]
+
+    @classmethod
+    def get_plusarg_args(cls, plusarg: str) -> List[str]:
+        return ["--testplusarg", plusarg[1:]]
+
     @classmethod
     def get_base_exe_name(cls) -> str:
         return "xsim"
+
+    @classmethod
+    def get_library_dirs(cls) -> List[str]:
+        return ["xsim.dir"]
+
+    @classmethod
+    def get_compile_exe_name(cls) -> str:
+        return "xvlog"
+
+    @classmethod
+    def is_compiled_separately(cls) -> bool:
+        return True
+
+    @classmethod
+    def get_version_opt(cls) -> str:
+        return "--version"
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from . import log, tools, utils
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+_logger = log.get_logger()
+
+TUNING_FILE = "tuning.json"
+
+
+def _get_tuning_file() -> Path:
+    return utils.get_state_file(TUNING_FILE)
+
+
+def get_key(settings: tools.ToolSettings, script: tools.ToolScript) -> str:
+    """Calculate key of the tuning. Sources are not a part of it, so editing design doesn't cause a new search."""
+    data = {
+        "build": script.build,
+        "sim": script.sim,
+        "extras": settings.extras,
+        "tool": tools.get_tool_fingerprint(settings),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def get_threads_candidates(max_threads: int) -> List[int]:
+    """Get numbers of threads to try: powers of two up to the provided maximum"""
+    candidates = []
+    threads = 1
+    while threads <= max_threads:
+        candidates.append(threads)
+        threads *= 2
+    return candidates
+
+
+def _load() -> Dict[str, Any]:
+    try:
+        return utils.load_json(_get_tuning_file())
+    except (OSError, ValueError):
+        return {}
+
+
+def load_threads(tool_uid: tools.ToolUid, key: str) -> Optional[int]:
+    """Load the best number of threads found for the tool earlier"""
+    result = _load().get(tool_uid, {})
+    return int(result["threads"]) if result.get("key") == key else None
+
+
+def save_threads(tool_uid: tools.ToolUid, key: str, threads: int, timings: Dict[int, float]) -> None:
+    """Save the best number of threads and all timings of the search"""
+    data = _load()
+    data[tool_uid] = {"key": key, "threads": threads, "timings": {str(k): v for k, v in timings.items()}}
+    _get_tuning_file().parent.mkdir(exist_ok=True)
+    utils.dump_json(_get_tuning_file(), data)
+    _logger.info(f"Tuning results were saved to '{_get_tuning_file()}'")
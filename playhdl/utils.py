@@ -3,16 +3,25 @@ from enum import Enum
 from pathlib import Path
 from typing import Any, Dict, List, Union
 
-import pkg_resources
-
 from . import log
 
 _logger = log.get_logger()
 
+# Directory with the project state, which is not a part of the project description
+STATE_DIR = ".playhdl"
+
 
 def get_pkg_version() -> str:
     """Get version of the package"""
-    return pkg_resources.get_distribution("playhdl").version
+    # Metadata machinery is slow to import, so it's loaded only when the version is needed
+    from importlib import metadata
+
+    return metadata.version("playhdl")
+
+
+def get_state_file(name: str) -> Path:
+    """Get file in the state directory of the project"""
+    return Path(STATE_DIR, name)
 
 
 class ExtendedJsonEncoder(json.JSONEncoder):
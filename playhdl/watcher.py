@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from . import log
+
+if TYPE_CHECKING:
+    import threading
+    from pathlib import Path
+
+_logger = log.get_logger()
+
+# Interval of polling files, when inotify is not available, and of checking the stop request, s
+POLL_INTERVAL = 0.2
+
+# Changes are collected until there are no new ones for this time, so a burst of saves causes a single run, s
+DEBOUNCE_TIME = 0.3
+
+# Events of inotify, which are relevant for the watched files. Editors often save files via rename of a new one.
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_IN_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+_IN_EVENT = struct.Struct("iIII")
+
+
+class Watcher(ABC):
+    """Watcher of file changes"""
+
+    def __init__(self, files: List[Path]) -> None:
+        self.files = {f.absolute() for f in files}
+
+    @abstractmethod
+    def wait(self, timeout: float) -> Set[Path]:
+        """Wait for changes of the files and return changed ones. Empty set is returned on timeout."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release resources of the watcher"""
+
+    def __enter__(self) -> Watcher:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+class PollingWatcher(Watcher):
+    """Watcher, which compares stats of the files periodically"""
+
+    def __init__(self, files: List[Path], interval: float = POLL_INTERVAL) -> None:
+        super().__init__(files)
+        self.interval = interval
+        self._stamps = {f: self._stamp(f) for f in self.files}
+
+    @staticmethod
+    def _stamp(file: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def wait(self, timeout: float) -> Set[Path]:
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = set()
+            for f, stamp in self._stamps.items():
+                new_stamp = self._stamp(f)
+                if new_stamp != stamp:
+                    self._stamps[f] = new_stamp
+                    changed.add(f)
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+
+class InotifyWatcher(Watcher):
+    """Watcher, which uses inotify of Linux kernel via libc. Directories of the files are watched,
+    so files replaced by editors are still tracked."""
+
+    def __init__(self, files: List[Path]) -> None:
+        super().__init__(files)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._dirs: Dict[int, Path] = {}
+        try:
+            for d in sorted({f.parent for f in self.files}):
+                wd = libc.inotify_add_watch(self._fd, os.fsencode(d), _IN_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for '{d}'")
+                self._dirs[wd] = d
+        except OSError:
+            self.close()
+            raise
+
+    def wait(self, timeout: float) -> Set[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _IN_EVENT.unpack_from(data, offset)
+            start = offset + _IN_EVENT.size
+            name = data[start : start + length].rstrip(b"\0")  # noqa: E203
+            offset = start + length
+            if mask & _IN_Q_OVERFLOW:
+                return set(self.files)
+            if wd in self._dirs:
+                path = self._dirs[wd].joinpath(os.fsdecode(name))
+                if path in self.files:
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def get_watcher(files: List[Path]) -> Watcher:
+    """Get inotify watcher if it is available, polling one otherwise"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(files)
+        except (OSError, AttributeError, TypeError) as e:
+            _logger.debug(f"Can't use inotify, fall back to polling: {e}")
+    return PollingWatcher(files)
+
+
+def wait_changes(watcher: Watcher, stop: threading.Event, debounce: float = DEBOUNCE_TIME) -> Set[Path]:
+    """Wait for a burst of changes. Empty set is returned if stop was requested."""
+    changed: Set[Path] = set()
+    while not stop.is_set():
+        new = watcher.wait(debounce if changed else POLL_INTERVAL)
+        if new:
+            changed |= new
+        elif changed:
+            return changed
+    return set()
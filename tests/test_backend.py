@@ -0,0 +1,117 @@
+"""Tests for playhdl/backend.py
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+import playhdl.backend as backend
+import pytest
+
+
+@pytest.fixture
+def worker(tmp_path: Path) -> Iterator[backend.Worker]:
+    worker = backend.Worker(tmp_path.joinpath("queue"), jobs=2, poll_interval=0.01)
+    stop = threading.Event()
+    thread = threading.Thread(target=worker.serve, args=(stop,))
+    thread.start()
+    yield worker
+    stop.set()
+    thread.join()
+
+
+def _execute(executor: backend.Executor, cmd: str, cwd: Path) -> tuple:
+    lines: List[bytes] = []
+    returncode, rusage = executor.execute(cmd, cwd, Path("/foo/bin"), {"FOO": "bar"}, lines.append)
+    return returncode, lines
+
+
+@pytest.mark.parametrize("kind", ["local", "queue"])
+def test_execute(kind: str, tmp_path: Path, worker: backend.Worker):
+    executor = backend.get_executor(tmp_path.joinpath("queue") if kind == "queue" else None)
+    if kind == "queue":
+        executor.poll_interval = 0.01  # type: ignore
+    cmd = "pwd; echo $FOO; echo $PATH | cut -d: -f1; printf 'no newline'; exit 3"
+    returncode, lines = _execute(executor, cmd, tmp_path)
+    assert returncode == 3
+    assert lines == [f"{tmp_path}\n".encode(), b"bar\n", b"/foo/bin\n", b"no newline"]
+
+
+def test_queue_cleanup(tmp_path: Path, worker: backend.Worker):
+    executor = backend.QueueExecutor(tmp_path.joinpath("queue"), poll_interval=0.01)
+    for _ in range(3):
+        assert _execute(executor, "true", tmp_path) == (0, [])
+    for d in [backend.PENDING_DIR, backend.CLAIMED_DIR, backend.OUTPUT_DIR, backend.DONE_DIR]:
+        assert list(tmp_path.joinpath("queue", d).iterdir()) == []
+
+
+def test_queue_abandoned(tmp_path: Path, worker: backend.Worker):
+    queue_dir = tmp_path.joinpath("queue")
+    cancellation = backend.Cancellation()
+    executor = backend.QueueExecutor(queue_dir, poll_interval=0.01, cancellation=cancellation)
+
+    def on_output(line: bytes) -> None:
+        cancellation.cancel()
+
+    with pytest.raises(backend.CancelledError):
+        executor.execute("echo started; sleep 0.2", tmp_path, Path("/foo/bin"), {}, on_output)
+    deadline = time.monotonic() + 5
+    while list(queue_dir.joinpath(backend.CLAIMED_DIR).iterdir()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Worker completes the job, but drops its result
+    for d in [backend.PENDING_DIR, backend.CLAIMED_DIR, backend.OUTPUT_DIR, backend.DONE_DIR]:
+        assert list(queue_dir.joinpath(d).iterdir()) == []
+
+
+def test_worker_abandoned_job(tmp_path: Path):
+    worker = backend.Worker(tmp_path.joinpath("queue"))
+    claimed = worker.queue.claimed("job")
+    claimed.write_text(f'{{"cmd": "touch foo.txt", "cwd": "{tmp_path}", "bin_dir": "/foo/bin", "env": {{}}}}')
+    worker._execute("job")
+    assert tmp_path.joinpath("foo.txt").exists() is False
+    assert claimed.exists() is False
+    assert worker.queue.output("job").exists() is False
+    assert worker.queue.done("job").exists() is False
+
+
+def test_queue_parallel(tmp_path: Path, worker: backend.Worker):
+    executor = backend.QueueExecutor(tmp_path.joinpath("queue"), poll_interval=0.01)
+    threads = [threading.Thread(target=_execute, args=(executor, f"touch {i}.txt", tmp_path)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(f.name for f in tmp_path.glob("*.txt")) == ["0.txt", "1.txt", "2.txt", "3.txt"]
+
+
+def test_worker_bad_cwd(tmp_path: Path, worker: backend.Worker):
+    executor = backend.QueueExecutor(tmp_path.joinpath("queue"), poll_interval=0.01)
+    returncode, lines = _execute(executor, "true", tmp_path.joinpath("foo"))
+    assert returncode == 127
+    assert b"can't execute the command" in lines[0]
+
+
+def test_cancel(tmp_path: Path):
+    cancellation = backend.Cancellation()
+    executor = backend.LocalExecutor(cancellation)
+    cmd = "sleep 10 & echo started; wait"
+    result: dict = {}
+
+    def execute() -> None:
+        try:
+            executor.execute(cmd, tmp_path, Path("/foo/bin"), {}, lambda line: result.setdefault("output", line))
+        except backend.CancelledError:
+            result["cancelled"] = True
+
+    thread = threading.Thread(target=execute)
+    start = time.monotonic()
+    thread.start()
+    while "output" not in result:
+        time.sleep(0.01)
+    cancellation.cancel()
+    thread.join()
+    assert result["cancelled"] is True
+    assert time.monotonic() - start < 5
+    with pytest.raises(backend.CancelledError):
+        executor.execute("true", tmp_path, Path("/foo/bin"), {}, lambda line: None)
@@ -0,0 +1,41 @@
+"""Tests for playhdl/benchmark.py
+"""
+
+import playhdl.benchmark as benchmark
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "samples, percent, value",
+    [
+        ([1.0], 90, 1.0),
+        ([3.0, 1.0], 50, 2.0),
+        ([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0], 90, 10.0),
+        ([1.0, 2.0, 3.0, 4.0], 90, 3.7),
+    ],
+)
+def test_get_percentile(samples: list, percent: float, value: float):
+    assert benchmark.get_percentile(samples, percent) == pytest.approx(value)
+
+
+def test_get_stats():
+    assert benchmark.get_stats([2.0]) == {"median": 2.0, "p90": 2.0, "variance": 0.0, "min": 2.0, "max": 2.0}
+    stats = benchmark.get_stats([1.0, 2.0, 6.0])
+    assert stats["median"] == 2.0
+    assert stats["variance"] == pytest.approx(7.0)
+
+
+def test_get_report():
+    results = [
+        benchmark.ToolBench("verilator5", "verilator", "5.020", {"compile": [2.0, 4.0], "sim": [1.0, 1.0]}),
+        benchmark.ToolBench("icarus", "icarus", "", {}, error="Command 'iverilog' returned 1"),
+    ]
+    report = benchmark.get_report(results, repeats=2, warmup=1)
+    assert report["repeats"] == 2
+    assert list(report["tools"]["verilator5"]["stages"]) == ["compile", "sim"]
+    assert report["tools"]["verilator5"]["stages"]["compile"]["median"] == 3.0
+    assert report["tools"]["icarus"]["stages"] == {}
+    table = benchmark.get_text_table(report)
+    assert "|   verilator5 |   compile |    2 |      3.00 |      3.80 |    2.0000 |  PASS  |" in table
+    assert "|       icarus |         - |    0 |         - |         - |         - |  FAIL  |" in table
@@ -0,0 +1,88 @@
+"""Tests for playhdl/cache.py
+"""
+
+from pathlib import Path
+
+import playhdl.tools as tools
+
+import pytest
+from playhdl.cache import (
+    get_build_artifacts,
+    get_build_key,
+    get_compile_key,
+    get_compiled_sources,
+    is_build_cached,
+    save_build_info,
+)
+
+
+@pytest.fixture(autouse=True)
+def change_test_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    Path("tb.sv").write_text("module tb; endmodule")
+
+
+@pytest.fixture
+def tool_settings() -> tools.ToolSettings:
+    return tools.ToolSettings(tools.ToolKind.MODELSIM, Path("/home/modelsim"), {}, {})
+
+
+def test_key_stable(tool_settings: tools.ToolSettings):
+    key = get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"])
+    assert key is not None
+    assert key == get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"])
+
+
+def test_key_source_changed(tool_settings: tools.ToolSettings):
+    key = get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"])
+    Path("tb.sv").write_text("module tb; initial $finish; endmodule")
+    assert key != get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"])
+
+
+def test_key_cmds_changed(tool_settings: tools.ToolSettings):
+    key = get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"])
+    assert key != get_build_key(tool_settings, ["vlog -sv ../tb.sv"], ["tb.sv"])
+
+
+def test_key_settings_changed(tool_settings: tools.ToolSettings):
+    key = get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"])
+    tool_settings.env["FOO"] = "1"
+    assert key != get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"])
+    tool_settings.bin_dir = Path("/home/modelsim2")
+    assert key != get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"])
+
+
+def test_key_hashes_changed(tool_settings: tools.ToolSettings):
+    key = get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"], {"tb.sv": "foo"})
+    assert key != get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"], {"tb.sv": "bar"})
+    # Sources with provided hashes are not read
+    Path("tb.sv").write_text("module tb; initial $finish; endmodule")
+    assert key == get_build_key(tool_settings, ["vlog ../tb.sv"], ["tb.sv"], {"tb.sv": "foo"})
+
+
+def test_key_no_sources(tool_settings: tools.ToolSettings):
+    assert get_build_key(tool_settings, ["vlog ../tb.sv"], []) is None
+    assert get_build_key(tool_settings, ["vlog ../tb.sv"], ["foo.sv"]) is None
+
+
+def test_save_load(tmp_path: Path):
+    assert is_build_cached(tmp_path, "foo") is False
+    assert get_build_artifacts(tmp_path) == []
+    save_build_info(tmp_path, "foo", ["worklib", "modelsim.ini"])
+    assert is_build_cached(tmp_path, "foo") is True
+    assert is_build_cached(tmp_path, "bar") is False
+    assert get_build_artifacts(tmp_path) == ["worklib", "modelsim.ini"]
+
+
+def test_save_load_no_key(tmp_path: Path):
+    save_build_info(tmp_path, None, ["simv"])
+    assert get_build_artifacts(tmp_path) == ["simv"]
+
+
+def test_compiled_sources(tool_settings: tools.ToolSettings, tmp_path: Path):
+    compile_key = get_compile_key(tool_settings, ["vlog ../tb.sv"], ["+incdir+../inc"])
+    assert compile_key != get_compile_key(tool_settings, ["vlog ../tb.sv"], [])
+    assert get_compiled_sources(tmp_path, compile_key) == {}
+    save_build_info(tmp_path, "foo", ["worklib"], compile_key=compile_key, sources={"tb.sv": "bar"})
+    assert get_compiled_sources(tmp_path, compile_key) == {"tb.sv": "bar"}
+    assert get_compiled_sources(tmp_path, "baz") == {}
@@ -1,15 +1,20 @@
 """Tests for playhdl/cli.py
 """
 
+import json
+import os
 import shutil
+import sys
 from dataclasses import dataclass
 
 from pathlib import Path  # noqa: TC003
-from typing import Dict
+from typing import Dict, List
 
 import playhdl.cli as cli
 import playhdl.project as project
 import playhdl.settings as settings
+import playhdl.tools as tools
+import playhdl.utils as utils
 import pytest
 
 from .utils import OverrideSysArgv, shell
@@ -21,8 +26,9 @@ def project_descr(project_data: Dict) -> project.Project:
 
 
 def test_run_as_module():
-    result = shell("python -m playhdl --help")
-    assert result.returncode == 1
+    result = shell(f"{sys.executable} -m playhdl --help")
+    assert result.returncode == 0
+    assert "usage: playhdl" in result.stdout
 
 
 def test_entrypoint():
@@ -31,12 +37,67 @@ def test_entrypoint():
     assert "usage:" in result.stderr
 
 
-@pytest.mark.parametrize("args", ["-h", "init -h", "setup -h", "run -h", "info -h"])
+@pytest.mark.parametrize(
+    "args",
+    [
+        "-h",
+        "init -h",
+        "setup -h",
+        "run -h",
+        "build -h",
+        "sim -h",
+        "bench -h",
+        "worker -h",
+        "serve -h",
+        "history -h",
+        "info -h",
+    ],
+)
 def test_usage(args: str):
     result = shell(f"playhdl {args}")
     assert result.returncode == 0
 
 
+def test_lazy_imports():
+    code = 'import sys, playhdl.cli; print(" ".join(sys.modules))'
+    result = shell(f"{sys.executable} -c '{code}'")
+    assert result.returncode == 0
+    modules = result.stdout.split()
+    for heavy in ["pkg_resources", "importlib.metadata", "playhdl.runner", "playhdl.project", "playhdl.settings"]:
+        assert heavy not in modules
+
+
+class TestStartupImports:
+    # Modules, which are slow to import and are not needed to parse arguments or print information
+    heavy = ["pkg_resources", "playhdl.runner", "playhdl.project", "playhdl.backend", "sqlite3"]
+
+    @pytest.fixture
+    def home_env(self, tmp_path: Path) -> Dict[str, str]:
+        app_dir = tmp_path.joinpath("home", ".playhdl")
+        app_dir.mkdir(parents=True)
+        with app_dir.joinpath("settings.json").open("w") as f:
+            json.dump({"tools": {"icarus": {"kind": "icarus", "bin_dir": "/usr/bin"}}}, f)
+        return dict(os.environ, HOME=str(app_dir.parent))
+
+    def _get_imports(self, args: str, env: Dict[str, str]) -> List[str]:
+        # Package of the checkout is executed, not the installed one
+        env = dict(env, PYTHONPATH=str(Path(cli.__file__).parents[1]))
+        result = shell(f"{sys.executable} -X importtime -m playhdl {args}", env=env)
+        assert result.returncode == 0
+        lines = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:")]
+        return [line[-1].strip() for line in lines[1:]]
+
+    def test_help(self, home_env: Dict[str, str]):
+        modules = self._get_imports("--help", home_env)
+        assert "playhdl.cli" in modules
+        assert not set(self.heavy + ["playhdl.tools", "playhdl.templates"]) & set(modules)
+
+    def test_info(self, home_env: Dict[str, str]):
+        modules = self._get_imports("info", home_env)
+        assert "playhdl.settings" in modules
+        assert not set(self.heavy + ["importlib.metadata"]) & set(modules)
+
+
 @dataclass
 class AppPaths:
     app_dir: Path
@@ -76,6 +137,37 @@ def test_flow(app_paths: AppPaths):
         assert app_paths.project_dir.joinpath("icarus").joinpath("tb.vcd").is_file()
 
 
+@pytest.mark.skipif(not shutil.which("iverilog"), reason="requires icarus verilog")
+def test_flow_fst(app_paths: AppPaths):
+    with OverrideSysArgv("playhdl", "setup"):
+        cli.main()
+    with OverrideSysArgv("playhdl", "init", "verilog", "--waves-format", "fst"):
+        cli.main()
+    with OverrideSysArgv("playhdl", "run", "icarus"):
+        cli.main()
+        assert app_paths.project_dir.joinpath("icarus").joinpath("tb.fst").is_file()
+
+
+def test_init_waves_format(app_paths: AppPaths, user_settings: settings.UserSettings):
+    app_paths.app_dir.mkdir()
+    settings.dump(app_paths.user_settings_file, user_settings)
+    with OverrideSysArgv("playhdl", "-y", "init", "sv", "--waves-format", "fst"):
+        cli.main()
+    project_descr = project.load(app_paths.project_file)
+    assert "--trace-fst" in project_descr.tools["verilator5"].build[0]
+    assert project_descr.tools["verilator5"].waves == ["gtkwave tb.fst"]
+
+
+def test_init_sources(app_paths: AppPaths, user_settings: settings.UserSettings):
+    app_paths.app_dir.mkdir()
+    settings.dump(app_paths.user_settings_file, user_settings)
+    with OverrideSysArgv("playhdl", "-y", "init", "sv", "--sources", "rtl/**/*.sv", "-F ip/files.f"):
+        cli.main()
+    project_descr = project.load(app_paths.project_file)
+    assert project_descr.sources[-2:] == ["rtl/**/*.sv", "-F ip/files.f"]
+    assert f"-f {tools.SOURCES_FILE}" in project_descr.tools["verilator5"].build[0]
+
+
 def test_not_found_settings(app_paths: AppPaths, caplog: pytest.LogCaptureFixture):
     with OverrideSysArgv("playhdl", "init", "sv"):
         with pytest.raises(SystemExit):
@@ -166,3 +258,120 @@ def test_info(
         cli.main()
         assert "Tools available" in caplog.text
         assert "Tools compatibility table" in caplog.text
+
+
+def test_run_all(
+    app_paths: AppPaths,
+    user_settings: settings.UserSettings,
+    project_descr: project.Project,
+    caplog: pytest.LogCaptureFixture,
+):
+    app_paths.app_dir.mkdir()
+    settings.dump(app_paths.user_settings_file, user_settings)
+    project.dump(app_paths.project_file, project_descr)
+    with OverrideSysArgv("playhdl", "run", "--all"):
+        with pytest.raises(SystemExit):
+            cli.main()
+        assert "Summary" in caplog.text
+        assert "Failed tools: ['modelsim20']" in caplog.text
+    assert app_paths.project_dir.joinpath("verilator5").is_dir()
+
+
+def test_history(
+    app_paths: AppPaths,
+    user_settings: settings.UserSettings,
+    project_descr: project.Project,
+    caplog: pytest.LogCaptureFixture,
+):
+    app_paths.app_dir.mkdir()
+    settings.dump(app_paths.user_settings_file, user_settings)
+    project.dump(app_paths.project_file, project_descr)
+    with OverrideSysArgv("playhdl", "history"):
+        with pytest.raises(SystemExit):
+            cli.main()
+        assert "was not found" in caplog.text
+    with OverrideSysArgv("playhdl", "run", "--all"):
+        with pytest.raises(SystemExit):
+            cli.main()
+    with OverrideSysArgv("playhdl", "run", "verilator5", "--no-history"):
+        cli.main()
+    caplog.clear()
+    with OverrideSysArgv("playhdl", "history"):
+        cli.main()
+    assert "Last 2 runs" in caplog.text
+    assert "failed" in caplog.text
+    assert "Tools from the fastest" in caplog.text
+
+
+def test_bench(
+    app_paths: AppPaths,
+    user_settings: settings.UserSettings,
+    project_descr: project.Project,
+    caplog: pytest.LogCaptureFixture,
+):
+    app_paths.app_dir.mkdir()
+    settings.dump(app_paths.user_settings_file, user_settings)
+    project.dump(app_paths.project_file, project_descr)
+    with OverrideSysArgv("playhdl", "bench", "verilator5", "-n", "2", "--json", "bench.json"):
+        cli.main()
+    assert "Summary" in caplog.text
+    assert utils.load_json(app_paths.project_dir.joinpath("bench.json"))["tools"]["verilator5"]["error"] == ""
+    with OverrideSysArgv("playhdl", "bench"):
+        with pytest.raises(SystemExit):
+            cli.main()
+        assert "Failed tools: ['modelsim20']" in caplog.text
+    assert app_paths.project_dir.joinpath(".playhdl", "bench.json").is_file()
+
+
+def test_run_many_waves(
+    app_paths: AppPaths,
+    user_settings: settings.UserSettings,
+    project_descr: project.Project,
+    caplog: pytest.LogCaptureFixture,
+):
+    app_paths.app_dir.mkdir()
+    settings.dump(app_paths.user_settings_file, user_settings)
+    project.dump(app_paths.project_file, project_descr)
+    with OverrideSysArgv("playhdl", "run", "modelsim20", "verilator5", "--waves"):
+        with pytest.raises(SystemExit):
+            cli.main()
+        assert "Waves can't be opened" in caplog.text
+
+
+def test_build_sim(
+    app_paths: AppPaths,
+    user_settings: settings.UserSettings,
+    project_descr: project.Project,
+    caplog: pytest.LogCaptureFixture,
+):
+    app_paths.app_dir.mkdir()
+    settings.dump(app_paths.user_settings_file, user_settings)
+    project_descr.tools["verilator5"].build = ["echo build > build.log"]
+    project_descr.tools["verilator5"].sim = ["sh -c 'echo $@ > plusargs.txt' sh"]
+    project.dump(app_paths.project_file, project_descr)
+    with OverrideSysArgv("playhdl", "sim", "verilator5"):
+        with pytest.raises(SystemExit):
+            cli.main()
+        assert "Run 'build' command first" in caplog.text
+    with OverrideSysArgv("playhdl", "build", "verilator5", "-D", "FOO"):
+        cli.main()
+        assert "playhdl sim verilator5" in caplog.text
+    with OverrideSysArgv("playhdl", "sim", "verilator5", "+UVM_TESTNAME=foo", "--name", "foo"):
+        cli.main()
+    run_dir = app_paths.project_dir.joinpath("verilator5", "runs", "foo")
+    assert run_dir.joinpath("plusargs.txt").read_text() == "+UVM_TESTNAME=foo\n"
+
+
+def test_run_watch_many(
+    app_paths: AppPaths,
+    user_settings: settings.UserSettings,
+    project_descr: project.Project,
+    caplog: pytest.LogCaptureFixture,
+):
+    app_paths.app_dir.mkdir()
+    settings.dump(app_paths.user_settings_file, user_settings)
+    project.dump(app_paths.project_file, project_descr)
+    with OverrideSysArgv("playhdl", "run", "modelsim20", "verilator5", "--watch"):
+        with pytest.raises(SystemExit):
+            cli.main()
+        assert "Watch mode supports a single tool" in caplog.text
@@ -0,0 +1,133 @@
+"""Tests for playhdl/daemon.py
+"""
+
+import io
+import json
+import os
+import socket
+import subprocess
+import time
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import playhdl.daemon as daemon
+import playhdl.project as project
+import playhdl.settings as settings
+import playhdl.tools as tools
+import playhdl.utils as utils
+import pytest
+
+
+def test_cache(tmp_path: Path):
+    file = tmp_path.joinpath("data.json")
+    utils.dump_json(file, {"a": 1})
+    cache = daemon._Cache()
+    assert cache.get(file, utils.load_json) == {"a": 1}
+    assert cache.get(file, lambda f: {"cached": False}) == {"a": 1}
+    utils.dump_json(file, {"a": 22})
+    assert cache.get(file, utils.load_json) == {"a": 22}
+    file.write_text("{")
+    assert cache.get(file, utils.load_json) is None
+    assert cache.get(tmp_path.joinpath("foo.json"), utils.load_json) is None
+
+
+@pytest.fixture
+def server(tmp_path: Path) -> Iterator[Tuple[Path, Path]]:
+    home = tmp_path.joinpath("home")
+    user_settings = settings.UserSettings(
+        tools={"modelsim20": tools.ToolSettings(tools.ToolKind.MODELSIM, Path("/home/modelsim"))}
+    )
+    home.joinpath(".playhdl").mkdir(parents=True)
+    settings.dump(home.joinpath(".playhdl", "settings.json"), user_settings)
+    project_dir = tmp_path.joinpath("project")
+    project_dir.mkdir()
+    script = tools.ToolScript(build=["echo build"], sim=["echo sim $PWD"], waves=[])
+    project.dump(project_dir.joinpath("playhdl.json"), project.Project(tools={"modelsim20": script}))
+
+    socket_file = tmp_path.joinpath("daemon.sock")
+    env = dict(os.environ, HOME=str(home))
+    with subprocess.Popen(["playhdl", "serve", "--socket", str(socket_file)], env=env) as proc:
+        try:
+            deadline = time.monotonic() + 10
+            while not socket_file.exists() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            yield socket_file, project_dir
+        finally:
+            proc.terminate()
+            proc.wait()
+    assert socket_file.exists() is False
+
+
+def _request(socket_file: Path, project_dir: Path, *argv: str) -> Tuple[int, str]:
+    out = io.StringIO()
+    code = daemon.request(socket_file, list(argv), project_dir, out)
+    return code, out.getvalue()
+
+
+def test_serve(server: Tuple[Path, Path]):
+    socket_file, project_dir = server
+    code, output = _request(socket_file, project_dir, "run", "modelsim20")
+    assert code == 0
+    assert f"sim {project_dir.joinpath('modelsim20')}\n" in output
+
+    code, output = _request(socket_file, project_dir, "sim", "modelsim20", "--name", "foo")
+    assert code == 0
+    assert f"sim {project_dir.joinpath('modelsim20', 'runs', 'foo')}\n" in output
+
+    # Project is reloaded after change
+    data = utils.load_json(project_dir.joinpath("playhdl.json"))
+    data["tools"]["modelsim20"]["sim"] = ["echo sim2"]
+    utils.dump_json(project_dir.joinpath("playhdl.json"), data)
+    code, output = _request(socket_file, project_dir, "run", "modelsim20")
+    assert code == 0
+    assert "sim2\n" in output
+
+
+def test_serve_client(server: Tuple[Path, Path]):
+    socket_file, project_dir = server
+    data = utils.load_json(project_dir.joinpath("playhdl.json"))
+    data["tools"]["modelsim20"]["sim"] = ["echo sim $CLIENT_VAR"]
+    utils.dump_json(project_dir.joinpath("playhdl.json"), data)
+    env = dict(os.environ, CLIENT_VAR="from client", PLAYHDL_SOCKET=str(socket_file))
+    proc = subprocess.run(
+        ["playhdl", "--daemon", "run", "modelsim20"], cwd=project_dir, env=env, capture_output=True, text=True
+    )
+    assert proc.returncode == 0
+    assert "sim from client\n" in proc.stdout
+
+
+def test_serve_errors(server: Tuple[Path, Path], tmp_path: Path):
+    socket_file, project_dir = server
+    code, output = _request(socket_file, project_dir, "run", "foobar")
+    assert code == 1
+    assert "was not found in your project file" in output
+
+    code, output = _request(socket_file, project_dir, "info")
+    assert code == 2
+    assert "Daemon serves only" in output
+
+    code, output = _request(socket_file, tmp_path, "run", "modelsim20")
+    assert code == 1
+    assert "Project file" in output
+
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(str(socket_file))
+        sock.sendall(b'{"argv": ["run"], "cwd": "relative"}\n')
+        with sock.makefile("rb") as f:
+            assert "should be absolute" in json.loads(f.readline())["output"]
+            assert json.loads(f.readline()) == {"exit": 2}
+
+
+def test_serve_client_gone(server: Tuple[Path, Path]):
+    socket_file, project_dir = server
+    data = utils.load_json(project_dir.joinpath("playhdl.json"))
+    data["tools"]["modelsim20"]["sim"] = ["echo started; sleep 1; touch ../late.txt"]
+    utils.dump_json(project_dir.joinpath("playhdl.json"), data)
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(str(socket_file))
+        sock.sendall(json.dumps({"argv": ["run", "modelsim20"], "cwd": str(project_dir)}).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            while "started" not in json.loads(f.readline()).get("output", ""):
+                pass
+    time.sleep(1.5)
+    assert project_dir.joinpath("late.txt").exists() is False
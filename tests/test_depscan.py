@@ -0,0 +1,98 @@
+"""Tests for playhdl/depscan.py
+"""
+
+from pathlib import Path
+
+import playhdl.depscan as depscan
+import playhdl.utils as utils
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def change_test_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_scan_text():
+    info = depscan.scan_text(
+        '`include "defs.svh"\n'
+        "// module fake; foo_pkg::x\n"
+        "module top #(parameter W = 8) (axi_if.master bus, input clk);\n"
+        "  import cfg_pkg::*;\n"
+        "  virtual apb_if vif;\n"
+        "  /* core u_fake (); */\n"
+        "  core #(.W(W)) u_core (.clk(clk));\n"
+        "  ram u_ram[3:0] (.clk(clk));\n"
+        '  initial $display("bar u_bar ();");\n'
+        "endmodule\n"
+        "interface automatic axi_if;\n"
+        "endinterface\n"
+    )
+    assert info.includes == ["defs.svh"]
+    assert info.packages == []
+    assert info.units == ["top", "axi_if"]
+    assert info.scopes == ["cfg_pkg"]
+    assert {"core", "ram", "apb_if"} <= set(info.references)
+    assert not {"fake", "bar", "top", "axi_if"} & set(info.references)
+
+
+def test_graph():
+    Path("inc").mkdir()
+    Path("inc/defs.svh").write_text("`define W 8\n")
+    Path("a_pkg.sv").write_text("package a_pkg;\nendpackage\n")
+    Path("b_pkg.sv").write_text('`include "defs.svh"\npackage b_pkg;\n  import a_pkg::*;\nendpackage\n')
+    Path("dut.sv").write_text("module dut;\n  b_pkg::t x;\nendmodule\n")
+    Path("tb.sv").write_text("module tb;\n  dut u_dut();\nendmodule\n")
+    files = ["tb.sv", "dut.sv", "b_pkg.sv", "a_pkg.sv", "foo.sv"]
+
+    graph = depscan.Scanner().scan(files, ["inc"])
+    assert graph.get_groups() == [["tb.sv", "a_pkg.sv", "foo.sv"], ["b_pkg.sv"], ["dut.sv"]]
+    assert graph.deps["tb.sv"] == ["dut.sv"]
+    assert graph.get_dependents({"a_pkg.sv"}) == {"a_pkg.sv", "b_pkg.sv", "dut.sv", "tb.sv"}
+    assert graph.get_dependents({"tb.sv"}) == {"tb.sv"}
+    assert "foo.sv" not in graph.hashes
+    assert graph.includes["b_pkg.sv"] == ["inc/defs.svh"]
+    assert graph.get_included_files() == ["inc/defs.svh"]
+
+    # Change of the included file changes the hash of the file including it
+    Path("inc/defs.svh").write_text("`define W 16\n")
+    hashes = depscan.Scanner().scan(files, ["inc"]).hashes
+    assert hashes["b_pkg.sv"] != graph.hashes["b_pkg.sv"]
+    assert hashes["a_pkg.sv"] == graph.hashes["a_pkg.sv"]
+
+
+def test_graph_cycle(caplog: pytest.LogCaptureFixture):
+    Path("a_pkg.sv").write_text("package a_pkg;\n  import b_pkg::*;\nendpackage\n")
+    Path("b_pkg.sv").write_text("package b_pkg;\n  import a_pkg::*;\nendpackage\n")
+    groups = depscan.Scanner().scan(["b_pkg.sv", "a_pkg.sv"]).get_groups()
+    assert groups == [["b_pkg.sv"], ["a_pkg.sv"]]
+    assert "circular package imports" in caplog.text
+
+
+def test_cache(monkeypatch: pytest.MonkeyPatch):
+    cache_file = depscan.get_cache_file()
+    Path("a_pkg.sv").write_text("package a_pkg;\nendpackage\n")
+    Path("tb.sv").write_text("module tb;\nendmodule\n")
+    depscan.Scanner(cache_file).scan(["a_pkg.sv", "tb.sv"])
+    assert len(utils.load_json(cache_file)["files"]) == 2
+
+    # Cached files are not scanned again, stale entries are dropped
+    Path("tb.sv").write_text("module tb;\n  import a_pkg::*;\nendmodule\n")
+    scanned: list = []
+    scan_text = depscan.scan_text
+
+    def scan_counted(text: str) -> depscan.FileInfo:
+        scanned.append(text)
+        return scan_text(text)
+
+    monkeypatch.setattr(depscan, "scan_text", scan_counted)
+    graph = depscan.Scanner(cache_file).scan(["a_pkg.sv", "tb.sv"])
+    assert graph.imports["tb.sv"] == ["a_pkg.sv"]
+    assert len(scanned) == 1
+    assert len(utils.load_json(cache_file)["files"]) == 2
+
+    # Cache of another version is ignored
+    utils.dump_json(cache_file, {"version": 0, "files": {}})
+    depscan.Scanner(cache_file).scan(["tb.sv"])
+    assert utils.load_json(cache_file)["version"] == depscan.SCANNER_VERSION
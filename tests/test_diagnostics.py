@@ -0,0 +1,122 @@
+"""Tests for playhdl/diagnostics.py
+"""
+
+from pathlib import Path  # noqa: TC003
+
+import playhdl.diagnostics as diagnostics
+import playhdl.tools as tools
+import playhdl.utils as utils
+
+import pytest
+
+Severity = diagnostics.Severity
+
+
+@pytest.mark.parametrize(
+    "kind, line, severity, file, lineno",
+    [
+        (
+            tools.ToolKind.MODELSIM,
+            "** Error: tb.sv(5): (vlog-2730) Undefined variable: 'x'.",
+            Severity.error,
+            "tb.sv",
+            5,
+        ),
+        (tools.ToolKind.MODELSIM, "# ** Fatal: (vsim-3421) Value 5 is out of range 0 to 3.", Severity.fatal, "", 0),
+        (tools.ToolKind.MODELSIM, "# ** Warning: (vsim-3015) tb.sv(12): Port size", Severity.warning, "tb.sv", 12),
+        (tools.ToolKind.XCELIUM, "xmvlog: *E,UNDIDN (./tb.sv,10|4): 'x': undeclared", Severity.error, "./tb.sv", 10),
+        (tools.ToolKind.XCELIUM, "xmsim: *F,RNQUIE: Simulation is complete.", Severity.fatal, "", 0),
+        (tools.ToolKind.XCELIUM, "xmelab: *W,DSEMEL: This SystemVerilog design", Severity.warning, "", 0),
+        (tools.ToolKind.VCS, 'Error: "tb.sv", 10: tb.a: started at 0ns failed', Severity.error, "tb.sv", 10),
+        (tools.ToolKind.VCS, 'Fatal: "tb.sv", 12: tb: at time 0 ns', Severity.fatal, "tb.sv", 12),
+        (tools.ToolKind.VERILATOR, "%Error: tb.sv:10:5: Can't find definition", Severity.error, "tb.sv", 10),
+        (tools.ToolKind.VERILATOR, "%Warning-WIDTH: rtl/a.sv:3:9: Operator ASSIGN", Severity.warning, "rtl/a.sv", 3),
+        (tools.ToolKind.VERILATOR, "[100] %Fatal: tb.sv:20: Assertion failed", Severity.fatal, "tb.sv", 20),
+        (tools.ToolKind.ICARUS, "tb.sv:5: error: Unable to bind wire/reg/memory `x'", Severity.error, "tb.sv", 5),
+        (tools.ToolKind.ICARUS, "FATAL: tb.sv:7: test failed", Severity.fatal, "tb.sv", 7),
+        (
+            tools.ToolKind.VIVADO,
+            "ERROR: [VRFC 10-2989] 'x' is not declared [/p/tb.sv:5]",
+            Severity.error,
+            "/p/tb.sv",
+            5,
+        ),
+        (tools.ToolKind.VIVADO, "WARNING: [VRFC 10-3091] actual bit length", Severity.warning, "", 0),
+        (tools.ToolKind.VCS, "UVM_FATAL /p/env.sv(42) @ 1000: env [CFG] No config", Severity.fatal, "/p/env.sv", 42),
+        (tools.ToolKind.MODELSIM, "# UVM_ERROR @ 10: reporter [ID] Mismatch", Severity.error, "", 0),
+        (tools.ToolKind.XCELIUM, "UVM_WARNING tb.sv(3) @ 0: reporter [ID] text", Severity.warning, "tb.sv", 3),
+    ],
+)
+def test_patterns(kind: tools.ToolKind, line: str, severity: Severity, file: str, lineno: int):
+    collector = diagnostics.Collector(tools.get_diagnostic_patterns(kind))
+    try:
+        collector.feed(f"{line}\n".encode())
+    except diagnostics.AbortError:
+        assert severity == Severity.fatal
+    report = collector.get_report()
+    assert len(report.diagnostics) == 1
+    diag = report.diagnostics[0]
+    assert (diag.severity, diag.file, diag.line) == (severity, file, lineno)
+
+
+@pytest.mark.parametrize(
+    "kind, line",
+    [
+        (tools.ToolKind.MODELSIM, "# UVM_ERROR :    0"),
+        (tools.ToolKind.VERILATOR, "%Error: Exiting due to 3 error(s)"),
+        (tools.ToolKind.MODELSIM, "# ** Note: $finish    : tb.sv(10)"),
+        (tools.ToolKind.XCELIUM, "xmsim: *N,ASSERT: Summary"),
+    ],
+)
+def test_patterns_no_match(kind: tools.ToolKind, line: str):
+    collector = diagnostics.Collector(tools.get_diagnostic_patterns(kind))
+    collector.feed(f"{line}\n".encode())
+    assert collector.get_report().diagnostics == []
+
+
+def test_next_line_location():
+    collector = diagnostics.Collector(tools.get_diagnostic_patterns(tools.ToolKind.VCS))
+    collector.feed(b"Error-[IND] Identifier not declared\n")
+    collector.feed(b"tb.sv, 10\n")
+    collector.feed(b"  Identifier 'x' has not been declared yet.\n")
+    report = collector.get_report()
+    assert str(report.diagnostics[0]) == "tb.sv:10: error: Error-[IND] Identifier not declared"
+
+
+def test_abort_on_fatal():
+    collector = diagnostics.Collector(tools.get_diagnostic_patterns(tools.ToolKind.VERILATOR))
+    collector.feed(b"%Warning-WIDTH: a.sv:1:1: text\n")
+    with pytest.raises(diagnostics.AbortError, match="fatal diagnostic '%Fatal: tb.sv:2: boom'"):
+        collector.feed(b"%Fatal: tb.sv:2: boom\n")
+    # Other commands of the stage are aborted too
+    with pytest.raises(diagnostics.AbortError):
+        collector.feed(b"foo\n")
+
+
+def test_abort_on_errors():
+    collector = diagnostics.Collector(tools.get_diagnostic_patterns(tools.ToolKind.VERILATOR), max_errors=2)
+    collector.feed(b"%Error: tb.sv:1: a\n%Error: tb.sv:1: a\n")
+    with pytest.raises(diagnostics.AbortError, match="number of errors exceeds 2"):
+        collector.feed(b"%Error: tb.sv:3: b\n")
+    report = collector.get_report()
+    assert report.counts == {Severity.fatal: 0, Severity.error: 3, Severity.warning: 0}
+    assert [d.count for d in report.diagnostics] == [2, 1]
+    assert str(report) == "fatal: 0, error: 3, warning: 0"
+
+
+def test_dump(tmp_path: Path):
+    collector = diagnostics.Collector(tools.get_diagnostic_patterns(tools.ToolKind.ICARUS))
+    collector.feed(b"tb.sv:5: warning: w\ntb.sv:6: error: e\n")
+    report = collector.get_report()
+    assert [str(d) for d in report.get_worst(10)] == ["tb.sv:6: error: tb.sv:6: error: e"]
+    report_file = diagnostics.get_report_file(tmp_path, "build")
+    report.dump(report_file)
+    data = utils.load_json(report_file)
+    assert data["counts"] == {"fatal": 0, "error": 1, "warning": 1}
+    assert data["diagnostics"][0] == {
+        "severity": "warning",
+        "message": "tb.sv:5: warning: w",
+        "file": "tb.sv",
+        "line": 5,
+        "count": 1,
+    }
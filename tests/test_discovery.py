@@ -0,0 +1,118 @@
+"""Tests for playhdl/discovery.py
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Any, List
+
+import playhdl.discovery as discovery
+import playhdl.tools as tools
+import pytest
+
+
+def _create_exe(bin_dir: Path, name: str, body: str) -> Path:
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    exe = bin_dir.joinpath(name)
+    exe.write_text(f"#!/bin/sh\n{body}\n")
+    exe.chmod(0o755)
+    return exe
+
+
+@pytest.fixture
+def tools_root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("PATH", str(tmp_path.joinpath("path_bin")))
+    monkeypatch.setattr(discovery, "DEFAULT_ROOTS", [])
+    probes = tmp_path.joinpath("probes.txt")
+    _create_exe(tmp_path.joinpath("path_bin"), "verilator", f"echo v >> {probes}; echo 'Verilator 5.002 2022-10-29'")
+    _create_exe(tmp_path.joinpath("tools/xcelium/20.09/bin"), "xmsim", f"echo x >> {probes}; echo 'xmsim 20.09-s001'")
+    _create_exe(tmp_path.joinpath("tools/verilator/4.228/bin"), "verilator", "echo 'Verilator 4.228'")
+    return tmp_path.joinpath("tools")
+
+
+def _probes(root: Path) -> int:
+    probes = root.parent.joinpath("probes.txt")
+    return len(probes.read_text().split()) if probes.exists() else 0
+
+
+def test_discover(tools_root: Path, tmp_path: Path):
+    installations = discovery.discover(roots=[f"{tools_root}/*/*/bin"])
+    assert installations == [
+        discovery.Installation(tools.ToolKind.VERILATOR, tmp_path.joinpath("path_bin"), "5.002"),
+        discovery.Installation(tools.ToolKind.VERILATOR, tools_root.joinpath("verilator/4.228/bin"), "4.228"),
+        discovery.Installation(tools.ToolKind.XCELIUM, tools_root.joinpath("xcelium/20.09/bin"), "20.09-s001"),
+    ]
+    assert discovery.get_uids(installations) == ["verilator", "verilator-4.228", "xcelium"]
+
+
+def test_discover_recursive(tools_root: Path):
+    installations = discovery.discover(roots=[f"{tools_root}/**"])
+    assert len(installations) == 3
+
+
+def test_discover_cache(tools_root: Path, tmp_path: Path):
+    cache_file = tmp_path.joinpath("discovery.json")
+    roots = [f"{tools_root}/*/*/bin"]
+    first = discovery.discover(cache_file, roots=roots)
+    assert _probes(tools_root) == 2
+    assert discovery.discover(cache_file, roots=roots) == first
+    assert _probes(tools_root) == 2
+
+    # New installation changes mtime of the directory, updated executable changes its own stamp
+    _create_exe(tools_root.joinpath("xcelium/20.09/bin"), "vsim", "echo 'vsim 2020.1'")
+    probes = tmp_path.joinpath("probes.txt")
+    _create_exe(tmp_path.joinpath("path_bin"), "verilator", f"echo v >> {probes}; echo 'Verilator 5.006 2023-01-22'")
+    installations = discovery.discover(cache_file, roots=roots)
+    assert _probes(tools_root) == 3
+    assert [(i.kind, i.version) for i in installations] == [
+        (tools.ToolKind.VERILATOR, "5.006"),
+        (tools.ToolKind.VERILATOR, "4.228"),
+        (tools.ToolKind.MODELSIM, "2020.1"),
+        (tools.ToolKind.XCELIUM, "20.09-s001"),
+    ]
+
+
+def test_discover_cache_roots(tools_root: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cache_file = tmp_path.joinpath("discovery.json")
+    roots = [f"{tools_root}/**"]
+    first = discovery.discover(cache_file, roots=roots)
+    globs: List[str] = []
+    glob = discovery.glob.glob
+
+    def glob_spy(pattern: str, **kwargs: Any) -> List[str]:
+        globs.append(pattern)
+        return glob(pattern, **kwargs)
+
+    monkeypatch.setattr(discovery.glob, "glob", glob_spy)
+    assert discovery.discover(cache_file, roots=roots) == first
+    assert not globs
+
+    # New installation deep inside the root changes mtime of its parent
+    _create_exe(tools_root.joinpath("verilator/5.006/bin"), "verilator", "echo 'Verilator 5.006'")
+    installations = discovery.discover(cache_file, roots=roots)
+    assert len(globs) == 1
+    assert len(installations) == len(first) + 1
+
+
+def test_discover_timeout(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    _create_exe(tmp_path, "vcs", f"{shutil.which('sleep')} 10; echo 'vcs 2021.09'")
+    monkeypatch.setenv("PATH", str(tmp_path))
+    monkeypatch.setattr(discovery, "DEFAULT_ROOTS", [])
+    installations = discovery.discover(probe_timeout=0.2)
+    assert installations == [discovery.Installation(tools.ToolKind.VCS, tmp_path, None)]
+
+
+def test_discover_symlinks(tools_root: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    tmp_path.joinpath("link").symlink_to(tmp_path.joinpath("path_bin"))
+    monkeypatch.setenv("PATH", os.pathsep.join([str(tmp_path.joinpath("path_bin")), str(tmp_path.joinpath("link"))]))
+    assert len(discovery.discover()) == 1
+
+
+def test_get_uids():
+    installations = [
+        discovery.Installation(tools.ToolKind.XCELIUM, Path("/a"), "20.09"),
+        discovery.Installation(tools.ToolKind.XCELIUM, Path("/b"), "20.09"),
+        discovery.Installation(tools.ToolKind.XCELIUM, Path("/c"), None),
+        discovery.Installation(tools.ToolKind.VCS, Path("/d"), None),
+    ]
+    assert discovery.get_uids(installations) == ["xcelium", "xcelium-20.09", "xcelium-2", "vcs"]
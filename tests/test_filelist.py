@@ -0,0 +1,77 @@
+"""Tests for playhdl/filelist.py
+"""
+
+from pathlib import Path
+
+import playhdl.filelist as filelist
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def change_test_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def _touch(*files: str) -> None:
+    for f in files:
+        Path(f).parent.mkdir(parents=True, exist_ok=True)
+        Path(f).touch()
+
+
+def test_is_pattern():
+    assert filelist.is_pattern("rtl/*.sv") is True
+    assert filelist.is_pattern("rtl/**/*.sv") is True
+    assert filelist.is_pattern("ip.f") is True
+    assert filelist.is_pattern("-F ip/files.f") is True
+    assert filelist.is_pattern("tb.sv") is False
+    assert filelist.has_patterns(["tb.sv", "dut.sv"]) is False
+    assert filelist.has_patterns(["tb.sv", "rtl/*.v"]) is True
+
+
+def test_expand_glob():
+    _touch("rtl/b.sv", "rtl/a.sv", "rtl/sub/c.sv", "rtl/d.v")
+    sources = filelist.expand(["rtl/a.sv", "rtl/**/*.sv", "tb.sv"])
+    assert sources.files == ["rtl/a.sv", "rtl/b.sv", "rtl/sub/c.sv", "tb.sv"]
+    assert sources.lists == []
+    with pytest.raises(ValueError):
+        filelist.expand(["rtl/*.vhd"])
+
+
+def test_expand_file_list(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("IP_ROOT", "/opt/ip")
+    Path("ip").mkdir()
+    Path("ip/files.f").write_text(
+        "// IP sources\n"
+        "# generated\n"
+        "+incdir+inc+$IP_ROOT/inc\n"
+        "+define+IP_SIM+WIDTH=8\n"
+        "-y lib -timescale=1ns/1ps\n"
+        "pkg.sv  core.sv // core\n"
+        "$IP_ROOT/top.sv\n"
+        "-F sub/sub.f\n"
+    )
+    Path("ip/sub").mkdir()
+    Path("ip/sub/sub.f").write_text("sub.sv\n")
+    Path("top.f").write_text("tb.sv\n")
+
+    sources = filelist.expand(["top.f", "-F ip/files.f", "tb.sv"])
+    assert sources.files == ["tb.sv", "ip/pkg.sv", "ip/core.sv", "/opt/ip/top.sv", "ip/sub/sub.sv"]
+    assert sources.include_dirs == ["ip/inc", "/opt/ip/inc"]
+    assert sources.defines == ["IP_SIM", "WIDTH=8"]
+    assert sources.lists == ["top.f", "ip/files.f", "ip/sub/sub.f"]
+    assert sources.get_inputs() == sources.files + sources.lists
+
+    # Paths of -f are relative to the project directory
+    assert filelist.expand(["-f ip/sub/sub.f"]).files == ["sub.sv"]
+
+
+def test_expand_file_list_errors():
+    with pytest.raises(ValueError):
+        filelist.expand(["foo.f"])
+    Path("loop.f").write_text("-f loop.f\n")
+    with pytest.raises(ValueError):
+        filelist.expand(["loop.f"])
+    Path("bad.f").write_text("a.sv -f\n")
+    with pytest.raises(ValueError):
+        filelist.expand(["bad.f"])
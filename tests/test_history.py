@@ -0,0 +1,98 @@
+"""Tests for playhdl/history.py
+"""
+
+import sqlite3
+from pathlib import Path  # noqa: TC003
+from typing import Any, Dict
+
+import playhdl.history as history
+import playhdl.profiling as profiling
+
+import pytest
+
+
+def _record(tool_uid: str, build: float, sim: float, **kwargs: Any) -> history.RunRecord:
+    stages = [history.StageRecord("sim", sim, max_rss_kb=2048)]
+    if build:
+        stages.insert(0, history.StageRecord("build", build, max_rss_kb=1024))
+    data: Dict[str, Any] = {
+        "time": 1e9,
+        "project": "/prj",
+        "tool_uid": tool_uid,
+        "tool_kind": "verilator",
+        "tool_version": "5.020",
+        "sources_hash": "0123456789abcdef",
+        "wall": build + sim,
+        "max_rss_kb": 2048,
+        "status": history.RunStatus.passed,
+        "stages": stages,
+    }
+    data.update(kwargs)
+    return history.RunRecord(**data)
+
+
+@pytest.fixture
+def db_file(tmp_path: Path) -> Path:
+    db_file = tmp_path.joinpath("history.db")
+    history.add_run(db_file, _record("fast", 1.0, 2.0))
+    history.add_run(db_file, _record("fast", 0.0, 4.0))
+    history.add_run(db_file, _record("slow", 3.0, 5.0, tool_version="2023.1"))
+    history.add_run(db_file, _record("slow", 1.0, 1.0, status=history.RunStatus.failed))
+    history.add_run(db_file, _record("other", 9.0, 9.0, project="/other"))
+    return db_file
+
+
+def test_get_runs(db_file: Path):
+    runs = history.get_runs(db_file, "/prj", last=3)
+    assert [(r.tool_uid, r.get_stage_wall("build")) for r in runs] == [("fast", None), ("slow", 3.0), ("slow", 1.0)]
+    assert runs[-1] == _record("slow", 1.0, 1.0, status=history.RunStatus.failed)
+    assert [r.tool_uid for r in history.get_runs(db_file, "/prj", "fast")] == ["fast", "fast"]
+    table = history.get_trend_text_table(runs)
+    assert "|         - |      4.00 |    passed |" in table
+    assert "01234567" in table
+
+
+def test_get_slowest_stages(db_file: Path):
+    stages = history.get_slowest_stages(db_file, "/prj", limit=2)
+    assert [(s["tool_uid"], s["stage"], s["runs"], s["avg"], s["max"]) for s in stages] == [
+        ("slow", "sim", 2, 3.0, 5.0),
+        ("fast", "sim", 2, 3.0, 4.0),
+    ]
+    assert "|         slow |      sim |      2 |      3.00 |      5.00 |         2.0 |" in (
+        history.get_slowest_text_table(stages)
+    )
+
+
+def test_get_tools_ranking(db_file: Path):
+    ranking = history.get_tools_ranking(db_file, "/prj")
+    assert [(r["tool_uid"], r["runs"], r["build"], r["sim"]) for r in ranking] == [
+        ("fast", 2, 1.0, 3.0),
+        ("slow", 1, 3.0, 5.0),
+    ]
+    assert "fast" in history.get_ranking_text_table(ranking)
+
+
+def test_create_record():
+    profiler = profiling.Profiler()
+    record = history.create_record(
+        profiler,
+        0.0,
+        history.RunStatus.cancelled,
+        project="/prj",
+        tool_uid="fast",
+        tool_kind="verilator",
+        tool_version="",
+        sources_hash="",
+    )
+    assert record.stages == []
+    assert record.max_rss_kb == 0
+    assert record.status == history.RunStatus.cancelled
+
+
+def test_unsupported_version(tmp_path: Path):
+    db_file = tmp_path.joinpath("history.db")
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("CREATE TABLE runs (foo TEXT)")
+        conn.execute("PRAGMA user_version = 100")
+    history.add_run(db_file, _record("fast", 1.0, 2.0))
+    assert len(history.get_runs(db_file, "/prj")) == 1
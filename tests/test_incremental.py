@@ -0,0 +1,42 @@
+"""Tests for playhdl/incremental.py
+"""
+
+from pathlib import Path  # noqa: TC003
+
+import playhdl.incremental as incremental
+import playhdl.tools as tools
+
+
+def test_get_report(tmp_path: Path):
+    obj_dir = tmp_path.joinpath("obj_dir")
+    obj_dir.mkdir()
+    obj_dir.joinpath("a.o").touch()
+    obj_dir.joinpath("b.o").touch()
+    obj_dir.joinpath("b.cpp").touch()
+    before = incremental.snapshot(tmp_path, ["obj_dir"])
+    assert sorted(before) == [str(obj_dir.joinpath("a.o")), str(obj_dir.joinpath("b.o"))]
+
+    obj_dir.joinpath("b.o").write_text("new")
+    obj_dir.joinpath("c.o").touch()
+    obj_dir.joinpath("d.o").touch()
+    tmp_path.joinpath(tools.CCACHE_STATS_FILE).write_text("# c.cpp\ndirect_cache_hit\n# d.cpp\ncache_miss\n")
+    report = incremental.get_report(tmp_path, ["obj_dir"], before)
+    assert report == incremental.ObjectsReport(compiled=2, up_to_date=1, cache_hits=1)
+    assert report.reused == 2
+
+
+def test_get_report_no_ccache(tmp_path: Path):
+    report = incremental.get_report(tmp_path, ["obj_dir"], {})
+    assert str(report) == "0 translation units compiled, 0 reused (0 up to date, 0 from ccache)"
+
+
+def test_count_cache_hits(tmp_path: Path):
+    # ccache 4.7+ updates several hit counters for a single compilation
+    stats_file = tmp_path.joinpath(tools.CCACHE_STATS_FILE)
+    stats_file.write_text(
+        "# a.cpp\ndirect_cache_hit\nlocal_storage_hit\nlocal_storage_read_hit\n"
+        "# b.cpp\ncache_miss\nlocal_storage_miss\nlocal_storage_write\n"
+        "# c.cpp\npreprocessed_cache_hit\nlocal_storage_hit\nlocal_storage_read_hit\n"
+    )
+    assert incremental._count_cache_hits(stats_file) == 2
+    assert incremental._count_cache_hits(tmp_path.joinpath("foo")) == 0
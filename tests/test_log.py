@@ -2,7 +2,8 @@
 """
 import os
 
-from playhdl.log import get_logger, init_logger, is_debug_en
+import pytest  # noqa: TC002
+from playhdl.log import get_job_name, get_logger, init_logger, is_debug_en, job_context
 
 
 def test_is_debug_en():
@@ -19,3 +20,12 @@ def test_log():
     logger.warning("answer")
     logger.error("is")
     logger.critical("42")
+
+
+def test_job_context(caplog: pytest.LogCaptureFixture):
+    assert get_job_name() is None
+    with job_context("foo"):
+        assert get_job_name() == "foo"
+        get_logger().info("The answer is 42")
+    assert get_job_name() is None
+    assert "[foo] The answer is 42" in caplog.text
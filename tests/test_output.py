@@ -0,0 +1,44 @@
+"""Tests for playhdl/output.py
+"""
+
+import gzip
+from pathlib import Path  # noqa: TC003
+
+import pytest  # noqa: TC002
+from playhdl.log import job_context
+from playhdl.output import StageOutput, write_terminal
+
+
+def _read_log(file: Path) -> bytes:
+    with gzip.open(file, "rb") as f:
+        return f.read()
+
+
+def test_write_terminal(capsys: pytest.CaptureFixture):
+    write_terminal(b"foo\n")
+    with job_context("bar"):
+        write_terminal(b"baz\nqux\n")
+    assert capsys.readouterr().out == "foo\n[bar] baz\n[bar] qux\n"
+
+
+def test_stage_output(tmp_path: Path, capsys: pytest.CaptureFixture):
+    log_file = tmp_path.joinpath("sim.log.gz")
+    with StageOutput("sim", log_file, tail_lines=2) as output:
+        for i in range(5):
+            output.write(f"line{i}\n".encode())
+    assert output.lines == 5
+    assert list(output.tail) == [b"line3\n", b"line4\n"]
+    assert _read_log(log_file) == b"".join(f"line{i}\n".encode() for i in range(5))
+    assert capsys.readouterr().out == "".join(f"line{i}\n" for i in range(5))
+
+
+def test_stage_output_quiet(tmp_path: Path, capsys: pytest.CaptureFixture):
+    log_file = tmp_path.joinpath("sim.log.gz")
+    with StageOutput("sim", log_file, quiet=True, tail_lines=2) as output:
+        output.write(b"line0\nline1\nline2\n")
+        assert capsys.readouterr().out == ""
+        output.dump_tail()
+    out = capsys.readouterr().out
+    assert "line0" not in out
+    assert "line1\nline2\n" in out
+    assert _read_log(log_file) == b"line0\nline1\nline2\n"
@@ -0,0 +1,51 @@
+"""Tests for playhdl/profiling.py
+"""
+
+import subprocess
+from pathlib import Path  # noqa: TC003
+
+import playhdl.utils as utils
+from playhdl.profiling import _get_busy_time, CommandProfile, get_text_table, Profiler, wait_process
+
+
+def _record(start: float, wall: float) -> CommandProfile:
+    return CommandProfile("build", "foo", ".", None, 1, start, wall, 0.0, 0.0, 0, 0)
+
+
+def test_wait_process():
+    proc = subprocess.Popen("python3 -c 'x = bytearray(64 << 20); exit(3)'", shell=True)
+    returncode, rusage = wait_process(proc.pid)
+    proc.returncode = returncode
+    assert returncode == 3
+    assert rusage.ru_maxrss > 64 << 10
+    assert rusage.ru_utime + rusage.ru_stime > 0
+
+
+def test_busy_time():
+    assert _get_busy_time([]) == 0.0
+    assert _get_busy_time([_record(0.0, 1.0), _record(2.0, 1.0)]) == 2.0
+    assert _get_busy_time([_record(0.0, 2.0), _record(1.0, 2.0), _record(1.5, 0.5)]) == 3.0
+
+
+def test_profiler(tmp_path: Path):
+    profiler = Profiler()
+    for stage, cmd in [("build", "true"), ("sim", "sleep 0.1")]:
+        start = profiler.now()
+        proc = subprocess.Popen(cmd, shell=True)
+        returncode, rusage = wait_process(proc.pid)
+        proc.returncode = returncode
+        profiler.add(stage, cmd, tmp_path, start, returncode, rusage)
+
+    report = profiler.dump(tmp_path)
+    assert set(report["stages"].keys()) == {"build", "sim"}
+    assert report["stages"]["sim"]["wall"] >= 0.1
+    assert report["overhead"]["wall"] >= 0
+    assert [c["cmd"] for c in report["commands"]] == ["true", "sleep 0.1"]
+    assert utils.load_json(tmp_path.joinpath("profile.json")) == report
+
+    trace = utils.load_json(tmp_path.joinpath("profile.trace.json"))
+    assert [e["name"] for e in trace["traceEvents"]] == ["playhdl", "true", "sleep 0.1"]
+    assert all(e["ph"] == "X" for e in trace["traceEvents"])
+
+    table = get_text_table(report)
+    assert "sim" in table and "playhdl" in table
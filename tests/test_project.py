@@ -28,6 +28,7 @@ def test_project_deserealization(project_data: Dict):
 def test_create_verilog(project_file: Path, user_settings: settings.UserSettings):
     proj = create(project_file, templates.DesignKind.verilog, ["tb.v"], user_settings)
     assert len(proj.tools) == 4
+    assert proj.sources == ["tb.v"]
 
 
 def test_create_sv(project_file: Path, user_settings: settings.UserSettings):
@@ -53,6 +54,14 @@ def test_dump_load(project_file: Path, project_data: Dict):
     assert proj == loaded_proj
 
 
+def test_dump_load_profiles(project_file: Path, user_settings: settings.UserSettings):
+    proj = create(project_file, templates.DesignKind.sv, ["tb.sv"], user_settings)
+    dump(project_file, proj)
+    loaded_proj = load(project_file)
+    assert proj == loaded_proj
+    assert loaded_proj.tools["vcs2020"].get_profile(tools.BuildProfile.fast).waves == []
+
+
 def test_dump_exists_overwrite(project_file: Path, project_data: Dict, monkeypatch: pytest.MonkeyPatch):
     orig_proj = Project(**project_data)
     dump(project_file, orig_proj)
@@ -1,14 +1,26 @@
 """Tests for playhdl/runner.py
 """
 
+import gzip
+import threading
+import time
 from pathlib import Path
 
+import playhdl.backend as backend
+import playhdl.history as history
 import playhdl.project as project
+import playhdl.scheduler as scheduler
 import playhdl.settings as settings
 import playhdl.tools as tools
+import playhdl.utils as utils
 
 import pytest
-from playhdl.runner import run
+from playhdl.runner import bench, build, regress, run, run_many, sim, watch
+
+
+@pytest.fixture(autouse=True)
+def change_test_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
 
 
 @pytest.fixture
@@ -71,3 +83,589 @@ def test_run_err_cmd(project_descr: project.Project, user_settings: settings.Use
     project_descr.tools[tool_uid].build = ["ls /foobar"]
     with pytest.raises(RuntimeError):
         run(project_descr, user_settings, tool_uid, False)
+
+
+@pytest.mark.parametrize("jobs", [0, 1, 4])
+def test_run_parallel_group(project_descr: project.Project, user_settings: settings.UserSettings, jobs: int):
+    tool_uid = "modelsim20"
+    project_descr.tools[tool_uid].build = [["touch a.log", "touch b.log", "touch c.log"], "touch build.log"]
+    run(project_descr, user_settings, tool_uid, False, jobs=jobs)
+    for f in ["a.log", "b.log", "c.log", "build.log"]:
+        assert Path(f"{tool_uid}/{f}").is_file() is True
+
+
+def test_run_parallel_group_err(project_descr: project.Project, user_settings: settings.UserSettings):
+    tool_uid = "modelsim20"
+    project_descr.tools[tool_uid].build = [["touch a.log", "ls /foobar", "touch c.log"], "touch build.log"]
+    with pytest.raises(RuntimeError):
+        run(project_descr, user_settings, tool_uid, False, jobs=4)
+    assert Path(f"{tool_uid}/c.log").is_file() is True
+    assert Path(f"{tool_uid}/build.log").is_file() is False
+
+
+def test_run_env(project_descr: project.Project, user_settings: settings.UserSettings, tmp_path: Path):
+    tool_uid = "modelsim20"
+    bin_dir = tmp_path.joinpath("bin")
+    bin_dir.mkdir()
+    bin_dir.joinpath("vsim").write_text("#!/bin/sh\necho $FOO > sim.log\n")
+    bin_dir.joinpath("vsim").chmod(0o755)
+    user_settings.tools[tool_uid].bin_dir = bin_dir
+    user_settings.tools[tool_uid].env = {"FOO": "42"}
+    project_descr.tools[tool_uid].sim = ["vsim"]
+    run(project_descr, user_settings, tool_uid, False)
+    assert Path(f"{tool_uid}/sim.log").read_text() == "42\n"
+
+
+def test_run_logs(project_descr: project.Project, user_settings: settings.UserSettings):
+    tool_uid = "modelsim20"
+    project_descr.tools[tool_uid].sim = ["echo foo", "echo bar"]
+    run(project_descr, user_settings, tool_uid, True)
+    with gzip.open(f"{tool_uid}/sim.log.gz", "rb") as f:
+        assert f.read() == b"foo\nbar\n"
+    for stage in ["build", "waves"]:
+        assert Path(f"{tool_uid}/{stage}.log.gz").is_file() is True
+
+
+def test_run_quiet(
+    project_descr: project.Project,
+    user_settings: settings.UserSettings,
+    capfd: pytest.CaptureFixture,
+):
+    tool_uid = "modelsim20"
+    project_descr.tools[tool_uid].sim = ["seq 100 && exit 1"]
+    with pytest.raises(RuntimeError):
+        run(project_descr, user_settings, tool_uid, False, quiet=True, tail_lines=3)
+    out = capfd.readouterr().out
+    assert "98\n99\n100\n" in out
+    assert "\n97\n" not in out
+
+
+def test_run_profile(project_descr: project.Project, user_settings: settings.UserSettings):
+    tool_uid = "modelsim20"
+    project_descr.tools[tool_uid].build = [["true", "true"], "true"]
+    run(project_descr, user_settings, tool_uid, False, profile=True, jobs=2)
+    report = utils.load_json(Path(f"{tool_uid}/profile.json"))
+    assert [c["stage"] for c in report["commands"]] == ["build", "build", "build", "sim"]
+    assert Path(f"{tool_uid}/profile.trace.json").is_file() is True
+
+
+def test_run_profile_err(project_descr: project.Project, user_settings: settings.UserSettings):
+    tool_uid = "modelsim20"
+    project_descr.tools[tool_uid].sim = ["exit 3"]
+    with pytest.raises(RuntimeError):
+        run(project_descr, user_settings, tool_uid, False, profile=True)
+    report = utils.load_json(Path(f"{tool_uid}/profile.json"))
+    assert report["commands"][-1]["returncode"] == 3
+
+
+def test_run_abort_on_fatal(project_descr: project.Project, user_settings: settings.UserSettings):
+    tool_uid = "modelsim20"
+    project_descr.tools[tool_uid].sim = ["echo '# ** Fatal: tb.sv(10): boom' && sleep 5 && touch late.log"]
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="aborted on fatal diagnostic"):
+        run(project_descr, user_settings, tool_uid, False)
+    assert time.monotonic() - start < 4
+    assert Path(f"{tool_uid}/late.log").is_file() is False
+    report = utils.load_json(Path(f"{tool_uid}/sim.diagnostics.json"))
+    assert report["counts"]["fatal"] == 1
+    assert report["diagnostics"][0]["file"] == "tb.sv"
+    assert report["diagnostics"][0]["line"] == 10
+
+
+def test_run_max_errors(project_descr: project.Project, user_settings: settings.UserSettings):
+    tool_uid = "modelsim20"
+    project_descr.tools[tool_uid].sim = ["for i in 1 2 3; do echo '# UVM_ERROR @ 0: reporter [ID] bad'; done"]
+    run(project_descr, user_settings, tool_uid, False, max_errors=3)
+    assert utils.load_json(Path(f"{tool_uid}/sim.diagnostics.json"))["counts"]["error"] == 3
+    with pytest.raises(RuntimeError, match="aborted on number of errors exceeds 2"):
+        run(project_descr, user_settings, tool_uid, False, max_errors=2)
+
+
+def test_run_history(project_descr: project.Project, user_settings: settings.UserSettings, tmp_path: Path):
+    tool_uid = "modelsim20"
+    history_file = tmp_path.joinpath("history.db")
+    user_settings.tools[tool_uid].version = "2020.1"
+    Path("tb.sv").write_text("module tb; endmodule")
+    project_descr.sources = ["tb.sv"]
+    run(project_descr, user_settings, tool_uid, False, history_file=history_file)
+    project_descr.tools[tool_uid].sim = ["exit 1"]
+    with pytest.raises(RuntimeError):
+        run(project_descr, user_settings, tool_uid, False, history_file=history_file)
+    runs = history.get_runs(history_file, str(tmp_path))
+    assert [r.status for r in runs] == [history.RunStatus.passed, history.RunStatus.failed]
+    assert [s.stage for s in runs[0].stages] == ["build", "sim"]
+    assert (runs[0].tool_kind, runs[0].tool_version) == ("modelsim", "2020.1")
+    assert runs[0].sources_hash != ""
+    assert runs[0].sources_hash == runs[1].sources_hash
+
+
+def test_bench(project_descr: project.Project, user_settings: settings.UserSettings, tmp_path: Path):
+    bin_dir = tmp_path.joinpath("bin")
+    bin_dir.mkdir()
+    bin_dir.joinpath("xmvlog").write_text(f"#!/bin/sh\necho $1 >> {tmp_path}/compiled.log\n")
+    bin_dir.joinpath("xmvlog").chmod(0o755)
+    user_settings.tools["xcelium20"] = tools.ToolSettings(tools.ToolKind.XCELIUM, bin_dir, {}, {})
+    project_descr.tools["xcelium20"] = tools.ToolScript(
+        build=[["xmvlog a.sv", "xmvlog b.sv"], "touch elab.log"], sim=["true"], waves=[]
+    )
+    project_descr.tools["modelsim20"].sim = ["ls /foobar"]
+    results = bench(project_descr, user_settings, ["xcelium20", "modelsim20"], repeats=3, warmup=2, jobs=2)
+    assert results[0].error == ""
+    assert {k: len(v) for k, v in results[0].samples.items()} == {"compile": 3, "elaborate": 3, "sim": 3}
+    assert len(tmp_path.joinpath("compiled.log").read_text().splitlines()) == 2 * 5
+    assert results[1].error != ""
+    assert results[1].samples == {}
+
+
+def test_run_queue(project_descr: project.Project, user_settings: settings.UserSettings, tmp_path: Path):
+    tool_uid = "modelsim20"
+    worker = backend.Worker(tmp_path.joinpath("queue"), poll_interval=0.01)
+    stop = threading.Event()
+    thread = threading.Thread(target=worker.serve, args=(stop,))
+    thread.start()
+    try:
+        run(project_descr, user_settings, tool_uid, True, queue=tmp_path.joinpath("queue"))
+    finally:
+        stop.set()
+        thread.join()
+    assert Path(f"{tool_uid}/build.log").is_file() is True
+    assert Path(f"{tool_uid}/sim.log").is_file() is True
+    assert Path(f"{tool_uid}/waves.log").is_file() is True
+    assert list(tmp_path.joinpath("queue", backend.DONE_DIR).iterdir()) == []
+
+
+class TestRunMany:
+    @pytest.fixture
+    def project_descr(self, project_descr: project.Project) -> project.Project:
+        project_descr.tools["verilator5"] = tools.ToolScript(build=["echo verilator"], sim=["exit 1"], waves=[])
+        return project_descr
+
+    @pytest.fixture
+    def user_settings(self, user_settings: settings.UserSettings) -> settings.UserSettings:
+        user_settings.tools["verilator5"] = tools.ToolSettings(tools.ToolKind.VERILATOR, Path("/home/verilator5"))
+        return user_settings
+
+    def test_run(
+        self,
+        project_descr: project.Project,
+        user_settings: settings.UserSettings,
+        capfd: pytest.CaptureFixture,
+    ):
+        results = run_many(project_descr, user_settings, ["modelsim20", "verilator5"])
+        assert [r.name for r in results] == ["modelsim20", "verilator5"]
+        assert [r.passed for r in results] == [True, False]
+        assert Path("modelsim20/sim.log").is_file() is True
+        assert Path("modelsim20/waves.log").is_file() is False
+        assert Path("verilator5").is_dir() is True
+        assert "[verilator5] verilator" in capfd.readouterr().out
+
+    def test_run_wrong_uid(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        with pytest.raises(ValueError):
+            run_many(project_descr, user_settings, ["modelsim20", "modelsim42"])
+
+
+class TestRegress:
+    @pytest.fixture
+    def project_descr(self, project_descr: project.Project) -> project.Project:
+        tool_script = project_descr.tools["modelsim20"]
+        tool_script.build = ["echo build >> build.log", "mkdir worklib"]
+        tool_script.sim = ["ls worklib build.log && echo"]
+        return project_descr
+
+    def test_regress(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        results = regress(project_descr, user_settings, tool_uid, [1, 2, 3])
+        assert [r.name for r in results] == ["seed_1", "seed_2", "seed_3"]
+        assert all(r.passed for r in results)
+        assert len(Path(f"{tool_uid}/build.log").read_text().splitlines()) == 1
+        for seed in [1, 2, 3]:
+            assert Path(f"{tool_uid}/runs/seed_{seed}/worklib").is_dir() is True
+
+    def test_regress_failed_seed(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        project_descr.tools[tool_uid].sim = ["sh -c 'test $2 != 2' sh"]
+        results = regress(project_descr, user_settings, tool_uid, [1, 2, 3])
+        assert [r.passed for r in results] == [True, False, True]
+
+    def test_regress_licenses(
+        self,
+        project_descr: project.Project,
+        user_settings: settings.UserSettings,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(scheduler, "get_licenses_dir", lambda: tmp_path.joinpath("licenses"))
+        tool_uid = "modelsim20"
+        user_settings.tools[tool_uid].extras["licenses"] = 1
+        project_descr.tools[tool_uid].sim = ["sh -c 'date +%s.%N > start.txt; sleep 0.2; date +%s.%N > end.txt' sh"]
+        results = regress(project_descr, user_settings, tool_uid, [1, 2, 3], sim_jobs=3)
+        assert all(r.passed for r in results)
+        assert sum(r.wait for r in results) > 0.2
+        spans = []
+        for seed in [1, 2, 3]:
+            run_dir = Path(f"{tool_uid}/runs/seed_{seed}")
+            spans.append(
+                (float(run_dir.joinpath("start.txt").read_text()), float(run_dir.joinpath("end.txt").read_text()))
+            )
+        spans.sort()
+        assert all(prev[1] <= cur[0] for prev, cur in zip(spans, spans[1:]))
+
+    def test_regress_unsupported(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        user_settings.tools["modelsim20"].kind = tools.ToolKind.ICARUS
+        with pytest.raises(ValueError):
+            regress(project_descr, user_settings, "modelsim20", [1, 2, 3])
+        # Nothing is built for the simulator, which can't set the seed
+        assert Path("modelsim20").exists() is False
+
+
+class TestBuildCache:
+    @pytest.fixture
+    def project_descr(self, project_descr: project.Project) -> project.Project:
+        Path("tb.sv").write_text("module tb; endmodule")
+        project_descr.sources = ["tb.sv"]
+        project_descr.tools["modelsim20"].build = ["echo build >> build.log"]
+        return project_descr
+
+    def _count_builds(self, tool_uid: str) -> int:
+        return len(Path(f"{tool_uid}/build.log").read_text().splitlines())
+
+    def test_hit(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        run(project_descr, user_settings, tool_uid, False)
+        run(project_descr, user_settings, tool_uid, False)
+        assert self._count_builds(tool_uid) == 1
+        assert Path(f"{tool_uid}/sim.log").is_file() is True
+
+    def test_source_changed(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        run(project_descr, user_settings, tool_uid, False)
+        Path(f"{tool_uid}/stale.log").touch()
+        Path("tb.sv").write_text("module tb; initial $finish; endmodule")
+        run(project_descr, user_settings, tool_uid, False)
+        assert Path(f"{tool_uid}/stale.log").is_file() is False
+        assert self._count_builds(tool_uid) == 1
+
+    def test_rebuild(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        run(project_descr, user_settings, tool_uid, False)
+        Path(f"{tool_uid}/stale.log").touch()
+        run(project_descr, user_settings, tool_uid, False, rebuild=True)
+        assert Path(f"{tool_uid}/stale.log").is_file() is False
+
+    def test_no_sources(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        project_descr.sources = []
+        run(project_descr, user_settings, tool_uid, False)
+        Path(f"{tool_uid}/stale.log").touch()
+        run(project_descr, user_settings, tool_uid, False)
+        assert Path(f"{tool_uid}/stale.log").is_file() is False
+
+    def test_glob_sources(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        Path("rtl").mkdir()
+        Path("rtl/dut.sv").write_text("module dut; endmodule")
+        project_descr.sources = ["tb.sv", "rtl/*.sv"]
+        project_descr.tools[tool_uid].build.append(f"cp {tools.SOURCES_FILE} build.f")
+        run(project_descr, user_settings, tool_uid, False)
+        assert Path(f"{tool_uid}/build.f").read_text() == "../tb.sv\n../rtl/dut.sv\n"
+        run(project_descr, user_settings, tool_uid, False)
+        assert self._count_builds(tool_uid) == 1
+        Path("rtl/core.sv").write_text("module core; endmodule")
+        run(project_descr, user_settings, tool_uid, False)
+        assert self._count_builds(tool_uid) == 1
+        assert Path(f"{tool_uid}/build.f").read_text() == "../tb.sv\n../rtl/core.sv\n../rtl/dut.sv\n"
+
+    def test_failed_build(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        project_descr.tools[tool_uid].build.append("ls /foobar")
+        with pytest.raises(RuntimeError):
+            run(project_descr, user_settings, tool_uid, False)
+        with pytest.raises(RuntimeError):
+            run(project_descr, user_settings, tool_uid, False)
+
+
+class TestIncremental:
+    tool_uid = "verilator"
+
+    @pytest.fixture(autouse=True)
+    def add_tool(self, project_descr: project.Project, user_settings: settings.UserSettings, tmp_path: Path):
+        bin_dir = tmp_path.joinpath("bin")
+        bin_dir.mkdir()
+        bin_dir.joinpath("ccache").write_text("#!/bin/sh\n")
+        bin_dir.joinpath("ccache").chmod(0o755)
+        user_settings.tools[self.tool_uid] = tools.ToolSettings(
+            tools.ToolKind.VERILATOR, bin_dir, {}, {"incremental": True}
+        )
+        project_descr.tools[self.tool_uid] = tools.ToolScript(
+            build=[
+                "mkdir -p obj_dir",
+                "test -f obj_dir/a.o || touch obj_dir/a.o",
+                "touch obj_dir/b.o",
+                "echo '# b.cpp' >> $CCACHE_STATSLOG && echo direct_cache_hit >> $CCACHE_STATSLOG",
+                "touch obj_dir/c.o",
+                'test -x "$OBJCACHE"',
+            ],
+            sim=[],
+            waves=[],
+        )
+
+    def test_keep_obj_dir(
+        self,
+        project_descr: project.Project,
+        user_settings: settings.UserSettings,
+        caplog: pytest.LogCaptureFixture,
+    ):
+        caplog.set_level("INFO")
+        run(project_descr, user_settings, self.tool_uid, False)
+        assert "2 translation units compiled, 1 reused (0 up to date, 1 from ccache)" in caplog.text
+        run(project_descr, user_settings, self.tool_uid, False)
+        assert "1 translation units compiled, 2 reused (1 up to date, 1 from ccache)" in caplog.text
+
+    def test_rebuild(
+        self,
+        project_descr: project.Project,
+        user_settings: settings.UserSettings,
+        caplog: pytest.LogCaptureFixture,
+    ):
+        run(project_descr, user_settings, self.tool_uid, False)
+        Path(self.tool_uid, "obj_dir", "stale.o").touch()
+        run(project_descr, user_settings, self.tool_uid, False, rebuild=True)
+        assert Path(self.tool_uid, "obj_dir", "stale.o").exists() is False
+
+
+def test_run_incremental_library(
+    project_descr: project.Project,
+    user_settings: settings.UserSettings,
+    caplog: pytest.LogCaptureFixture,
+):
+    caplog.set_level("INFO")
+    tool_uid = "modelsim20"
+    user_settings.tools[tool_uid].extras["incremental"] = True
+    project_descr.tools[tool_uid].build = ["mkdir -p worklib", "echo x >> worklib/lib.txt", "touch other.txt"]
+    run(project_descr, user_settings, tool_uid, False)
+    run(project_descr, user_settings, tool_uid, False)
+    assert Path(tool_uid, "worklib", "lib.txt").read_text() == "x\nx\n"
+    assert "['worklib', 'modelsim.ini'] are kept for the next build" in caplog.text
+
+
+def test_run_partial_compile(
+    project_descr: project.Project,
+    user_settings: settings.UserSettings,
+    tmp_path: Path,
+    caplog: pytest.LogCaptureFixture,
+):
+    caplog.set_level("INFO")
+    tool_uid = "modelsim20"
+    bin_dir = tmp_path.joinpath("bin")
+    bin_dir.mkdir()
+    bin_dir.joinpath("vlog").write_text('#!/bin/sh\necho "$@" >> worklib/compiled.txt\n')
+    bin_dir.joinpath("vlog").chmod(0o755)
+    user_settings.tools[tool_uid] = tools.ToolSettings(tools.ToolKind.MODELSIM, bin_dir, {}, {"incremental": True})
+    Path("pkg.sv").write_text("package pkg;\nendpackage\n")
+    Path("dut.sv").write_text("module dut;\n  import pkg::*;\nendmodule\n")
+    Path("tb.sv").write_text("module tb;\n  dut u_dut();\nendmodule\n")
+    Path("other.sv").write_text("module other;\nendmodule\n")
+    project_descr.sources = ["tb.sv", "dut.sv", "pkg.sv", "other.sv"]
+    project_descr.tools[tool_uid].build = [
+        "mkdir -p worklib",
+        ["vlog ../tb.sv", "vlog ../dut.sv"],
+        "vlog ../pkg.sv",
+        "vlog ../other.sv",
+    ]
+
+    def get_compiled() -> list:
+        compiled = Path(tool_uid, "worklib", "compiled.txt")
+        lines = compiled.read_text().splitlines()
+        compiled.unlink()
+        return lines
+
+    # Package goes before the module importing it despite the order of the commands
+    run(project_descr, user_settings, tool_uid, False)
+    compiled = get_compiled()
+    assert sorted(compiled) == ["../dut.sv", "../other.sv", "../pkg.sv", "../tb.sv"]
+    assert compiled.index("../pkg.sv") < compiled.index("../dut.sv")
+
+    # Changed package is recompiled with the modules depending on it
+    Path("pkg.sv").write_text("package pkg;\n  localparam int W = 8;\nendpackage\n")
+    run(project_descr, user_settings, tool_uid, False)
+    assert sorted(get_compiled()) == ["../dut.sv", "../pkg.sv", "../tb.sv"]
+    assert "Recompile 3 of 4 sources changed since the last build" in caplog.text
+
+    Path("other.sv").write_text("module other;\n  initial $display();\nendmodule\n")
+    run(project_descr, user_settings, tool_uid, False)
+    assert get_compiled() == ["../other.sv"]
+
+    run(project_descr, user_settings, tool_uid, False, rebuild=True)
+    assert len(get_compiled()) == 4
+
+
+class TestTuning:
+    tool_uid = "verilator"
+
+    @pytest.fixture(autouse=True)
+    def add_tool(
+        self,
+        project_descr: project.Project,
+        user_settings: settings.UserSettings,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr("os.cpu_count", lambda: 4)
+        user_settings.tools[self.tool_uid] = tools.ToolSettings(
+            tools.ToolKind.VERILATOR, Path("/usr/bin"), {}, {"threads": "auto", "tune-sim-opts": "short"}
+        )
+        project_descr.tools[self.tool_uid] = tools.ToolScript(
+            build=["sh -c 'echo $2 > threads.txt' sh"],
+            sim=[
+                "echo sim >> ../sims.txt",
+                "sh -c 'if [ $(cat threads.txt) = 2 ]; then sleep 0.05; else sleep 0.3; fi'",
+            ],
+            waves=[],
+        )
+
+    def test_tune(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        run(project_descr, user_settings, self.tool_uid, False)
+        assert Path(self.tool_uid, "threads.txt").read_text() == "2\n"
+        assert len(Path("sims.txt").read_text().split()) == 4
+        tuned = utils.load_json(Path(".playhdl/tuning.json"))[self.tool_uid]
+        assert tuned["threads"] == 2
+        assert list(tuned["timings"].keys()) == ["1", "2", "4"]
+
+        # Result is reused
+        run(project_descr, user_settings, self.tool_uid, False, rebuild=True)
+        assert Path(self.tool_uid, "threads.txt").read_text() == "2\n"
+        assert len(Path("sims.txt").read_text().split()) == 5
+
+        # Search is repeated when the script changes
+        project_descr.tools[self.tool_uid].sim.insert(0, "true")
+        run(project_descr, user_settings, self.tool_uid, False)
+        assert len(Path("sims.txt").read_text().split()) == 9
+
+
+class TestBuildProfile:
+    @pytest.fixture(autouse=True)
+    def add_profile(self, project_descr: project.Project):
+        project_descr.tools["modelsim20"].profiles["fast"] = {
+            "build": ["touch build_fast.log"],
+            "sim": ["touch sim_fast.log"],
+            "waves": [],
+        }
+
+    def test_fast(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        run(project_descr, user_settings, tool_uid, False, build_profile=tools.BuildProfile.fast)
+        assert Path(f"{tool_uid}/build_fast.log").is_file() is True
+        assert Path(f"{tool_uid}/sim_fast.log").is_file() is True
+        assert Path(f"{tool_uid}/build.log").is_file() is False
+
+    def test_fast_waves(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        with pytest.raises(ValueError):
+            run(project_descr, user_settings, "modelsim20", True, build_profile=tools.BuildProfile.fast)
+
+
+class TestSim:
+    @pytest.fixture
+    def project_descr(self, project_descr: project.Project) -> project.Project:
+        tool_script = project_descr.tools["modelsim20"]
+        tool_script.build = ["echo build >> build.log", "mkdir worklib"]
+        tool_script.sim = ["ls worklib && echo > sim.log && sh -c 'echo $@ > plusargs.txt' sh"]
+        return project_descr
+
+    def test_sim(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        tool_uid = "modelsim20"
+        build(project_descr, user_settings, tool_uid, defines=["FOO=1"])
+        run_dirs = [
+            sim(project_descr, user_settings, tool_uid, ["+UVM_TESTNAME=foo", "+verbose"]),
+            sim(project_descr, user_settings, tool_uid, ["+UVM_TESTNAME=bar"], name="bar"),
+            sim(project_descr, user_settings, tool_uid, []),
+        ]
+        assert run_dirs == [
+            Path(tool_uid, "runs", "UVM_TESTNAME_foo_verbose"),
+            Path(tool_uid, "runs", "bar"),
+            Path(tool_uid, "runs", "sim"),
+        ]
+        assert run_dirs[0].joinpath("plusargs.txt").read_text() == "+UVM_TESTNAME=foo +verbose\n"
+        assert run_dirs[1].joinpath("plusargs.txt").read_text() == "+UVM_TESTNAME=bar\n"
+        assert len(Path(f"{tool_uid}/build.log").read_text().splitlines()) == 1
+
+    def test_defines(self, project_descr: project.Project, user_settings: settings.UserSettings, tmp_path: Path):
+        tool_uid = "modelsim20"
+        bin_dir = tmp_path.joinpath("bin")
+        bin_dir.mkdir()
+        bin_dir.joinpath("vlog").write_text("#!/bin/sh\necho $@ > build.log\n")
+        bin_dir.joinpath("vlog").chmod(0o755)
+        user_settings.tools[tool_uid].bin_dir = bin_dir
+        project_descr.tools[tool_uid].build = ["vlog tb.sv"]
+        build(project_descr, user_settings, tool_uid, defines=["FOO=1", "BAR"])
+        assert Path(f"{tool_uid}/build.log").read_text() == "tb.sv +define+FOO=1 +define+BAR\n"
+
+    def test_no_build(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        with pytest.raises(RuntimeError):
+            sim(project_descr, user_settings, "modelsim20", [])
+
+    def test_other_profile(self, project_descr: project.Project, user_settings: settings.UserSettings):
+        project_descr.tools["modelsim20"].profiles["fast"] = {}
+        build(project_descr, user_settings, "modelsim20")
+        with pytest.raises(ValueError):
+            sim(project_descr, user_settings, "modelsim20", [], build_profile=tools.BuildProfile.fast)
+
+    @pytest.mark.parametrize("name", ["..", "a/b"])
+    def test_wrong_name(self, project_descr: project.Project, user_settings: settings.UserSettings, name: str):
+        build(project_descr, user_settings, "modelsim20")
+        with pytest.raises(ValueError):
+            sim(project_descr, user_settings, "modelsim20", [], name=name)
+
+
+class TestWatch:
+    @pytest.fixture
+    def project_file(self, project_descr: project.Project) -> Path:
+        Path("tb.sv").write_text("module tb; endmodule")
+        project_descr.sources = ["tb.sv"]
+        tool_script = project_descr.tools["modelsim20"]
+        tool_script.build = ["echo build >> ../builds.txt"]
+        tool_script.sim = [
+            "sh -c 'if grep -q slow ../tb.sv; then echo slow > ../slow.txt; sleep 10; fi; echo sim >> ../sims.txt'"
+        ]
+        project.dump(Path("playhdl.json"), project_descr)
+        return Path("playhdl.json")
+
+    def _wait_lines(self, file: str, n: int) -> None:
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if Path(file).is_file() and len(Path(file).read_text().splitlines()) >= n:
+                return
+            time.sleep(0.01)
+        raise TimeoutError(f"'{file}' doesn't have {n} lines")
+
+    def test_watch(self, project_file: Path, user_settings: settings.UserSettings):
+        stop = threading.Event()
+        thread = threading.Thread(target=watch, args=(project_file, user_settings, "modelsim20", stop))
+        thread.start()
+        try:
+            self._wait_lines("sims.txt", 1)
+
+            # Slow simulation is cancelled by the next change
+            Path("tb.sv").write_text("module tb; /* slow */ endmodule")
+            self._wait_lines("slow.txt", 1)
+            start = time.monotonic()
+            Path("tb.sv").write_text("module tb; initial $finish; endmodule")
+            self._wait_lines("sims.txt", 2)
+            assert time.monotonic() - start < 5
+            assert len(Path("builds.txt").read_text().splitlines()) == 3
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_watch_include(self, project_file: Path, user_settings: settings.UserSettings):
+        Path("defs.svh").write_text("`define W 8\n")
+        Path("tb.sv").write_text('`include "defs.svh"\nmodule tb; endmodule')
+        stop = threading.Event()
+        thread = threading.Thread(target=watch, args=(project_file, user_settings, "modelsim20", stop))
+        thread.start()
+        try:
+            self._wait_lines("sims.txt", 1)
+            Path("defs.svh").write_text("`define W 16\n")
+            self._wait_lines("sims.txt", 2)
+            assert len(Path("builds.txt").read_text().splitlines()) == 2
+        finally:
+            stop.set()
+            thread.join()
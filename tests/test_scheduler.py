@@ -0,0 +1,99 @@
+"""Tests for playhdl/scheduler.py
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import playhdl.backend as backend
+import playhdl.scheduler as scheduler
+
+import pytest
+from playhdl.log import get_job_name
+from playhdl.scheduler import get_summary_text_table, Job, JobResult, LicensePool, run_jobs
+
+
+@pytest.fixture(autouse=True)
+def licenses_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(scheduler, "get_licenses_dir", lambda: Path(tmp_path, "licenses"))
+
+
+def test_run_jobs():
+    names = {}
+
+    def func(i: int) -> None:
+        names[i] = get_job_name()
+        if i == 1:
+            raise RuntimeError("The answer is 42")
+
+    jobs = [Job(name=f"job{i}", func=lambda i=i: func(i)) for i in range(3)]  # type: ignore
+    results = run_jobs(jobs, max_workers=3)
+    assert [r.name for r in results] == ["job0", "job1", "job2"]
+    assert [r.passed for r in results] == [True, False, True]
+    assert results[1].error == "The answer is 42"
+    assert names == {0: "job0", 1: "job1", 2: "job2"}
+
+
+def test_run_jobs_concurrent():
+    barrier = threading.Barrier(3, timeout=5)
+    jobs = [Job(name=f"job{i}", func=barrier.wait) for i in range(3)]  # type: ignore
+    results = run_jobs(jobs, max_workers=3)
+    assert all(r.passed for r in results)
+
+
+def test_run_jobs_unexpected_error():
+    def func() -> None:
+        raise KeyError("foo")
+
+    with pytest.raises(KeyError):
+        run_jobs([Job(name="job", func=func)], max_workers=1)
+
+
+def test_summary_text_table():
+    results = [JobResult("icarus", True, 1.5, wait=0.25), JobResult("modelsim_2020", False, 42.0, "error")]
+    table = get_summary_text_table(results)
+    lines = table.splitlines()
+    assert len(lines) == 4
+    assert "wait, s" in lines[0]
+    assert "icarus" in lines[2] and "PASS" in lines[2] and "1.50" in lines[2] and "0.25" in lines[2]
+    assert "modelsim_2020" in lines[3] and "FAIL" in lines[3] and "42.00" in lines[3]
+
+
+def test_license_pool():
+    pool = LicensePool("modelsim", 2)
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def func() -> None:
+        with pool.checkout():
+            with lock:
+                running.append(get_job_name())
+                max_running.append(len(running))
+            time.sleep(0.2)
+            with lock:
+                running.remove(get_job_name())
+
+    jobs = [Job(name=f"job{i}", func=func) for i in range(4)]
+    results = run_jobs(jobs, max_workers=4)
+    assert all(r.passed for r in results)
+    assert max(max_running) == 2
+    waited = [r for r in results if r.wait > 0.1]
+    assert len(waited) == 2
+    assert all(r.duration < 0.4 for r in waited)
+
+
+def test_license_pool_shared():
+    first = LicensePool("vcs", 1)
+    second = LicensePool("vcs", 1)
+    other = LicensePool("xcelium", 1)
+    with first.checkout():
+        with other.checkout():
+            pass
+        cancellation = backend.Cancellation()
+        cancellation.cancel()
+        with pytest.raises(backend.CancelledError):
+            with LicensePool("vcs", 1, cancellation).checkout():
+                pass
+    with second.checkout():
+        pass
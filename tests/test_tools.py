@@ -1,12 +1,13 @@
 """Tests for playhdl/tools.py
 """
 
-import shutil
 from pathlib import Path
 
+import playhdl.filelist as filelist
 import playhdl.templates as templates
 
 import playhdl.tools as tools
+import playhdl.utils as utils
 
 import pytest
 
@@ -22,13 +23,6 @@ def _get_base_exe_name(tool_kind: tools.ToolKind) -> str:
     }[tool_kind]
 
 
-@pytest.mark.parametrize("tool_kind", tools.ToolKind.aslist())
-def test_find_tool_dir(tool_kind: tools.ToolKind):
-    bin_path = shutil.which(_get_base_exe_name(tool_kind))
-    expected = Path(bin_path).parent if bin_path else None
-    assert tools.find_tool_dir(tool_kind) == expected
-
-
 def test_get_compatibility_text_table():
     table = tools.get_compatibility_text_table()
     for k in tools.ToolKind:
@@ -67,6 +61,125 @@ class TestTool:
             tools._Tool.get_subclass_by_kind("foo")  # type: ignore
 
 
+@pytest.mark.parametrize("tool_kind", tools.ToolKind.aslist())
+def test_get_seed_opts(tool_kind: tools.ToolKind):
+    if tool_kind == tools.ToolKind.ICARUS:
+        with pytest.raises(ValueError):
+            tools.get_seed_opts(tool_kind, 42)
+    else:
+        assert "42" in tools.get_seed_opts(tool_kind, 42)
+
+
+def test_add_sim_opts():
+    assert tools.add_sim_opts(["echo foo > sim.tcl", "xsim tbsim"], "-sv_seed 1") == [
+        "echo foo > sim.tcl",
+        "xsim tbsim -sv_seed 1",
+    ]
+    assert tools.add_sim_opts(["./simv"], "") == ["./simv"]
+    assert tools.add_sim_opts([], "-sv_seed 1") == []
+
+
+class TestCompileSteps:
+    @pytest.fixture(autouse=True)
+    def change_test_dir(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.chdir(tmp_path)
+        Path("a_pkg.sv").write_text("package a_pkg;\nendpackage\n")
+        Path("b_pkg.sv").write_text("// b\npackage b_pkg;\n  import a_pkg::*;\nendpackage\n")
+        Path("dut.sv").write_text("module dut; endmodule\n")
+        Path("tb.sv").write_text("module tb; dut dut(); endmodule\n")
+
+    @pytest.mark.parametrize("kind", [tools.ToolKind.MODELSIM, tools.ToolKind.XCELIUM, tools.ToolKind.VIVADO])
+    def test_script(self, kind: tools.ToolKind):
+        settings = tools.ToolSettings(kind=kind, bin_dir=Path("/usr/bin"), env={}, extras={})
+        script = tools.generate_script(
+            settings,
+            templates.DesignKind.sv,
+            ["dut.sv", "b_pkg.sv", "tb.sv", "a_pkg.sv"],
+            compile_strategy=tools.CompileStrategy.per_file,
+        )
+        # Sources are not scanned during generation, they are ordered by the runner. Compilers share the library,
+        # so they are never executed in parallel.
+        compile_steps = [step for step in script.build if "../" in step]
+        assert all(isinstance(step, str) for step in script.build)
+        assert [str(s).split()[-1] for s in compile_steps] == ["../dut.sv", "../b_pkg.sv", "../tb.sv", "../a_pkg.sv"]
+        assert not Path(utils.STATE_DIR).exists()
+
+    @pytest.mark.parametrize("kind", [tools.ToolKind.MODELSIM, tools.ToolKind.XCELIUM, tools.ToolKind.VIVADO])
+    def test_batch(self, kind: tools.ToolKind):
+        settings = tools.ToolSettings(kind=kind, bin_dir=Path("/usr/bin"), env={}, extras={})
+        sources = ["dut.sv", "a_pkg.sv", "tb.sv", "b_pkg.sv"]
+        script = tools.generate_script(settings, templates.DesignKind.sv, sources, compile_strategy="batch")
+        compile_steps = [step for step in script.build if "../" in step]
+        assert len(compile_steps) == 1
+        assert str(compile_steps[0]).endswith("../dut.sv ../a_pkg.sv ../tb.sv ../b_pkg.sv")
+        groups = [["dut.sv", "a_pkg.sv", "tb.sv"], ["b_pkg.sv"]]
+        scheduled = tools.schedule_compile_steps(kind, script.build, groups, {"b_pkg.sv", "dut.sv"})
+        assert str([step for step in scheduled if "../" in step][0]).endswith("../dut.sv ../b_pkg.sv")
+
+    def test_batch_file_list(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(tools, "FILE_LIST_MIN_SOURCES", 2)
+        settings = tools.ToolSettings(kind=tools.ToolKind.XCELIUM, bin_dir=Path("/usr/bin"), env={}, extras={})
+        sources = ["dut.sv", "a_pkg.sv", "tb.sv"]
+        script = tools.generate_script(settings, templates.DesignKind.sv, sources, compile_strategy="batch")
+        assert script.build[0] == f"xmvlog -sv -f {tools.SOURCES_FILE}"
+        file_list = tools.get_file_list(settings.kind, filelist.Sources(files=sources))
+        assert file_list == "../dut.sv\n../a_pkg.sv\n../tb.sv\n"
+
+    @pytest.mark.parametrize("kind", list(tools.ToolKind))
+    def test_patterns(self, kind: tools.ToolKind):
+        settings = tools.ToolSettings(kind=kind, bin_dir=Path("/usr/bin"), env={}, extras={})
+        design_kind = tools._Tool.get_subclass_by_kind(kind).get_supported_design_kinds()[-1]
+        sources = ["tb.sv", "rtl/**/*.sv"]
+        script = tools.generate_script(settings, design_kind, sources, compile_strategy=tools.CompileStrategy.per_file)
+        compile_steps = [step for step in script.build if f"-f {tools.SOURCES_FILE}" in step]
+        assert len(compile_steps) == 1
+        assert "../" not in str(script.build)
+
+    def test_file_list(self):
+        sources = filelist.Sources(files=["tb.sv", "/ip/a.sv"], include_dirs=["inc", "/ip/inc"], defines=["A=1"])
+        assert tools.get_file_list(tools.ToolKind.ICARUS, sources) == (
+            "+incdir+../inc\n+incdir+/ip/inc\n+define+A=1\n../tb.sv\n/ip/a.sv\n"
+        )
+        assert tools.get_file_list(tools.ToolKind.VIVADO, sources) == (
+            "-i ../inc\n-i /ip/inc\n-d A=1\n../tb.sv\n/ip/a.sv\n"
+        )
+        assert tools.get_file_list(tools.ToolKind.VIVADO, filelist.Sources()) == ""
+
+    def test_auto(self, tmp_path: Path):
+        bin_dir = tmp_path.joinpath("bin")
+        bin_dir.mkdir()
+        bin_dir.joinpath("vlog").write_text(f"#!/bin/sh\necho probe >> {tmp_path}/probes.txt\n")
+        bin_dir.joinpath("vlog").chmod(0o755)
+        settings = tools.ToolSettings(kind=tools.ToolKind.MODELSIM, bin_dir=bin_dir, env={}, extras={})
+
+        # Compiler isn't started until a build needs the strategy
+        script = tools.generate_script(settings, templates.DesignKind.sv, ["dut.sv", "a_pkg.sv", "tb.sv"])
+        assert script.compile_strategy == str(tools.CompileStrategy.auto)
+        assert script.get_profile(tools.BuildProfile.fast).compile_strategy == script.compile_strategy
+        assert not Path("probes.txt").exists()
+        assert tools.get_compile_strategy(settings, script, 1) == tools.CompileStrategy.per_file
+        assert not Path("probes.txt").exists()
+
+        # Startup time is measured once per executable
+        assert tools.get_compile_strategy(settings, script, 3) == tools.CompileStrategy.per_file
+        assert tools.get_compile_strategy(settings, script, 3) == tools.CompileStrategy.per_file
+        assert Path("probes.txt").read_text() == "probe\n"
+        cache_file = utils.get_state_file(tools.STARTUP_CACHE_FILE)
+        cache = utils.load_json(cache_file)
+        cache[str(bin_dir.joinpath("vlog"))]["cost"] = 5.0
+        utils.dump_json(cache_file, cache)
+        assert tools.get_compile_strategy(settings, script, 3) == tools.CompileStrategy.batch
+
+        script.compile_strategy = str(tools.CompileStrategy.per_file)
+        assert tools.get_compile_strategy(settings, script, 3) == tools.CompileStrategy.per_file
+
+    def test_auto_not_found(self):
+        settings = tools.ToolSettings(kind=tools.ToolKind.VIVADO, bin_dir=Path("/foo"), env={}, extras={})
+        script = tools.generate_script(settings, templates.DesignKind.sv, ["a.sv"] * 10)
+        assert tools.get_startup_cost(settings) == tools.DEFAULT_STARTUP_COST
+        assert tools.get_compile_strategy(settings, script, 10) == tools.CompileStrategy.batch
+
+
 class _TestGenerateScript:
     @pytest.fixture
     def settings(self) -> tools.ToolSettings:
@@ -184,3 +297,261 @@ class TestGenerateScriptVivado(_TestGenerateScript):
     def test_vhdl(self, settings: tools.ToolSettings):
         with pytest.raises(ValueError):
             super().test_vhdl(settings)
+
+
+@pytest.mark.parametrize(
+    "text, version",
+    [
+        ("Model Technology ModelSim - Intel FPGA Edition vsim 2020.1 Simulator 2020.02 Feb 28 2020", "2020.1"),
+        ("TOOL:\txmsim(64)\t20.09-s001: Started on Jan 01, 2023 at 00:00:00", "20.09-s001"),
+        ("Verilator 5.002 2022-10-29 rev v5.002", "5.002"),
+        ("Icarus Verilog version 11.0 (stable) ()", "11.0"),
+        ("vcs script version : S-2021.09", "2021.09"),
+        ("Vivado Simulator v2022.2", "2022.2"),
+        ("command not found", None),
+    ],
+)
+def test_parse_version(text: str, version: str):
+    assert tools.parse_version(text) == version
+
+
+@pytest.mark.parametrize("tool_kind", tools.ToolKind.aslist())
+def test_get_version_cmd(tool_kind: tools.ToolKind):
+    cmd = tools.get_version_cmd(tool_kind, Path("/opt/bin"))
+    assert cmd[0] == f"/opt/bin/{_get_base_exe_name(tool_kind)}"
+    assert cmd[1].startswith("-")
+
+
+class TestIncrementalVerilator:
+    @pytest.fixture
+    def settings(self, tmp_path: Path) -> tools.ToolSettings:
+        return tools.ToolSettings(kind=tools.ToolKind.VERILATOR, bin_dir=tmp_path, env={}, extras={})
+
+    def test_disabled(self, settings: tools.ToolSettings, tmp_path: Path):
+        assert tools.get_incremental_dirs(settings) == []
+        assert tools.get_build_env(settings, tmp_path) == {}
+
+    def test_no_ccache(self, settings: tools.ToolSettings, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setenv("PATH", "")
+        settings.extras["incremental"] = True
+        assert tools.get_incremental_dirs(settings) == ["obj_dir"]
+        assert tools.get_build_env(settings, tmp_path) == {}
+
+    def test_ccache(self, settings: tools.ToolSettings, tmp_path: Path):
+        settings.extras["incremental"] = True
+        tmp_path.joinpath("ccache").touch(mode=0o755)
+        env = tools.get_build_env(settings, tmp_path)
+        assert env["OBJCACHE"] == str(tmp_path.joinpath("ccache"))
+        assert env["CCACHE_STATSLOG"] == str(tmp_path.joinpath(tools.CCACHE_STATS_FILE))
+
+
+class TestThreadsVerilator:
+    @pytest.fixture
+    def settings(self) -> tools.ToolSettings:
+        return tools.ToolSettings(kind=tools.ToolKind.VERILATOR, bin_dir=Path("/usr/bin"), env={}, extras={})
+
+    def test_threads(self, settings: tools.ToolSettings):
+        settings.extras.update({"threads": 4, "trace-threads": 2})
+        script = tools.generate_script(settings, templates.DesignKind.sv, ["tb.sv"])
+        assert "--threads 4 --trace-threads 2" in script.build[0]
+        assert tools.is_threads_tuned(settings) is False
+
+    def test_auto(self, settings: tools.ToolSettings):
+        settings.extras["threads"] = "auto"
+        script = tools.generate_script(settings, templates.DesignKind.sv, ["tb.sv"])
+        assert "--threads" not in script.build[0]
+        assert tools.is_threads_tuned(settings) is True
+
+    def test_wrong(self, settings: tools.ToolSettings):
+        settings.extras["threads"] = "many"
+        with pytest.raises(ValueError):
+            tools.generate_script(settings, templates.DesignKind.sv, ["tb.sv"])
+
+    def test_unsupported(self):
+        with pytest.raises(ValueError):
+            tools.get_threads_opts(tools.ToolKind.ICARUS, 2)
+
+
+def test_add_build_opts():
+    assert tools.add_build_opts(["mkdir out", "verilator tb.sv"], "--threads 2") == [
+        "mkdir out",
+        "verilator tb.sv --threads 2",
+    ]
+    assert tools.add_build_opts([], "--threads 2") == []
+    with pytest.raises(ValueError):
+        tools.add_build_opts([["vlog a.sv", "vlog b.sv"]], "--threads 2")
+
+
+@pytest.mark.parametrize("kind", [tools.ToolKind.ICARUS, tools.ToolKind.VERILATOR])
+def test_waves_format(kind: tools.ToolKind):
+    settings = tools.ToolSettings(kind=kind, bin_dir=Path("/usr/bin"), env={}, extras={})
+    vcd = tools.generate_script(settings, templates.DesignKind.sv, ["tb.sv"])
+    fst = tools.generate_script(settings, templates.DesignKind.sv, ["tb.sv"], waves_format=tools.WavesFormat.fst)
+    assert vcd.waves == ["gtkwave tb.vcd"]
+    assert fst.waves == ["gtkwave tb.fst"]
+    assert "WAVES_FST" not in vcd.build[0]
+    assert "-DWAVES_FST" in fst.build[0]
+    if kind == tools.ToolKind.ICARUS:
+        assert fst.sim == ["vvp tb.out -fst"]
+    else:
+        assert "--trace-fst" in fst.build[0]
+
+
+class TestBuildProfile:
+    @pytest.mark.parametrize("kind", tools.ToolKind.aslist())
+    def test_fast(self, kind: tools.ToolKind):
+        settings = tools.ToolSettings(kind=kind, bin_dir=Path("/usr/bin"), env={}, extras={})
+        script = tools.generate_script(settings, templates.DesignKind.verilog, ["tb.v"])
+        assert script.get_profile(tools.BuildProfile.debug) == script
+        assert script.get_profiles() == ["debug", "fast"]
+
+        fast = script.get_profile(tools.BuildProfile.fast)
+        cmds = " ".join(str(c) for c in fast.build + fast.sim)
+        for debug_opt in ["-debug_acc", "vcdpluson", "-access", "--debug", "log -r", "log_wave", "--trace", "--wdb"]:
+            assert debug_opt not in cmds
+        assert "NO_WAVES" in cmds
+        assert fast.waves == []
+        assert script.waves != []
+
+    def test_not_defined(self):
+        script = tools.ToolScript(build=["foo"], sim=["bar"], waves=[])
+        with pytest.raises(ValueError):
+            script.get_profile(tools.BuildProfile.fast)
+
+    def test_partial(self):
+        script = tools.ToolScript(build=["foo"], sim=["bar"], waves=["baz"], profiles={"fast": {"sim": ["qux"]}})
+        assert script.get_profile(tools.BuildProfile.fast) == tools.ToolScript(
+            build=["foo"], sim=["qux"], waves=["baz"]
+        )
+
+
+@pytest.mark.parametrize(
+    "kind, flag",
+    [
+        (tools.ToolKind.MODELSIM, "vlog -sv -incr"),
+        (tools.ToolKind.XCELIUM, "-update -snapshot"),
+        (tools.ToolKind.VCS, "-Mupdate"),
+        (tools.ToolKind.VIVADO, "--incr"),
+        (tools.ToolKind.VERILATOR, "verilator"),
+    ],
+)
+def test_incremental(kind: tools.ToolKind, flag: str):
+    settings = tools.ToolSettings(kind=kind, bin_dir=Path("/usr/bin"), env={}, extras={})
+    script = tools.generate_script(settings, templates.DesignKind.sv, ["tb.sv"])
+    assert tools.get_incremental_dirs(settings) == []
+
+    settings.extras["incremental"] = True
+    script = tools.generate_script(settings, templates.DesignKind.sv, ["tb.sv"])
+    assert flag in " ".join(str(step) for step in script.build)
+    assert tools.get_incremental_dirs(settings) != []
+    assert tools.get_incremental_dirs(settings) == tools._Tool.get_subclass_by_kind(kind).get_library_dirs()
+
+
+@pytest.mark.parametrize(
+    "kind, opts",
+    [
+        (tools.ToolKind.MODELSIM, "+define+A '+define+B=x y'"),
+        (tools.ToolKind.XCELIUM, "-define A -define 'B=x y'"),
+        (tools.ToolKind.VIVADO, "-d A -d 'B=x y'"),
+        (tools.ToolKind.VERILATOR, "-DA '-DB=x y'"),
+    ],
+)
+def test_add_defines(kind: tools.ToolKind, opts: str):
+    exe = tools._Tool.get_subclass_by_kind(kind).get_compile_exe_name()
+    build_cmds: list = ["mkdir out", [f"{exe} a.sv", f"{exe} b.sv"], f"{exe} c.sv", "elab tb"]
+    assert tools.add_defines(kind, build_cmds, ["A", "B=x y"]) == [
+        "mkdir out",
+        [f"{exe} a.sv {opts}", f"{exe} b.sv {opts}"],
+        f"{exe} c.sv {opts}",
+        "elab tb",
+    ]
+    assert tools.add_defines(kind, build_cmds, []) == build_cmds
+    with pytest.raises(ValueError):
+        tools.add_defines(kind, build_cmds, ["1A"])
+
+
+def test_split_build_cmds():
+    build_cmds = ["vlib worklib", ["xmvlog a.sv", "xmvlog b.sv"], "xmvlog c.sv", "xmelab tb"]
+    assert tools.split_build_cmds(tools.ToolKind.XCELIUM, build_cmds) == (build_cmds[:3], ["xmelab tb"])
+    assert tools.split_build_cmds(tools.ToolKind.VERILATOR, ["verilator --binary tb.sv"]) == (
+        ["verilator --binary tb.sv"],
+        [],
+    )
+    assert tools.split_build_cmds(tools.ToolKind.VCS, ["make"]) == (["make"], [])
+
+
+@pytest.mark.parametrize(
+    "kind, opts",
+    [
+        (tools.ToolKind.XCELIUM, "+UVM_TESTNAME=foo +verbose"),
+        (tools.ToolKind.VIVADO, "--testplusarg UVM_TESTNAME=foo --testplusarg verbose"),
+    ],
+)
+def test_get_plusargs_opts(kind: tools.ToolKind, opts: str):
+    assert tools.get_plusargs_opts(kind, ["+UVM_TESTNAME=foo", "+verbose"]) == opts
+    with pytest.raises(ValueError):
+        tools.get_plusargs_opts(kind, ["UVM_TESTNAME=foo"])
+
+
+def test_get_licenses():
+    settings = tools.ToolSettings(tools.ToolKind.XCELIUM, Path("/opt/xcelium"))
+    assert tools.get_licenses(settings) is None
+    settings.extras["licenses"] = 4
+    assert tools.get_licenses(settings) == ("xcelium", 4)
+    settings.extras["license-pool"] = "xcelium22"
+    assert tools.get_licenses(settings) == ("xcelium22", 4)
+    for limit in [0, "4", True]:
+        settings.extras["licenses"] = limit
+        with pytest.raises(ValueError):
+            tools.get_licenses(settings)
+
+
+def test_schedule_compile_steps():
+    build_cmds = ["vlib worklib", ["vlog ../tb.sv", "vlog ../pkg.sv"], "vlog ../dut.sv", "vsim -c tb"]
+    groups = [["pkg.sv"], ["dut.sv", "tb.sv"]]
+    # Groups are flattened, since vlog processes can't write to the same library at once
+    assert tools.schedule_compile_steps(tools.ToolKind.MODELSIM, build_cmds, groups) == [
+        "vlib worklib",
+        "vlog ../pkg.sv",
+        "vlog ../dut.sv",
+        "vlog ../tb.sv",
+        "vsim -c tb",
+    ]
+    assert tools.schedule_compile_steps(tools.ToolKind.MODELSIM, build_cmds, groups, {"tb.sv"}) == [
+        "vlib worklib",
+        "vlog ../tb.sv",
+        "vsim -c tb",
+    ]
+    assert tools.schedule_compile_steps(
+        tools.ToolKind.MODELSIM, build_cmds, groups, strategy=tools.CompileStrategy.batch
+    ) == ["vlib worklib", "vlog ../pkg.sv ../dut.sv ../tb.sv", "vsim -c tb"]
+    # Sources of a command compiling several of them are reordered in place
+    batch_cmds = ["vlog -sv ../tb.sv ../pkg.sv +define+A ../dut.sv -incr"]
+    assert tools.schedule_compile_steps(tools.ToolKind.MODELSIM, batch_cmds, groups) == [
+        "vlog -sv ../pkg.sv ../dut.sv ../tb.sv +define+A -incr"
+    ]
+    assert tools.schedule_compile_steps(tools.ToolKind.MODELSIM, batch_cmds, groups, {"tb.sv"}) == [
+        "vlog -sv ../tb.sv +define+A -incr"
+    ]
+    assert tools.schedule_compile_steps(tools.ToolKind.MODELSIM, batch_cmds, groups, {"foo.sv"}) == []
+    assert tools.schedule_compile_steps(tools.ToolKind.ICARUS, ["iverilog ../tb.sv"], groups) == ["iverilog ../tb.sv"]
+    # Independent sources are compiled in parallel if they are written to different libraries
+    lib_cmds = ["vlog -work lib_a ../tb.sv", "vlog -work lib_b ../pkg.sv", "vlog -work lib_a ../dut.sv"]
+    assert tools.schedule_compile_steps(tools.ToolKind.MODELSIM, lib_cmds, [["dut.sv", "pkg.sv", "tb.sv"]]) == [
+        ["vlog -work lib_a ../dut.sv", "vlog -work lib_b ../pkg.sv"],
+        "vlog -work lib_a ../tb.sv",
+    ]
+    assert tools.schedule_compile_steps(
+        tools.ToolKind.VIVADO, [["xvlog -work a=a.dir ../tb.sv"], "xvlog ../pkg.sv"], [["tb.sv", "pkg.sv"]]
+    ) == [["xvlog -work a=a.dir ../tb.sv", "xvlog ../pkg.sv"]]
+
+
+def test_is_partial_compile_supported():
+    settings = tools.ToolSettings(kind=tools.ToolKind.XCELIUM, bin_dir=Path("/usr/bin"), env={}, extras={})
+    assert tools.is_partial_compile_supported(settings) is False
+    settings.extras["incremental"] = True
+    assert tools.is_partial_compile_supported(settings) is True
+    settings = tools.ToolSettings(
+        kind=tools.ToolKind.VCS, bin_dir=Path("/usr/bin"), env={}, extras={"incremental": True}
+    )
+    assert tools.is_partial_compile_supported(settings) is False
@@ -0,0 +1,36 @@
+"""Tests for playhdl/tuning.py
+"""
+
+from pathlib import Path
+
+import playhdl.tools as tools
+import playhdl.tuning as tuning
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def change_test_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_get_threads_candidates():
+    assert tuning.get_threads_candidates(1) == [1]
+    assert tuning.get_threads_candidates(12) == [1, 2, 4, 8]
+
+
+def test_save_load():
+    assert tuning.load_threads("verilator", "foo") is None
+    tuning.save_threads("verilator", "foo", 4, {1: 3.0, 4: 1.0})
+    tuning.save_threads("verilator5", "bar", 2, {1: 3.0, 2: 1.0})
+    assert tuning.load_threads("verilator", "foo") == 4
+    assert tuning.load_threads("verilator", "bar") is None
+    assert tuning.load_threads("verilator5", "bar") == 2
+
+
+def test_get_key():
+    settings = tools.ToolSettings(tools.ToolKind.VERILATOR, Path("/usr/bin"), {}, {"threads": "auto"})
+    script = tools.ToolScript(build=["verilator tb.sv"], sim=["./obj_dir/Vtb"], waves=[])
+    key = tuning.get_key(settings, script)
+    assert key == tuning.get_key(settings, script)
+    script.sim.append("+foo")
+    assert key != tuning.get_key(settings, script)
@@ -0,0 +1,73 @@
+"""Tests for playhdl/watcher.py
+"""
+
+import os
+import threading
+import time
+from pathlib import Path  # noqa: TC003
+from typing import Type
+
+import playhdl.watcher as watcher
+import pytest
+
+WATCHERS = [watcher.PollingWatcher, watcher.InotifyWatcher]
+
+
+@pytest.fixture
+def files(tmp_path: Path) -> list:
+    for name in ["a.sv", "b.sv", "other.txt"]:
+        tmp_path.joinpath(name).write_text("")
+    return [tmp_path.joinpath("a.sv"), tmp_path.joinpath("b.sv")]
+
+
+def _modify(file: Path, text: str) -> None:
+    file.write_text(text)
+    # Polling watcher relies on mtime, which may be coarse on some filesystems
+    os.utime(file, ns=(time.time_ns(), time.time_ns() + 10**9))
+
+
+@pytest.mark.parametrize("watcher_cls", WATCHERS)
+def test_modify(watcher_cls: Type[watcher.Watcher], files: list):
+    with watcher_cls(files) as w:
+        assert w.wait(0.05) == set()
+        _modify(files[0], "module a; endmodule")
+        assert w.wait(1.0) == {files[0]}
+
+
+@pytest.mark.parametrize("watcher_cls", WATCHERS)
+def test_replace(watcher_cls: Type[watcher.Watcher], files: list, tmp_path: Path):
+    with watcher_cls(files) as w:
+        _modify(tmp_path.joinpath("b.sv.swp"), "module b; endmodule")
+        tmp_path.joinpath("b.sv.swp").rename(files[1])
+        assert w.wait(1.0) == {files[1]}
+
+
+@pytest.mark.parametrize("watcher_cls", WATCHERS)
+def test_other_file(watcher_cls: Type[watcher.Watcher], files: list, tmp_path: Path):
+    with watcher_cls(files) as w:
+        _modify(tmp_path.joinpath("other.txt"), "foo")
+        assert w.wait(0.3) == set()
+
+
+def test_get_watcher(files: list):
+    with watcher.get_watcher(files) as w:
+        assert isinstance(w, watcher.InotifyWatcher)
+
+
+def test_wait_changes(files: list):
+    stop = threading.Event()
+    with watcher.get_watcher(files) as w:
+
+        def burst() -> None:
+            for i in range(5):
+                _modify(files[i % 2], str(i))
+                time.sleep(0.02)
+
+        thread = threading.Thread(target=burst)
+        thread.start()
+        assert watcher.wait_changes(w, stop, debounce=0.2) == set(files)
+        thread.join()
+        assert w.wait(0.1) == set()
+
+        stop.set()
+        assert watcher.wait_changes(w, stop) == set()